@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Générations AI simultanées par worker: WSGI synchrone contre ASGI (src/asgi.py)
+
+Démarre le service AI avec le fournisseur local (AI_MODEL_PROVIDER=stub, latence fixe
+--ai-latency-ms, comme une génération Gemini) puis, pour chaque serveur, l'API avec un
+seul worker et envoie /api/ai/generate-text en boucle fermée à plusieurs niveaux de
+concurrence. Pour chaque niveau: débit, latences p50/p99, erreurs et générations en
+cours en moyenne (débit x latence), c'est-à-dire ce qu'un worker tient réellement.
+
+    cd apps/api
+    python benchmarks/ai_concurrency.py --levels 1,8,32,128 --duration 10 --output ai-concurrency.json
+
+Serveurs: wsgi (gunicorn, worker gthread à --threads threads, nécessite gunicorn) et
+asgi (uvicorn src.asgi:app). --server-command nom="commande {port}" en ajoute un.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import AI_DIR, API_DIR, free_port, git_revision, percentile, stop_services, wait_until_up
+
+SERVERS = {
+    'wsgi': '{python} -m gunicorn --workers 1 --worker-class gthread --threads {threads} '
+            '--bind 127.0.0.1:{port} --timeout 120 src.main:app',
+    'asgi': '{python} -m uvicorn src.asgi:app --workers 1 --host 127.0.0.1 --port {port} --log-level warning'
+}
+
+def boot_ai_service(args, logs):
+    port = free_port()
+    env = dict(os.environ, AI_MODEL_PROVIDER='stub', AI_STUB_LATENCY_MS=str(args.ai_latency_ms))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=AI_DIR, env=env, stdout=logs, stderr=subprocess.STDOUT
+    )
+    wait_until_up(f'http://127.0.0.1:{port}/health')
+    return process, f'http://127.0.0.1:{port}'
+
+def boot_api(command, env, logs):
+    port = free_port()
+    process = subprocess.Popen(command.replace('{port}', str(port)), shell=True, cwd=API_DIR, env=env,
+                               stdout=logs, stderr=subprocess.STDOUT)
+    try:
+        wait_until_up(f'http://127.0.0.1:{port}/api/health', timeout=30)
+    except RuntimeError:
+        stop_services([process])
+        raise
+    return process, f'http://127.0.0.1:{port}'
+
+def signup(api_url):
+    response = requests.post(f'{api_url}/api/auth/signup', json={
+        'email': f'concurrency.{int(time.time() * 1000)}@example.mg',
+        'password': 'benchmark',
+        'name': 'Benchmark',
+        'org_name': 'Concurrence'
+    })
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['token']}"}
+
+def run_level(api_url, headers, concurrency, duration, timeout):
+    """Boucle fermée: chaque client renvoie une génération dès la réponse précédente"""
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = session.post(f'{api_url}/api/ai/generate-text', headers=headers,
+                                        json={'prompt': 'Promotion riz local Antananarivo'}, timeout=timeout)
+                outcome = response.status_code
+            except requests.RequestException as e:
+                outcome = type(e).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if outcome == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[str(outcome)] = errors.get(str(outcome), 0) + 1
+        session.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    throughput = len(latencies) / elapsed
+    return {
+        'concurrency': concurrency,
+        'completed': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(throughput, 2),
+        'p50_ms': round(percentile(latencies, 0.50), 1) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 1) if latencies else None,
+        # Générations en cours en moyenne dans le worker (loi de Little)
+        'in_flight': round(throughput * (sum(latencies) / len(latencies)) / 1000, 1) if latencies else 0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', default='wsgi,asgi')
+    parser.add_argument('--server-command', action='append', default=[],
+                        help='serveur supplémentaire: nom="commande avec {port}"')
+    parser.add_argument('--levels', default='1,8,32,128')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='threads du worker gthread (wsgi)')
+    parser.add_argument('--ai-latency-ms', type=float, default=1000)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    servers = {}
+    for name in args.servers.split(','):
+        servers[name] = SERVERS[name].format(python=sys.executable, threads=args.threads, port='{port}')
+    for definition in args.server_command:
+        name, command = definition.split('=', 1)
+        servers[name] = command
+    levels = [int(level) for level in args.levels.split(',')]
+
+    workdir = tempfile.mkdtemp(prefix='ai4local_ai_concurrency_')
+    logs = open(os.path.join(workdir, 'services.log'), 'w')
+    ai_service, ai_url = boot_ai_service(args, logs)
+    results = {}
+    try:
+        for name, command in servers.items():
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{os.path.join(workdir, f'{name}.db')}",
+                AI_SERVICE_URL=ai_url,
+                AI_REQUEST_BUDGET_MS=str(args.timeout * 1000)
+            )
+            subprocess.check_call([sys.executable, '-m', 'src.migrate'], cwd=API_DIR, env=env, stdout=logs)
+            try:
+                api, api_url = boot_api(command, env, logs)
+            except RuntimeError as e:
+                results[name] = {'command': command, 'error': f'{e} (voir {logs.name})'}
+                continue
+            try:
+                headers = signup(api_url)
+                results[name] = {
+                    'command': command,
+                    'levels': [run_level(api_url, headers, level, args.duration, args.timeout) for level in levels]
+                }
+            finally:
+                stop_services([api])
+    finally:
+        stop_services([ai_service])
+        logs.close()
+
+    report = {
+        'meta': {
+            **git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'config': {
+            'levels': levels,
+            'duration': args.duration,
+            'threads': args.threads,
+            'ai_latency_ms': args.ai_latency_ms
+        },
+        'servers': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Latence des générations interactives pendant une génération en masse d'une autre organisation
+
+Démarre le service AI avec le fournisseur local à capacité limitée (AI_STUB_CONCURRENCY
+appels simultanés de --ai-latency-ms, comme le quota d'un fournisseur) et l'API ASGI
+(src/asgi.py, un worker), sans puis avec l'ordonnanceur (AI_SCHEDULER_ENABLED). Pour
+chaque mode:
+1. générations interactives seules (--interactive-orgs organisations, --clients-per-org
+   clients en boucle fermée sur /api/ai/generate-text): latences de référence;
+2. les mêmes, pendant que --bulk-clients clients d'une organisation premium lancent des
+   générations en masse (/api/orgs/<id>/campaigns/generate-content).
+Le p99 interactif de l'étape 2 doit rester proche de celui de l'étape 1.
+
+    cd apps/api
+    python benchmarks/ai_fairness.py --duration 10 --output ai-fairness.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_concurrency import boot_api
+from load_test import AI_DIR, API_DIR, free_port, git_revision, percentile, stop_services, wait_until_up
+
+def boot_ai_service(args, logs):
+    port = free_port()
+    env = dict(os.environ, AI_MODEL_PROVIDER='stub', AI_STUB_LATENCY_MS=str(args.ai_latency_ms),
+               AI_STUB_CONCURRENCY=str(args.ai_capacity))
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=AI_DIR, env=env, stdout=logs, stderr=subprocess.STDOUT
+    )
+    wait_until_up(f'http://127.0.0.1:{port}/health')
+    return process, f'http://127.0.0.1:{port}'
+
+def signup(api_url, name):
+    response = requests.post(f'{api_url}/api/auth/signup', json={
+        'email': f'{name}.{int(time.time() * 1000)}@example.mg',
+        'password': 'benchmark',
+        'name': name,
+        'org_name': name
+    })
+    response.raise_for_status()
+    body = response.json()
+    return body['user']['org_id'], {'Authorization': f"Bearer {body['token']}"}
+
+def create_campaigns(api_url, org_id, headers, count):
+    ids = []
+    for index in range(count):
+        response = requests.post(f'{api_url}/api/orgs/{org_id}/campaigns', headers=headers, json={
+            'title': f'Promotion {index}',
+            'campaign_type': 'sms'
+        })
+        response.raise_for_status()
+        ids.append(response.json()['campaign']['id'])
+    return ids
+
+def closed_loop(clients, duration):
+    """Lance les clients (fonctions appelées en boucle) jusqu'à la fin de la durée"""
+    stop_at = time.monotonic() + duration
+
+    def loop(call):
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            call(session)
+        session.close()
+
+    threads = [threading.Thread(target=loop, args=(call,)) for call in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def run_phase(api_url, interactive, bulk, args):
+    latencies = []
+    errors = {}
+    generated = [0]
+    lock = threading.Lock()
+
+    def interactive_call(headers):
+        def call(session):
+            started = time.perf_counter()
+            try:
+                status = session.post(f'{api_url}/api/ai/generate-text', headers=headers,
+                                      json={'prompt': 'Promotion riz local'}, timeout=60).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            with lock:
+                if status == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+        return call
+
+    def bulk_call(org_id, headers, campaign_ids):
+        def call(session):
+            try:
+                response = session.post(f'{api_url}/api/orgs/{org_id}/campaigns/generate-content', headers=headers,
+                                        json={'campaign_ids': campaign_ids}, timeout=120)
+                count = response.json().get('generated_count', 0) if response.status_code == 200 else 0
+            except requests.RequestException:
+                count = 0
+            with lock:
+                generated[0] += count
+        return call
+
+    clients = [interactive_call(headers) for headers in interactive for _ in range(args.clients_per_org)]
+    if bulk:
+        org_id, headers, campaign_ids = bulk
+        clients += [bulk_call(org_id, headers, campaign_ids) for _ in range(args.bulk_clients)]
+    started = time.perf_counter()
+    closed_loop(clients, args.duration)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'interactive_requests': len(latencies),
+        'interactive_errors': errors,
+        'interactive_p50_ms': round(percentile(latencies, 0.50), 1) if latencies else None,
+        'interactive_p99_ms': round(percentile(latencies, 0.99), 1) if latencies else None,
+        'bulk_generations_per_s': round(generated[0] / elapsed, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--ai-latency-ms', type=float, default=200)
+    parser.add_argument('--ai-capacity', type=int, default=8, help='appels simultanés du service AI')
+    parser.add_argument('--interactive-orgs', type=int, default=2)
+    parser.add_argument('--clients-per-org', type=int, default=2)
+    parser.add_argument('--bulk-clients', type=int, default=4)
+    parser.add_argument('--bulk-size', type=int, default=20, help='campagnes par génération en masse')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ai4local_ai_fairness_')
+    logs = open(os.path.join(workdir, 'services.log'), 'w')
+    ai_service, ai_url = boot_ai_service(args, logs)
+    results = {}
+    try:
+        for mode in ('off', 'on'):
+            database = os.path.join(workdir, f'{mode}.db')
+            env = dict(
+                os.environ,
+                DATABASE_URL=f'sqlite:///{database}',
+                AI_SERVICE_URL=ai_url,
+                AI_SCHEDULER_ENABLED='true' if mode == 'on' else 'false',
+                # Places de l'API alignées sur la capacité du service AI, moitié pour la file bulk
+                AI_SCHEDULER_CAPACITY=str(args.ai_capacity),
+                AI_SCHEDULER_BULK_CAPACITY=str(max(1, args.ai_capacity // 2))
+            )
+            subprocess.check_call([sys.executable, '-m', 'src.migrate'], cwd=API_DIR, env=env, stdout=logs)
+            api, api_url = boot_api(
+                f'{sys.executable} -m uvicorn src.asgi:app --workers 1 --host 127.0.0.1 --port {{port}} '
+                f'--log-level warning', env, logs
+            )
+            try:
+                interactive = [signup(api_url, f'interactive{index}')[1] for index in range(args.interactive_orgs)]
+                bulk_org, bulk_headers = signup(api_url, 'bulk')
+                with sqlite3.connect(database) as connection:
+                    connection.execute("UPDATE organizations SET plan = 'premium' WHERE id = ?", (bulk_org,))
+                campaign_ids = create_campaigns(api_url, bulk_org, bulk_headers, args.bulk_size)
+                results[mode] = {
+                    'interactive_only': run_phase(api_url, interactive, None, args),
+                    'with_bulk': run_phase(api_url, interactive, (bulk_org, bulk_headers, campaign_ids), args)
+                }
+            finally:
+                stop_services([api])
+    finally:
+        stop_services([ai_service])
+        logs.close()
+
+    report = {
+        'meta': {
+            **git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'config': vars(args),
+        'scheduler': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Mesure du démarrage à froid de l'API: import de src.main puis premières requêtes
+
+Chaque mesure est faite dans un nouveau processus Python (caches d'import vides,
+comme un conteneur qui démarre): durée de l'import de l'application, puis durée de
+la première requête /api/health, de la première liste REST authentifiée et de la
+première requête GraphQL. Le schéma de la base temporaire est créé une fois avant
+les mesures (python -m src.migrate).
+
+    cd apps/api
+    python benchmarks/cold_start.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Code exécuté dans chaque processus mesuré
+PROBE = r'''
+import json, time
+started = time.perf_counter()
+from src.main import app
+imported = time.perf_counter()
+
+import jwt
+from datetime import datetime, timedelta
+from src.models.user import db, Organization, User
+
+with app.app_context():
+    user = User.query.first()
+token = jwt.encode({'user_id': user.id, 'org_id': user.org_id, 'role': 'OWNER',
+                    'exp': datetime.utcnow() + timedelta(hours=1)}, app.config['SECRET_KEY'], algorithm='HS256')
+headers = {'Authorization': f'Bearer {token}'}
+client = app.test_client()
+
+def timed(call):
+    begin = time.perf_counter()
+    response = call()
+    assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - begin) * 1000
+
+result = {'import_ms': (imported - started) * 1000}
+result['first_health_ms'] = timed(lambda: client.get('/api/health'))
+result['first_rest_ms'] = timed(lambda: client.get(f'/api/orgs/{user.org_id}/customers', headers=headers))
+result['first_graphql_ms'] = timed(lambda: client.post('/graphql', headers=headers, json={
+    'query': '{ customersByOrg(orgId: %d, first: 10) { edges { node { id name } } } }' % user.org_id
+}))
+result['second_graphql_ms'] = timed(lambda: client.post('/graphql', headers=headers, json={
+    'query': '{ customersByOrg(orgId: %d, first: 10) { edges { node { id name } } } }' % user.org_id
+}))
+print(json.dumps(result))
+'''
+
+SEED = r'''
+from werkzeug.security import generate_password_hash
+from src.main import app
+from src.models.user import db, Organization, User, Customer
+with app.app_context():
+    org = Organization(name='Démarrage')
+    db.session.add(org)
+    db.session.flush()
+    db.session.add(User(email='cold@example.mg', name='Cold', password_hash=generate_password_hash('x'),
+                        role='OWNER', org_id=org.id))
+    db.session.add_all([Customer(org_id=org.id, name=f'Client {i}', tags='[]') for i in range(50)])
+    db.session.commit()
+'''
+
+def run_python(code, env):
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=API_DIR, env=env, text=True)
+    return output.strip().splitlines()[-1] if output.strip() else ''
+
+def summarize(values):
+    return {
+        'median': round(statistics.median(values), 2),
+        'min': round(min(values), 2),
+        'max': round(max(values), 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ai4local_cold_start_')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'cold_start.db')}")
+    subprocess.check_call([sys.executable, '-m', 'src.migrate'], cwd=API_DIR, env=env, stdout=subprocess.DEVNULL)
+    run_python(SEED, env)
+
+    samples = [json.loads(run_python(PROBE, env)) for _ in range(args.runs)]
+    print(json.dumps({
+        'runs': args.runs,
+        'python': sys.version.split()[0],
+        'results': {metric: summarize([sample[metric] for sample in samples]) for metric in samples[0]}
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
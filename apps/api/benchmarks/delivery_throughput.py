@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark du débit de livraison des campagnes (messages par seconde, de bout en bout)
+
+Crée une base SQLite temporaire, y insère une audience synthétique, planifie une
+campagne puis la fait envoyer par le dispatcher vers le fournisseur local (StubProvider).
+
+    cd apps/api
+    python benchmarks/delivery_throughput.py --customers 50000 --channel sms --rate 0
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.models.user import db, Organization, Customer, Campaign, CampaignDispatch
+from src.services import delivery
+from src.services.dispatcher import CampaignDispatcher
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--channel', default='sms', choices=sorted(delivery.ADAPTERS))
+    parser.add_argument('--rate', type=float, default=0, help='messages/s (0 = illimité)')
+    parser.add_argument('--provider-batch-size', type=int, default=None)
+    parser.add_argument('--provider-concurrency', type=int, default=None)
+    parser.add_argument('--latency-ms', type=float, default=0, help='latence simulée par appel fournisseur')
+    parser.add_argument('--batch-size', type=int, default=1000, help="taille des lots d'audience")
+    parser.add_argument('--concurrency', type=int, default=4, help='lots envoyés en parallèle')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ai4local_delivery_')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        org = Organization(name='Benchmark')
+        db.session.add(org)
+        db.session.flush()
+        db.session.execute(db.insert(Customer), [
+            {
+                'org_id': org.id,
+                'name': f'Client {i}',
+                'phone': f'+26134{i:07d}',
+                'email': f'client{i}@example.mg',
+                'tags': json.dumps(['vip']),
+                'extra_data': '{}'
+            }
+            for i in range(args.customers)
+        ])
+        campaign = Campaign(
+            org_id=org.id,
+            title='Benchmark',
+            campaign_type=args.channel,
+            draft_content='Promo AI4Local',
+            target_audience=json.dumps(['vip']),
+            status='scheduled',
+            schedule_at=datetime.utcnow() - timedelta(seconds=1)
+        )
+        db.session.add(campaign)
+        db.session.commit()
+
+        delivery.reset_adapters(delivery.StubProvider(os.path.join(workdir, 'deliveries'), latency_ms=args.latency_ms))
+        adapter_class = delivery.ADAPTERS[args.channel]
+        delivery._adapters[args.channel] = adapter_class(
+            delivery.get_provider(),
+            rate=args.rate,
+            batch_size=args.provider_batch_size,
+            concurrency=args.provider_concurrency
+        )
+
+        dispatcher = CampaignDispatcher(batch_size=args.batch_size, concurrency=args.concurrency)
+        started = time.perf_counter()
+        dispatcher.run_once()
+        elapsed = time.perf_counter() - started
+
+        dispatch = CampaignDispatch.query.filter_by(campaign_id=campaign.id).first()
+        print(json.dumps({
+            'channel': args.channel,
+            'customers': args.customers,
+            'sent': dispatch.sent_count,
+            'failed': dispatch.failed_count,
+            'seconds': round(elapsed, 3),
+            'messages_per_second': round(dispatch.sent_count / elapsed, 1) if elapsed else None,
+            'workdir': workdir
+        }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Test de charge reproductible de l'API et du service AI (latences p50/p95/p99 par endpoint)
+
+Démarre le service AI avec le fournisseur de modèle local (AI_MODEL_PROVIDER=stub) et
+l'API sur une base SQLite temporaire, crée des organisations synthétiques, puis envoie
+un mélange pondéré de requêtes à concurrence fixe pendant une durée donnée. Le
+résultat (JSON) contient le commit mesuré, la configuration et, par endpoint, le
+débit et les percentiles de latence, pour comparer deux commits.
+
+    cd apps/api
+    python benchmarks/load_test.py --orgs 4 --customers-per-org 5000 --concurrency 8 --duration 30 \\
+        --output bench-$(git rev-parse --short HEAD).json
+
+Pour viser des services déjà démarrés: --api-url http://localhost:5000 --no-boot
+(la base doit alors être accessible via DATABASE_URL pour l'insertion des données).
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+from sqlalchemy import create_engine, text
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+from src import generate_dataset as dataset
+REPO_DIR = os.path.dirname(os.path.dirname(API_DIR))
+AI_DIR = os.path.join(REPO_DIR, 'services', 'ai')
+
+DEFAULT_MIX = 'list=25,search=15,create=10,import=2,export=3,generate=5,embed=5,graphql=25,detail=10'
+
+FIRST_NAMES = dataset.FIRST_NAMES
+TAGS = dataset.TAGS
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Service non disponible: {url}')
+
+def git_revision():
+    try:
+        revision = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             cwd=REPO_DIR, text=True).strip())
+        return {'commit': revision, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+def boot_services(args, workdir):
+    """Démarre le service AI (stub) et l'API, retourne (processus, url API, DATABASE_URL)"""
+    ai_port, api_port = free_port(), free_port()
+    database_url = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    logs = open(os.path.join(workdir, 'services.log'), 'w')
+
+    ai_env = dict(os.environ, AI_MODEL_PROVIDER='stub', AI_STUB_LATENCY_MS=str(args.ai_latency_ms))
+    ai = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(ai_port),
+         '--log-level', 'warning'],
+        cwd=AI_DIR, env=ai_env, stdout=logs, stderr=subprocess.STDOUT
+    )
+    api_env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        AI_SERVICE_URL=f'http://127.0.0.1:{ai_port}',
+        DELIVERY_PROVIDER='stub',
+        DELIVERY_STUB_DIR=os.path.join(workdir, 'deliveries')
+    )
+    subprocess.check_call([sys.executable, '-m', 'src.migrate'], cwd=API_DIR, env=api_env, stdout=logs)
+    api_command = args.api_command or (
+        f'{sys.executable} -c "from src.main import app; '
+        f'app.run(host=\'127.0.0.1\', port={api_port}, threaded=True)"'
+    )
+    api = subprocess.Popen(
+        api_command.replace('{port}', str(api_port)), shell=True,
+        cwd=API_DIR, env=api_env, stdout=logs, stderr=subprocess.STDOUT
+    )
+    processes = [ai, api]
+    try:
+        wait_until_up(f'http://127.0.0.1:{ai_port}/health')
+        wait_until_up(f'http://127.0.0.1:{api_port}/api/health')
+    except RuntimeError:
+        stop_services(processes)
+        raise
+    return processes, f'http://127.0.0.1:{api_port}', database_url
+
+def stop_services(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def fake_customer(rng, org_index, index):
+    customer = next(dataset.customer_rows(rng, None, 1, datetime.utcnow(), 1))
+    return {
+        'name': customer['name'],
+        'phone': customer['phone'],
+        'email': f"{customer['name'].lower().replace(' ', '.')}.{org_index}.{index}@example.mg",
+        'tags': json.loads(customer['tags'])
+    }
+
+def seed(args, api_url, database_url, rng):
+    """Crée les organisations via l'API puis insère clients et campagnes avec le générateur de données"""
+    run_id = f'{int(time.time())}{rng.randint(1000, 9999)}'
+    orgs = []
+    for org_index in range(args.orgs):
+        response = requests.post(f'{api_url}/api/auth/signup', json={
+            'email': f'bench{org_index}.{run_id}@example.mg',
+            'password': 'benchmark',
+            'name': f'Benchmark {org_index}',
+            'org_name': f'Organisation {org_index}'
+        })
+        response.raise_for_status()
+        data = response.json()
+        orgs.append({'org_id': data['user']['org_id'], 'token': data['token'], 'index': org_index})
+
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        sizes = {org['org_id']: (args.customers_per_org, args.campaigns_per_org) for org in orgs}
+        dataset.populate(conn, rng, sizes, datetime.utcnow(), 365)
+        for org in orgs:
+            org['campaign_ids'] = [row[0] for row in conn.execute(
+                text('SELECT id FROM campaigns WHERE org_id = :org_id'), {'org_id': org['org_id']}
+            )]
+            org['customer_ids'] = [row[0] for row in conn.execute(
+                text('SELECT id FROM customers WHERE org_id = :org_id LIMIT 1000'), {'org_id': org['org_id']}
+            )]
+    engine.dispose()
+    return orgs
+
+# Opérations du mélange: (méthode, chemin, options requests)
+
+def op_list(org, rng, counter):
+    return 'GET', f"/api/orgs/{org['org_id']}/customers", {'params': {'page': rng.randint(1, 20), 'per_page': 20}}
+
+def op_search(org, rng, counter):
+    return 'GET', f"/api/orgs/{org['org_id']}/customers", {
+        'params': {'search': rng.choice(FIRST_NAMES)[:4], 'tags': rng.choice(TAGS), 'per_page': 20}
+    }
+
+def op_detail(org, rng, counter):
+    return 'GET', f"/api/orgs/{org['org_id']}/customers/{rng.choice(org['customer_ids'])}", {}
+
+def op_create(org, rng, counter):
+    customer = fake_customer(rng, org['index'], f'new{next(counter)}')
+    return 'POST', f"/api/orgs/{org['org_id']}/customers", {'json': customer}
+
+def op_import(org, rng, counter):
+    batch = next(counter)
+    output = io.StringIO()
+    output.write('name,email,phone,tags\n')
+    for index in range(50):
+        customer = fake_customer(rng, org['index'], f'imp{batch}.{index}')
+        output.write(f"{customer['name']},{customer['email']},{customer['phone']},\"{','.join(customer['tags'])}\"\n")
+    return 'POST', f"/api/orgs/{org['org_id']}/customers/import", {
+        'files': {'file': ('clients.csv', output.getvalue().encode('utf-8'), 'text/csv')}
+    }
+
+def op_export(org, rng, counter):
+    return 'GET', f"/api/orgs/{org['org_id']}/customers/export", {}
+
+def op_generate(org, rng, counter):
+    campaign_id = rng.choice(org['campaign_ids'])
+    return 'POST', f"/api/orgs/{org['org_id']}/campaigns/{campaign_id}/generate-content", {
+        'json': {'prompt': 'Promotion de la semaine pour nos clients fidèles'}
+    }
+
+def op_embed(org, rng, counter):
+    return 'POST', '/api/ai/embed', {'json': {'texts': [f'Produit local {rng.randint(1, 1000)}' for _ in range(4)]}}
+
+def op_graphql(org, rng, counter):
+    query = (
+        'query($org: Int!, $search: String) { '
+        'customersByOrg(orgId: $org, first: 20, search: $search) { pageInfo { hasNextPage endCursor } '
+        'edges { node { id name phone tags } } } '
+        'campaignsByOrg(orgId: $org, first: 10) { edges { node { id title status } } } }'
+    )
+    return 'POST', '/graphql', {'json': {'query': query, 'variables': {
+        'org': org['org_id'], 'search': rng.choice(FIRST_NAMES)[:3]
+    }}}
+
+OPERATIONS = {
+    'list': op_list,
+    'search': op_search,
+    'detail': op_detail,
+    'create': op_create,
+    'import': op_import,
+    'export': op_export,
+    'generate': op_generate,
+    'embed': op_embed,
+    'graphql': op_graphql
+}
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f'Opération inconnue: {name} (disponibles: {", ".join(OPERATIONS)})')
+        mix[name] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(samples, elapsed):
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 2) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'max': round(latencies[-1], 2) if latencies else None
+        }
+    }
+
+def run_workload(args, api_url, orgs, mix):
+    """Chaque worker tire ses opérations d'un générateur aléatoire dérivé de la graine"""
+    names, weights = list(mix), list(mix.values())
+    samples = defaultdict(list)
+    status_codes = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    counter_lock = threading.Lock()
+    counter_state = [0]
+
+    def counter():
+        while True:
+            with counter_lock:
+                counter_state[0] += 1
+                yield counter_state[0]
+
+    start = time.monotonic()
+    measure_from = start + args.warmup
+    stop_at = measure_from + args.duration
+
+    def worker(worker_index):
+        rng = random.Random(f'{args.seed}:{worker_index}')
+        session = requests.Session()
+        ids = counter()
+        while True:
+            now = time.monotonic()
+            if now >= stop_at or (args.requests and sum(len(v) for v in samples.values()) >= args.requests):
+                return
+            name = rng.choices(names, weights)[0]
+            org = rng.choice(orgs)
+            method, path, options = OPERATIONS[name](org, rng, ids)
+            headers = {'Authorization': f"Bearer {org['token']}"}
+            measured = now >= measure_from
+            began = time.perf_counter()
+            try:
+                response = session.request(method, api_url + path, headers=headers, timeout=args.timeout, **options)
+                status, ok = response.status_code, response.status_code < 400
+            except requests.RequestException:
+                status, ok = 'exception', False
+            latency = (time.perf_counter() - began) * 1000
+            if measured:
+                with lock:
+                    samples[name].append((latency, ok))
+                    status_codes[name][str(status)] += 1
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = max(min(time.monotonic(), stop_at) - measure_from, 1e-9)
+    return samples, status_codes, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orgs', type=int, default=4)
+    parser.add_argument('--customers-per-org', type=int, default=2000)
+    parser.add_argument('--campaigns-per-org', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='durée mesurée (secondes)')
+    parser.add_argument('--warmup', type=float, default=3, help='préchauffage non mesuré (secondes)')
+    parser.add_argument('--requests', type=int, default=0, help='arrêt après N requêtes mesurées (0 = durée)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='poids par opération: nom=poids,...')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--ai-latency-ms', type=float, default=50, help='latence simulée du modèle')
+    parser.add_argument('--api-command', default=None,
+                        help="commande de démarrage de l'API ({port} remplacé), ex: gunicorn -w 4 -b 127.0.0.1:{port} src.main:app")
+    parser.add_argument('--api-url', default=None, help='API déjà démarrée (avec --no-boot)')
+    parser.add_argument('--no-boot', action='store_true', help='ne pas démarrer les services')
+    parser.add_argument('--output', default=None, help='fichier JSON de résultats (sinon sortie standard)')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='ai4local_loadtest_')
+    processes = []
+    try:
+        if args.no_boot:
+            if not args.api_url or not os.getenv('DATABASE_URL'):
+                raise SystemExit('--no-boot nécessite --api-url et DATABASE_URL')
+            api_url, database_url = args.api_url.rstrip('/'), os.environ['DATABASE_URL']
+        else:
+            processes, api_url, database_url = boot_services(args, workdir)
+
+        seed_started = time.perf_counter()
+        orgs = seed(args, api_url, database_url, rng)
+        seed_seconds = time.perf_counter() - seed_started
+
+        samples, status_codes, elapsed = run_workload(args, api_url, orgs, mix)
+    finally:
+        stop_services(processes)
+
+    all_samples = [sample for values in samples.values() for sample in values]
+    result = {
+        'meta': dict(
+            git_revision(),
+            started_at=datetime.utcnow().isoformat(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            workdir=workdir
+        ),
+        'config': {
+            'orgs': args.orgs,
+            'customers_per_org': args.customers_per_org,
+            'campaigns_per_org': args.campaigns_per_org,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'seed': args.seed,
+            'ai_latency_ms': args.ai_latency_ms,
+            'mix': mix,
+            'api_command': args.api_command
+        },
+        'seed_seconds': round(seed_seconds, 2),
+        'measured_seconds': round(elapsed, 2),
+        'total': summarize(all_samples, elapsed),
+        'endpoints': {
+            name: dict(summarize(samples[name], elapsed), status_codes=dict(status_codes[name]))
+            for name in sorted(samples)
+        }
+    }
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+if __name__ == '__main__':
+    main()
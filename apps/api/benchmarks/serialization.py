@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la sérialisation des listes: to_dict() + jsonify vs src.serializers
+
+    cd apps/api
+    python benchmarks/serialization.py --rows 100 --repeat 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from src.models.user import db, Organization, Customer, Campaign
+from src.serializers import customer_serializer, campaign_serializer, json_response
+
+def seed(rows):
+    org = Organization(name='Benchmark')
+    db.session.add(org)
+    db.session.flush()
+    db.session.execute(db.insert(Customer), [
+        {
+            'org_id': org.id,
+            'name': f'Client {i}',
+            'phone': f'+26134{i:07d}',
+            'email': f'client{i}@example.mg',
+            'tags': json.dumps(['vip', 'antananarivo', f'segment-{i % 7}']),
+            'extra_data': json.dumps({'source': 'import', 'score': i % 100, 'notes': 'Client fidèle'})
+        }
+        for i in range(rows)
+    ])
+    db.session.execute(db.insert(Campaign), [
+        {
+            'org_id': org.id,
+            'title': f'Campagne {i}',
+            'description': 'Description de campagne ' * 10,
+            'draft_content': 'Brouillon ' * 50,
+            'generated_content': 'Contenu généré ' * 50,
+            'target_audience': json.dumps(['vip']),
+            'status': 'draft',
+            'campaign_type': 'sms',
+            'extra_data': json.dumps({'budget': 1000})
+        }
+        for i in range(rows)
+    ])
+    db.session.commit()
+    return org.id
+
+def bench(label, fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    return {'path': label, 'ms_per_page': round(elapsed * 1000, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100, help='lignes par page')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+
+    results = []
+    with app.test_request_context():
+        db.create_all()
+        org_id = seed(args.rows)
+
+        for model, key, serializer in ((Customer, 'customers', customer_serializer),
+                                       (Campaign, 'campaigns', campaign_serializer)):
+            def legacy():
+                rows = model.query.filter_by(org_id=org_id).order_by(model.created_at.desc()).limit(args.rows).all()
+                return jsonify({key: [row.to_dict() for row in rows]}).get_data()
+
+            def fast():
+                rows = model.query.filter_by(org_id=org_id).with_entities(*serializer.columns) \
+                    .order_by(model.created_at.desc()).limit(args.rows).all()
+                return json_response({key: serializer.serialize(rows)}).get_data()
+
+            legacy_result = bench(f'{key}: to_dict + jsonify', legacy, args.repeat)
+            fast_result = bench(f'{key}: serializers', fast, args.repeat)
+            fast_result['speedup'] = round(legacy_result['ms_per_page'] / fast_result['ms_per_page'], 2)
+            results.extend([legacy_result, fast_result])
+
+            assert json.loads(legacy()) == json.loads(fast()), 'Les deux chemins doivent produire le même JSON'
+
+    print(json.dumps({'rows_per_page': args.rows, 'results': results}, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
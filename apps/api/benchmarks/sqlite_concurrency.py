@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark du débit lecture/écriture concurrent sur SQLite: journal par défaut vs WAL + pragmas
+
+Des threads lecteurs paginent les clients d'une organisation pendant que des threads
+écrivains insèrent et valident des clients, pendant une durée fixe.
+
+    cd apps/api
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --seconds 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from src.database import apply_sqlite_pragmas, sqlite_pragmas
+from src.models.user import db
+
+def run(mode, args):
+    path = os.path.join(tempfile.mkdtemp(prefix='ai4local_sqlite_'), 'bench.db')
+    engine = create_engine(
+        f'sqlite:///{path}',
+        poolclass=QueuePool,
+        pool_size=args.readers + args.writers,
+        connect_args={'check_same_thread': False}
+    )
+    if mode == 'wal':
+        event.listen(engine, 'connect', lambda conn, record: apply_sqlite_pragmas(conn, sqlite_pragmas()))
+    else:
+        # Comportement historique: journal rollback, synchronous=FULL
+        event.listen(engine, 'connect', lambda conn, record: apply_sqlite_pragmas(conn, {'busy_timeout': 5000}))
+
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO organizations (id, name, plan) VALUES (1, 'Benchmark', 'free')"))
+        conn.execute(
+            text("INSERT INTO customers (org_id, name, phone, tags, extra_data, created_at, updated_at) "
+                 "VALUES (1, :name, :phone, '[\"vip\"]', '{}', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"),
+            [{'name': f'Client {i}', 'phone': f'+26134{i:07d}'} for i in range(args.rows)]
+        )
+
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text(
+                        "SELECT id, name, phone, tags FROM customers WHERE org_id = 1 "
+                        "ORDER BY created_at DESC LIMIT 20"
+                    )).fetchall()
+                    conn.execute(text("SELECT count(*) FROM customers WHERE org_id = 1")).scalar()
+                key = 'reads'
+            except OperationalError:
+                key = 'errors'
+            with lock:
+                counts[key] += 1
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(
+                        "INSERT INTO customers (org_id, name, tags, extra_data, created_at, updated_at) "
+                        "VALUES (1, :name, '[]', '{}', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+                    ), {'name': f'Nouveau {i}'})
+                key = 'writes'
+            except OperationalError:
+                key = 'errors'
+            i += 1
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        'mode': mode,
+        'reads_per_second': round(counts['reads'] / args.seconds, 1),
+        'writes_per_second': round(counts['writes'] / args.seconds, 1),
+        'errors': counts['errors']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=20000, help='clients insérés avant la mesure')
+    args = parser.parse_args()
+
+    results = [run('default', args), run('wal', args)]
+    print(json.dumps({
+        'readers': args.readers,
+        'writers': args.writers,
+        'seconds': args.seconds,
+        'results': results
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
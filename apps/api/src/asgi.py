@@ -0,0 +1,63 @@
+"""Point d'entrée ASGI de l'API (production): uvicorn src.asgi:app
+
+Les proxys AI (/api/ai/generate-text, /embed, /semantic-search, /optimize-content)
+sont des vues asynchrones qui partagent un client httpx: pendant l'attente du
+service AI, aucun thread n'est occupé. Toutes les autres routes (REST, GraphQL,
+statut, /api/ai/status...) restent l'application Flask, exécutée dans le pool de
+threads de WSGIMiddleware (40 threads par worker par défaut).
+
+    cd apps/api
+    uvicorn src.asgi:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+import os
+import sys
+from contextlib import asynccontextmanager
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.routing import Mount
+
+from src.main import CORS_EXPOSE_HEADERS, CORS_ORIGINS, app as flask_app
+from src.routes.ai_async import routes as ai_routes
+
+@asynccontextmanager
+async def lifespan(app):
+    # Sondes de santé démarrées dans chaque worker (les routes asynchrones ne passent pas par Flask)
+    prober = flask_app.extensions.get('health')
+    if prober is not None:
+        prober.ensure_started()
+    yield
+    await flask_app.extensions['ai_client'].aclose()
+
+class AsyncRoutesCORS:
+    """CORS des routes asynchrones seulement: l'application Flask montée garde Flask-CORS"""
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = set(paths)
+        self.cors = CORSMiddleware(app, allow_origins=CORS_ORIGINS, allow_methods=['*'],
+                                   allow_headers=['*'], expose_headers=CORS_EXPOSE_HEADERS)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] in self.paths:
+            await self.cors(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+def create_asgi_app():
+    """Routes AI asynchrones, puis l'application Flask pour tout le reste"""
+    asgi_app = Starlette(
+        routes=ai_routes + [Mount('/', app=WSGIMiddleware(flask_app))],
+        # Mêmes origines et en-têtes exposés que Flask-CORS (src/main.py), un seul en-tête par réponse
+        middleware=[Middleware(AsyncRoutesCORS, paths=[route.path for route in ai_routes])],
+        lifespan=lifespan
+    )
+    asgi_app.state.flask_app = flask_app
+    return asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,62 @@
+"""Configuration du moteur de base de données (DATABASE_URL, pool, pragmas SQLite)"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+def database_uri(default_sqlite_path):
+    """URI de la base: DATABASE_URL si définie, sinon fichier SQLite local"""
+    uri = os.getenv('DATABASE_URL')
+    if not uri:
+        os.makedirs(os.path.dirname(default_sqlite_path), exist_ok=True)
+        return f"sqlite:///{default_sqlite_path}"
+    # Forme courte utilisée par certains hébergeurs
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def engine_options(uri):
+    """Options du moteur SQLAlchemy selon la base utilisée"""
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '20')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True
+    }
+
+def sqlite_pragmas():
+    """Pragmas appliqués à chaque connexion SQLite.
+
+    Le mode WAL permet aux lecteurs de ne plus attendre derrière les écritures;
+    synchronous=NORMAL est sûr en WAL et évite un fsync par transaction.
+    """
+    return {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        # Valeur négative: taille en Kio (64 Mio par défaut)
+        'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536')),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        'temp_store': 'MEMORY'
+    }
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas=None):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in (pragmas or sqlite_pragmas()).items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+def _on_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_connection)
+
+def install_sqlite_pragmas(target=Engine):
+    """Applique les pragmas à chaque nouvelle connexion SQLite (tous les moteurs par défaut)"""
+    if not event.contains(target, 'connect', _on_connect):
+        event.listen(target, 'connect', _on_connect)
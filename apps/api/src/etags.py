@@ -0,0 +1,60 @@
+"""ETags et requêtes conditionnelles (If-None-Match -> 304 Not Modified)
+
+Les ressources individuelles reçoivent un ETag fort dérivé de (id, updated_at);
+les listes un ETag faible dérivé d'un agrégat (nombre de lignes, max(updated_at),
+max(id)) sur le même filtre. Une requête de sondage inchangée ne coûte donc
+qu'une lecture indexée et aucun corps de réponse.
+"""
+import hashlib
+
+from flask import request, current_app
+
+from src.models.user import db
+
+# À incrémenter si la représentation JSON des ressources change
+REPRESENTATION_VERSION = '1'
+
+def compute_etag(*parts):
+    """Empreinte des éléments qui déterminent la représentation"""
+    digest = hashlib.sha1(REPRESENTATION_VERSION.encode())
+    digest.update(request.path.encode())
+    digest.update(request.query_string)
+    for part in parts:
+        digest.update(b'\x00')
+        digest.update(str(part).encode())
+    return digest.hexdigest()
+
+def resource_etag(model, resource_id, org_id):
+    """ETag fort d'une ressource, None si elle n'existe pas"""
+    updated_at = db.session.query(model.updated_at).filter(
+        model.id == resource_id,
+        model.org_id == org_id
+    ).first()
+    if updated_at is None:
+        return None
+    return compute_etag(resource_id, updated_at[0])
+
+def list_etag(query, model):
+    """ETag faible d'une liste à partir d'un agrégat sur la requête filtrée"""
+    total, last_updated, last_id = query.with_entities(
+        db.func.count(model.id),
+        db.func.max(model.updated_at),
+        db.func.max(model.id)
+    ).order_by(None).first()
+    return compute_etag(total, last_updated, last_id)
+
+def not_modified(etag, weak=False):
+    """Réponse 304 si le client possède déjà cette version, sinon None"""
+    if etag is None or not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    return with_etag(response, etag, weak)
+
+def with_etag(response, etag, weak=False):
+    """Ajoute l'ETag à une réponse (ou à un tuple (réponse, statut))"""
+    if isinstance(response, tuple):
+        response = current_app.make_response(response)
+    response.set_etag(etag, weak=weak)
+    # Le client doit revalider à chaque sondage
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
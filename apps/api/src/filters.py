@@ -0,0 +1,29 @@
+"""Filtres des listes de clients et de campagnes, partagés par les routes REST et GraphQL"""
+from src.models.user import db, Customer, Campaign
+
+def split_tags(value):
+    """Liste de tags depuis un paramètre 'a,b,c'"""
+    return [tag.strip() for tag in value.split(',') if tag.strip()] if value else []
+
+def filter_customers(query, search=None, tags=None):
+    """Recherche (nom, email, téléphone) et tags (tous requis)"""
+    if search:
+        search_filter = f"%{search}%"
+        query = query.filter(
+            db.or_(
+                Customer.name.ilike(search_filter),
+                Customer.email.ilike(search_filter),
+                Customer.phone.ilike(search_filter)
+            )
+        )
+    for tag in tags or []:
+        query = query.filter(Customer.tags.contains(f'"{tag}"'))
+    return query
+
+def filter_campaigns(query, status=None, campaign_type=None):
+    """Statut et type de campagne"""
+    if status:
+        query = query.filter(Campaign.status == status)
+    if campaign_type:
+        query = query.filter(Campaign.campaign_type == campaign_type)
+    return query
@@ -0,0 +1,306 @@
+"""Génération d'un jeu de données synthétique multi-organisations: python -m src.generate_dataset --orgs 1000 --customers 1000000
+
+Organisations (avec un propriétaire), clients et historique de campagnes pour les tests
+de montée en charge. La taille des organisations suit une loi de Zipf (quelques grosses,
+beaucoup de petites), les tags aussi; les numéros sont au format mobile malgache.
+Les lignes sont écrites par insertions groupées (COPY sur PostgreSQL) et les
+statistiques org_stats sont alimentées dans la même transaction. Même graine, mêmes
+données (dates relatives au jour de génération).
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.models.user import Organization, User, Customer, Campaign, CampaignDispatch
+from src.services import stats
+
+BATCH_SIZE = 10000
+ORG_CHUNK_SIZE = 100
+
+FIRST_NAMES = [
+    'Rakoto', 'Rasoa', 'Rabe', 'Randria', 'Razafy', 'Andry', 'Hery', 'Fanja', 'Tiana', 'Nirina',
+    'Voahirana', 'Haingo', 'Mamy', 'Lova', 'Fidy', 'Toky', 'Njaka', 'Miora', 'Tsiry', 'Onja'
+]
+LAST_NAMES = [
+    'Andrianarisoa', 'Rakotomalala', 'Razanamparany', 'Randrianasolo', 'Rasoanaivo', 'Ravelojaona',
+    'Rakotondrabe', 'Andriamanantena', 'Razafindrakoto', 'Rabemananjara', 'Ramanantsoa', 'Rajaonarison'
+]
+# Du plus fréquent au plus rare
+TAGS = [
+    'client', 'antananarivo', 'nouveau', 'fidele', 'promo', 'vip', 'toamasina', 'fianarantsoa',
+    'mahajanga', 'toliara', 'antsiranana', 'grossiste', 'revendeur', 'inactif', 'mobile_money', 'parrain'
+]
+# Nombre de tags par client: 0 à 4
+TAG_COUNT_WEIGHTS = [30, 35, 20, 10, 5]
+# Préfixes des opérateurs mobiles (Airtel, Orange, Telma, Blueline...)
+PHONE_PREFIXES = ['32', '33', '34', '37', '38']
+PHONE_PREFIX_WEIGHTS = [25, 20, 40, 10, 5]
+CAMPAIGN_TYPES = ['sms', 'facebook', 'whatsapp', 'email']
+CAMPAIGN_TYPE_WEIGHTS = [45, 30, 15, 10]
+PLANS = ['free', 'basic', 'premium']
+PLAN_WEIGHTS = [70, 22, 8]
+
+def zipf_weights(count, skew):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+def _cumulative(weights):
+    total = 0
+    for weight in weights:
+        total += weight
+        yield total
+
+TAG_CUM_WEIGHTS = list(_cumulative(zipf_weights(len(TAGS), 1.0)))
+TAG_COUNT_CUM_WEIGHTS = list(_cumulative(TAG_COUNT_WEIGHTS))
+
+def org_sizes(rng, orgs, total, skew):
+    """Répartit `total` entre `orgs` organisations selon une loi de Zipf, ordre mélangé"""
+    weights = zipf_weights(orgs, skew)
+    scale = total / sum(weights)
+    sizes = [int(weight * scale) for weight in weights]
+    # Plus forts restes pour tomber exactement sur le total
+    remainders = sorted(range(orgs), key=lambda index: weights[index] * scale - sizes[index], reverse=True)
+    for index in remainders[:total - sum(sizes)]:
+        sizes[index] += 1
+    rng.shuffle(sizes)
+    return sizes
+
+def phone_number(rng):
+    prefix = rng.choices(PHONE_PREFIXES, PHONE_PREFIX_WEIGHTS)[0]
+    number = rng.randrange(10 ** 7)
+    return f'+261 {prefix} {number // 100000:02d} {number // 100 % 1000:03d} {number % 100:02d}'
+
+def customer_rows(rng, org_id, count, now, days):
+    """Clients d'une organisation, du plus ancien au plus récent"""
+    span = days * 86400
+    offsets = sorted((rng.random() * span for _ in range(count)), reverse=True)
+    for index, offset in enumerate(offsets):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        tag_count = rng.choices(range(len(TAG_COUNT_WEIGHTS)), cum_weights=TAG_COUNT_CUM_WEIGHTS)[0]
+        tags = list(dict.fromkeys(rng.choices(TAGS, cum_weights=TAG_CUM_WEIGHTS, k=tag_count)))
+        created_at = now - timedelta(seconds=offset)
+        yield {
+            'org_id': org_id,
+            'name': f'{first} {last}',
+            'phone': phone_number(rng) if rng.random() < 0.95 else None,
+            'email': f'{first.lower()}.{last.lower()}{index}@example.mg' if rng.random() < 0.7 else None,
+            'tags': json.dumps(tags),
+            'extra_data': json.dumps({'source': rng.choice(['import', 'manuel', 'facebook'])}),
+            'created_at': created_at,
+            'updated_at': created_at
+        }
+
+def campaign_rows(rng, org_id, count, now, days):
+    """Historique de campagnes: envoyées ou en échec dans le passé, planifiées ou brouillons récents"""
+    for index in range(count):
+        created_at = now - timedelta(seconds=rng.random() * days * 86400)
+        roll = rng.random()
+        if roll < 0.65:
+            status, schedule_at = 'sent', created_at + timedelta(hours=rng.randint(1, 72))
+        elif roll < 0.7:
+            status, schedule_at = 'failed', created_at + timedelta(hours=rng.randint(1, 72))
+        elif roll < 0.8:
+            status, schedule_at = 'scheduled', now + timedelta(hours=rng.randint(1, 24 * 14))
+        else:
+            status, schedule_at = 'draft', None
+        if schedule_at is not None and status in ('sent', 'failed') and schedule_at > now:
+            schedule_at = now
+        campaign_type = rng.choices(CAMPAIGN_TYPES, CAMPAIGN_TYPE_WEIGHTS)[0]
+        title = f'Campagne {campaign_type} n°{index + 1}'
+        yield {
+            'org_id': org_id,
+            'title': title,
+            'description': f'{title} générée pour les tests de charge',
+            'draft_content': None,
+            'generated_content': f'Promotion spéciale pour nos clients, offre n°{index + 1}' if status != 'draft' else None,
+            'target_audience': json.dumps(rng.sample(TAGS[:8], rng.randint(0, 2))),
+            'schedule_at': schedule_at,
+            'status': status,
+            'campaign_type': campaign_type,
+            'extra_data': '{}',
+            'created_at': created_at,
+            'updated_at': schedule_at if status in ('sent', 'failed') else created_at
+        }
+
+def _copy(connection, table, rows):
+    """COPY ... FROM STDIN (PostgreSQL): une seule instruction par lot"""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY {table.name} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer
+        )
+    finally:
+        cursor.close()
+
+def insert_rows(connection, table, rows, batch_size=BATCH_SIZE):
+    """Insère un itérable de lignes par lots, retourne le nombre de lignes"""
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            count += _insert_batch(connection, table, batch)
+            batch = []
+    if batch:
+        count += _insert_batch(connection, table, batch)
+    return count
+
+def _insert_batch(connection, table, rows):
+    if connection.dialect.name == 'postgresql':
+        _copy(connection, table, rows)
+    else:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+def _max_id(connection, table):
+    return connection.execute(table.select().with_only_columns(table.c.id).order_by(table.c.id.desc()).limit(1)).scalar() or 0
+
+def create_orgs(connection, rng, count, password_hash, now, days):
+    """Crée les organisations et leur propriétaire, retourne les identifiants (ordre de création)"""
+    orgs, users = Organization.__table__, User.__table__
+    # Identifiants relus après insertion (COPY ne retourne rien): outil à lancer hors trafic
+    after_id = _max_id(connection, orgs)
+    created = [now - timedelta(seconds=rng.random() * days * 86400) for _ in range(count)]
+    insert_rows(connection, orgs, (
+        {'name': f'Entreprise {rng.choice(LAST_NAMES)} {index + 1}', 'plan': rng.choices(PLANS, PLAN_WEIGHTS)[0],
+         'created_at': created_at}
+        for index, created_at in enumerate(created)
+    ))
+    org_ids = [row[0] for row in connection.execute(
+        orgs.select().with_only_columns(orgs.c.id).where(orgs.c.id > after_id).order_by(orgs.c.id)
+    )]
+    insert_rows(connection, users, (
+        {'email': f'owner{org_id}@example.mg', 'name': f'Propriétaire {org_id}', 'password_hash': password_hash,
+         'role': 'OWNER', 'org_id': org_id, 'created_at': created_at, 'is_active': True}
+        for org_id, created_at in zip(org_ids, created)
+    ))
+    return org_ids
+
+def populate(connection, rng, sizes, now, days, batch_size=BATCH_SIZE):
+    """Clients, campagnes et envois pour {org_id: (clients, campagnes)}.
+
+    Retourne (compteurs de lignes, variations des statistiques par organisation).
+    """
+    customers, campaigns, dispatches = Customer.__table__, Campaign.__table__, CampaignDispatch.__table__
+    counts = Counter()
+    deltas = Counter()
+
+    def counted_customers(org_id, count):
+        for row in customer_rows(rng, org_id, count, now, days):
+            deltas[(org_id, stats.CUSTOMERS_TOTAL, '')] += 1
+            for tag in json.loads(row['tags']):
+                deltas[(org_id, stats.CUSTOMERS_BY_TAG, tag)] += 1
+            yield row
+
+    def counted_campaigns(org_id, count):
+        for row in campaign_rows(rng, org_id, count, now, days):
+            deltas[(org_id, stats.CAMPAIGNS_BY_STATUS, row['status'])] += 1
+            deltas[(org_id, stats.CAMPAIGNS_BY_TYPE, row['campaign_type'])] += 1
+            yield row
+
+    after_campaign_id = _max_id(connection, campaigns)
+    for org_id, (customer_count, campaign_count) in sizes.items():
+        counts['customers'] += insert_rows(connection, customers, counted_customers(org_id, customer_count), batch_size)
+        counts['campaigns'] += insert_rows(connection, campaigns, counted_campaigns(org_id, campaign_count), batch_size)
+
+    # Envois des campagnes terminées (audience proportionnelle à la taille de l'organisation)
+    finished = connection.execute(
+        campaigns.select()
+        .with_only_columns(campaigns.c.id, campaigns.c.org_id, campaigns.c.status, campaigns.c.schedule_at)
+        .where(campaigns.c.id > after_campaign_id, campaigns.c.status.in_(('sent', 'failed')))
+        .order_by(campaigns.c.id)
+    ).fetchall()
+
+    def dispatch_rows():
+        for campaign_id, org_id, status, schedule_at in finished:
+            recipients = max(1, int(sizes[org_id][0] * rng.uniform(0.1, 1.0)))
+            failed = int(recipients * rng.uniform(0, 0.05)) if status == 'sent' else int(recipients * rng.uniform(0.3, 1.0))
+            yield {
+                'campaign_id': campaign_id,
+                'org_id': org_id,
+                'status': 'completed' if status == 'sent' else 'failed',
+                'worker_id': 'generate_dataset',
+                'last_customer_id': 0,
+                'recipients_count': recipients,
+                'sent_count': recipients - failed,
+                'failed_count': failed,
+                'error': 'Fournisseur indisponible' if status == 'failed' else None,
+                'started_at': schedule_at,
+                'heartbeat_at': schedule_at,
+                'finished_at': schedule_at + timedelta(seconds=recipients // 50 + 1)
+            }
+
+    counts['dispatches'] += insert_rows(connection, dispatches, dispatch_rows(), batch_size)
+    return counts, deltas
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des organisations, clients et campagnes synthétiques")
+    parser.add_argument('--orgs', type=int, default=1000, help="nombre d'organisations")
+    parser.add_argument('--customers', type=int, default=1000000, help='nombre total de clients')
+    parser.add_argument('--campaigns-per-org', type=float, default=20, help='campagnes par organisation (moyenne)')
+    parser.add_argument('--skew', type=float, default=1.1, help='exposant de Zipf de la taille des organisations')
+    parser.add_argument('--days', type=int, default=365, help="profondeur de l'historique (jours)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password', default='password123', help='mot de passe des propriétaires (owner<org_id>@example.mg)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+    if args.orgs < 1 or args.customers < 0:
+        parser.error('--orgs doit être >= 1 et --customers >= 0')
+
+    from werkzeug.security import generate_password_hash
+    from src.main import app
+    from src.migrate import upgrade
+    from src.models.user import db
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    customer_sizes = org_sizes(rng, args.orgs, args.customers, args.skew)
+    # Nombre de campagnes croissant avec la taille de l'organisation
+    mean_size = max(args.customers / args.orgs, 1)
+    campaign_sizes = [
+        max(0, int(rng.gauss(args.campaigns_per_org, args.campaigns_per_org / 3) * min(2.0, (size / mean_size) ** 0.25)))
+        for size in customer_sizes
+    ]
+
+    started = time.perf_counter()
+    totals = Counter()
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+        password_hash = generate_password_hash(args.password)
+        for start in range(0, args.orgs, ORG_CHUNK_SIZE):
+            end = min(start + ORG_CHUNK_SIZE, args.orgs)
+            connection = db.session.connection()
+            org_ids = create_orgs(connection, rng, end - start, password_hash, now, args.days)
+            sizes = dict(zip(org_ids, zip(customer_sizes[start:end], campaign_sizes[start:end])))
+            counts, deltas = populate(connection, rng, sizes, now, args.days, args.batch_size)
+            for org_id in org_ids:
+                deltas[(org_id, stats.INITIALIZED, '')] = 1
+            stats.record_deltas(db.session, deltas)
+            db.session.commit()
+            totals.update(counts)
+            totals['orgs'] += len(org_ids)
+            elapsed = time.perf_counter() - started
+            print(f"{totals['orgs']}/{args.orgs} organisations, {totals['customers']} clients "
+                  f"({totals['customers'] / elapsed:,.0f}/s)", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"Jeu de données généré en {elapsed:.1f}s: {totals['orgs']} organisations, "
+          f"{totals['customers']} clients, {totals['campaigns']} campagnes, {totals['dispatches']} envois")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Exécution des requêtes GraphQL: cache des documents, limites de coût et requêtes persistées
+
+- `CachedGraphQLBackend` garde en mémoire (LRU, clé = sha256 de la requête) les
+  documents déjà analysés et validés: une requête répétée n'est plus ni re-parsée
+  ni re-validée.
+- Avant exécution, la profondeur et le coût estimé de l'opération sont calculés;
+  une requête au-delà des limites est rejetée sans toucher la base.
+- `PageSizeMiddleware` plafonne `first`/`last` sur les connexions et impose une
+  taille de page par défaut quand aucune n'est demandée.
+- `GraphQLEndpoint` accepte les requêtes persistées (protocole APQ d'Apollo): le
+  client n'envoie que `extensions.persistedQuery.sha256Hash`.
+"""
+import json
+import threading
+from collections import OrderedDict
+from functools import partial
+from hashlib import sha256
+
+from flask import request
+from flask_graphql import GraphQLView
+from graphql import GraphQLError
+from graphql.backend.base import GraphQLBackend, GraphQLDocument
+from graphql.execution import ExecutionResult, execute
+from graphql.language import ast
+from graphql.language.parser import parse
+from graphql.type.definition import GraphQLList, get_named_type, get_nullable_type
+from graphql.validation import validate
+from graphql_server import HttpQueryError
+
+class QueryLimits:
+    """Limites appliquées à chaque opération"""
+
+    def __init__(self, max_depth=10, max_cost=10000, default_page_size=50, max_page_size=100):
+        self.max_depth = max_depth
+        self.max_cost = max_cost
+        self.default_page_size = default_page_size
+        self.max_page_size = max_page_size
+
+    def page_size(self, value):
+        if not value or value <= 0:
+            return self.default_page_size
+        return min(value, self.max_page_size)
+
+def query_hash(query):
+    return sha256(query.encode('utf-8')).hexdigest()
+
+class LRUCache:
+    """Dictionnaire borné, thread-safe, évinçant l'entrée la moins récemment utilisée"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+def _is_paginated(field):
+    """Champ retournant une liste ou une connexion (coût multiplié par la taille de page)"""
+    if 'first' in field.args:
+        return True
+    return isinstance(get_nullable_type(field.type), GraphQLList) \
+        and not hasattr(get_named_type(field.type), 'serialize')
+
+def _argument_value(selection, name, variables):
+    for argument in selection.arguments or []:
+        if argument.name.value != name:
+            continue
+        value = argument.value
+        if isinstance(value, ast.Variable):
+            return (variables or {}).get(value.name.value)
+        if isinstance(value, ast.IntValue):
+            return int(value.value)
+    return None
+
+class QueryAnalyzer:
+    """Profondeur et coût estimé d'une opération (1 par champ, multiplié par la taille de page des listes)"""
+
+    def __init__(self, schema, limits):
+        self.schema = schema
+        self.limits = limits
+
+    def analyze(self, document_ast, operation_name=None, variables=None):
+        fragments = {}
+        operation = None
+        for definition in document_ast.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                fragments[definition.name.value] = definition
+            elif isinstance(definition, ast.OperationDefinition):
+                if operation_name is None or (definition.name and definition.name.value == operation_name):
+                    operation = operation or definition
+        if operation is None:
+            return 0, 0
+
+        root_type = {
+            'query': self.schema.get_query_type(),
+            'mutation': self.schema.get_mutation_type(),
+            'subscription': self.schema.get_subscription_type()
+        }.get(operation.operation)
+        return self._selection_set(root_type, operation.selection_set, fragments, variables, 0, frozenset())
+
+    def _selection_set(self, parent_type, selection_set, fragments, variables, depth, spread):
+        cost, max_depth = 0, depth
+        if parent_type is None or selection_set is None:
+            return cost, max_depth
+
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                name = selection.name.value
+                fields = getattr(parent_type, 'fields', {})
+                # Introspection (GraphiQL) et champs inconnus: non comptés
+                if name.startswith('__') or name not in fields:
+                    continue
+                field = fields[name]
+                child_cost, child_depth = self._selection_set(
+                    get_named_type(field.type), selection.selection_set,
+                    fragments, variables, depth + 1, spread
+                )
+                multiplier = 1
+                # Les arêtes d'une connexion sont déjà comptées par la taille de page de la connexion
+                if _is_paginated(field) and 'pageInfo' not in fields:
+                    requested = _argument_value(selection, 'first', variables) \
+                        or _argument_value(selection, 'last', variables)
+                    multiplier = self.limits.page_size(requested)
+                cost += 1 + multiplier * child_cost
+                max_depth = max(max_depth, child_depth if selection.selection_set else depth + 1)
+            else:
+                if isinstance(selection, ast.FragmentSpread):
+                    fragment_name = selection.name.value
+                    fragment = fragments.get(fragment_name)
+                    if fragment is None or fragment_name in spread:
+                        continue
+                    fragment_spread = spread | {fragment_name}
+                else:
+                    fragment = selection
+                    fragment_spread = spread
+                fragment_type = parent_type
+                if fragment.type_condition is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                child_cost, child_depth = self._selection_set(
+                    fragment_type, fragment.selection_set, fragments, variables, depth, fragment_spread
+                )
+                cost += child_cost
+                max_depth = max(max_depth, child_depth)
+        return cost, max_depth
+
+    def check(self, document_ast, operation_name=None, variables=None):
+        cost, depth = self.analyze(document_ast, operation_name, variables)
+        if depth > self.limits.max_depth:
+            raise GraphQLError(f'Requête trop profonde: {depth} niveaux (maximum {self.limits.max_depth})')
+        if cost > self.limits.max_cost:
+            raise GraphQLError(f'Requête trop coûteuse: coût estimé {cost} (maximum {self.limits.max_cost})')
+        return cost, depth
+
+class CachedGraphQLBackend(GraphQLBackend):
+    """Backend graphql-core mettant en cache les documents analysés et validés"""
+
+    def __init__(self, limits=None, cache_size=500, executor=None):
+        self.limits = limits or QueryLimits()
+        self.documents = LRUCache(cache_size)
+        self.execute_params = {'executor': executor} if executor else {}
+        self._analyzers = {}
+
+    def analyzer(self, schema):
+        analyzer = self._analyzers.get(schema)
+        if analyzer is None:
+            analyzer = self._analyzers[schema] = QueryAnalyzer(schema, self.limits)
+        return analyzer
+
+    def document_from_string(self, schema, document_string):
+        key = (id(schema), query_hash(document_string))
+        document = self.documents.get(key)
+        if document is None:
+            document_ast = parse(document_string)
+            errors = validate(schema, document_ast)
+            document = GraphQLDocument(
+                schema=schema,
+                document_string=document_string,
+                document_ast=document_ast,
+                execute=partial(self._execute, schema, document_ast, errors)
+            )
+            self.documents.set(key, document)
+        return document
+
+    def _execute(self, schema, document_ast, validation_errors, *args, **kwargs):
+        if validation_errors:
+            return ExecutionResult(errors=validation_errors, invalid=True)
+        try:
+            self.analyzer(schema).check(
+                document_ast, kwargs.get('operation_name'), kwargs.get('variable_values')
+            )
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e], invalid=True)
+        kwargs.pop('validate', None)
+        return execute(schema, document_ast, *args, **dict(self.execute_params, **kwargs))
+
+class PageSizeMiddleware:
+    """Plafonne la taille de page des connexions (first/last)"""
+
+    def __init__(self, limits):
+        self.limits = limits
+
+    def resolve(self, next, root, info, **args):
+        field = info.parent_type.fields.get(info.field_name)
+        if field is not None and 'first' in field.args:
+            if not args.get('first') and not args.get('last'):
+                args['first'] = self.limits.default_page_size
+            for name in ('first', 'last'):
+                if args.get(name):
+                    args[name] = self.limits.page_size(args[name])
+        return next(root, info, **args)
+
+class PersistedQueries:
+    """Stock des requêtes persistées: hash sha256 -> texte de la requête.
+
+    Les requêtes enregistrées à la volée (APQ) sont gardées en mémoire par
+    processus; un fichier JSON {hash: requête} peut pré-charger une liste fixe.
+    En mode `only`, seules les requêtes de cette liste sont acceptées.
+    """
+
+    def __init__(self, path=None, only=False, cache_size=1000):
+        self.only = only
+        self.registered = LRUCache(cache_size)
+        self.allowlist = {}
+        if path:
+            with open(path, encoding='utf-8') as f:
+                self.allowlist = json.load(f)
+
+    def lookup(self, hash_value):
+        return self.allowlist.get(hash_value) or (None if self.only else self.registered.get(hash_value))
+
+    def resolve(self, data, args):
+        """Remplace le hash par le texte de la requête dans les paramètres reçus"""
+        extensions = data.get('extensions') or args.get('extensions')
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpQueryError(400, 'Extensions invalides (JSON attendu)')
+        persisted = (extensions or {}).get('persistedQuery') or {}
+        hash_value = persisted.get('sha256Hash')
+        query = data.get('query') or args.get('query')
+
+        if not hash_value:
+            if query and self.only:
+                raise HttpQueryError(400, 'Seules les requêtes persistées sont acceptées')
+            return data
+
+        if query:
+            if query_hash(query) != hash_value:
+                raise HttpQueryError(400, 'Le hash ne correspond pas à la requête')
+            if self.only and hash_value not in self.allowlist:
+                raise HttpQueryError(400, 'Requête persistée inconnue')
+            self.registered.set(hash_value, query)
+            return data
+
+        query = self.lookup(hash_value)
+        if query is None:
+            # Statut 200 et message attendus par les clients APQ pour renvoyer la requête complète
+            raise HttpQueryError(200, 'PersistedQueryNotFound')
+        return dict(data, query=query)
+
+class GraphQLEndpoint(GraphQLView):
+    """Vue GraphQL avec prise en charge des requêtes persistées"""
+    persisted_queries = None
+    # Contexte des résolveurs (GraphQLView l'ignore et passe la requête Flask)
+    context = None
+
+    def get_context(self):
+        if self.context is None:
+            return super().get_context()
+        # Copie par requête: les résolveurs ne modifient pas le contexte partagé
+        return dict(self.context)
+
+    def parse_body(self):
+        data = super().parse_body()
+        if self.persisted_queries is None or isinstance(data, list):
+            return data
+        return self.persisted_queries.resolve(dict(data), request.args)
@@ -0,0 +1,125 @@
+"""Chargeurs par lots (DataLoader) pour les résolveurs GraphQL
+
+Chaque requête HTTP dispose de ses propres chargeurs (stockés sur flask.g): les
+clés demandées pendant l'exécution d'un niveau de la requête GraphQL sont
+regroupées en une seule requête SQL (`WHERE ... IN (...)`). Une requête imbriquée
+comme `allOrganizations { customers campaigns }` exécute ainsi un nombre constant
+de requêtes SQL, quel que soit le nombre d'organisations retournées; seule la page
+demandée (`first`/`after`) des enfants de chaque organisation est lue.
+"""
+from collections import defaultdict
+
+from flask import g
+from graphql import GraphQLError
+from graphql_relay.connection.arrayconnection import get_offset_with_default
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from src.models.user import db, User, Organization, Customer, Campaign
+
+# Taille maximale d'une liste IN (même découpage que le chargement `selectin`)
+IN_CHUNK_SIZE = 500
+
+def _chunks(keys):
+    keys = list(keys)
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        yield keys[start:start + IN_CHUNK_SIZE]
+
+class ModelLoader(DataLoader):
+    """Charge des lignes par clé primaire"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def batch_load_fn(self, ids):  # pylint: disable=method-hidden
+        by_id = {}
+        for chunk in _chunks(set(ids)):
+            for row in db.session.query(self.model).filter(self.model.id.in_(chunk)):
+                by_id[row.id] = row
+        return Promise.resolve([by_id.get(id) for id in ids])
+
+class ChildrenPage:
+    """Page d'enfants d'un parent: lignes à partir de la position `start` (0 = premier enfant)"""
+
+    def __init__(self, rows, start):
+        self.rows = rows
+        self.start = start
+
+def page_window(args):
+    """Positions (début, fin exclue) des enfants à charger pour les arguments relay.
+
+    Avec `first`, une ligne de plus est chargée pour savoir s'il existe une page
+    suivante. `last` nécessite `before` (sinon il faudrait charger toute la liste).
+    """
+    start = get_offset_with_default(args.get('after'), -1) + 1
+    stop = None
+    if args.get('before'):
+        stop = get_offset_with_default(args['before'], 0)
+    if isinstance(args.get('first'), int):
+        stop = start + args['first'] + 1 if stop is None else min(stop, start + args['first'] + 1)
+    if isinstance(args.get('last'), int):
+        if stop is None:
+            raise GraphQLError('`last` doit être accompagné de `before` ou de `first` sur cette relation')
+        start = max(start, stop - args['last'])
+    if stop is None:
+        raise GraphQLError('`first` est requis sur cette relation')
+    return start, max(start, stop)
+
+class ChildrenLoader(DataLoader):
+    """Charge une page des lignes enfants d'une relation un-à-plusieurs, pour chaque parent.
+
+    Clés: (parent, début, fin). La page est appliquée en SQL (numéro de ligne par
+    parent, ordre des ids): les parents d'un même niveau partagent une requête sans
+    charger tous leurs enfants.
+    """
+
+    def __init__(self, model, foreign_key):
+        super().__init__()
+        self.model = model
+        self.foreign_key = foreign_key
+
+    def load_page(self, parent_id, args):
+        start, stop = page_window(args)
+        return self.load((parent_id, start, stop)).then(lambda rows: ChildrenPage(rows, start))
+
+    def batch_load_fn(self, keys):  # pylint: disable=method-hidden
+        windows = defaultdict(set)
+        for parent_id, start, stop in keys:
+            windows[(start, stop)].add(parent_id)
+
+        children = defaultdict(list)
+        for (start, stop), parent_ids in windows.items():
+            for chunk in _chunks(parent_ids):
+                position = db.func.row_number().over(
+                    partition_by=self.foreign_key, order_by=self.model.id
+                ).label('position')
+                numbered = db.session.query(self.model.id.label('id'), position) \
+                    .filter(self.foreign_key.in_(chunk)) \
+                    .subquery()
+                query = db.session.query(self.model) \
+                    .join(numbered, numbered.c.id == self.model.id) \
+                    .filter(numbered.c.position > start, numbered.c.position <= stop) \
+                    .order_by(self.model.id)
+                for row in query:
+                    children[(getattr(row, self.foreign_key.key), start, stop)].append(row)
+        return Promise.resolve([children.get(key, []) for key in keys])
+
+class Loaders:
+    """Ensemble des chargeurs d'une requête"""
+
+    def __init__(self):
+        self.user = ModelLoader(User)
+        self.organization = ModelLoader(Organization)
+        self.customer = ModelLoader(Customer)
+        self.campaign = ModelLoader(Campaign)
+        self.users_by_org = ChildrenLoader(User, User.org_id)
+        self.customers_by_org = ChildrenLoader(Customer, Customer.org_id)
+        self.campaigns_by_org = ChildrenLoader(Campaign, Campaign.org_id)
+
+def get_loaders():
+    """Chargeurs de la requête courante, créés au premier appel"""
+    loaders = g.get('graphql_loaders')
+    if loaders is None:
+        loaders = g.graphql_loaders = Loaders()
+    return loaders
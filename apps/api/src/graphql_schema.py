@@ -1,23 +1,46 @@
 import graphene
 from graphene import relay
 from graphene_sqlalchemy import SQLAlchemyObjectType, SQLAlchemyConnectionField
+from graphene_sqlalchemy.fields import UnsortedSQLAlchemyConnectionField
 from graphene_sqlalchemy.converter import convert_sqlalchemy_type
-from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy import create_engine
+import base64
+import binascii
 import json
+from collections import Counter
 from datetime import datetime
+from graphql import GraphQLError
+from graphql_relay.connection.arrayconnection import connection_from_list_slice
 
-from src.models.user import db, User, Organization, Customer, Campaign
+from src.models.user import db, User, Organization, Customer, Campaign, CampaignDispatch, SENDING_LOCKED_FIELDS
+from src.services import stats, sync
+from src.graphql_loaders import get_loaders
+from src.graphql_execution import QueryLimits
+from src.filters import filter_customers, filter_campaigns
 
-# Configuration de la session SQLAlchemy pour GraphQL
-# Utiliser la même configuration que l'application Flask
-from flask import current_app
-import os
+# Les résolveurs utilisent la session Flask-SQLAlchemy (db.session): même moteur et
+# même pool que les routes REST, session propre à la requête et retirée au teardown.
+# Les relations et les recherches par id passent par les chargeurs par lots de la
+# requête (src/graphql_loaders.py) pour éviter une requête SQL par objet.
 
-# Utiliser la base de données existante de l'application Flask
-database_path = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
-engine = create_engine(f'sqlite:///{database_path}')
-db_session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+class ChildrenConnectionField(UnsortedSQLAlchemyConnectionField):
+    """Connexion d'une relation chargée par ChildrenLoader: la page est déjà découpée en SQL"""
+    
+    @classmethod
+    def resolve_connection(cls, connection_type, model, info, args, resolved):
+        # Longueur connue jusqu'à la fin de la page (plus une ligne pour has_next_page)
+        connection = connection_from_list_slice(
+            resolved.rows,
+            args,
+            slice_start=resolved.start,
+            list_length=resolved.start + len(resolved.rows),
+            list_slice_length=len(resolved.rows),
+            connection_type=connection_type,
+            pageinfo_type=relay.PageInfo,
+            edge_type=connection_type.Edge,
+        )
+        connection.iterable = resolved.rows
+        connection.length = len(resolved.rows)
+        return connection
 
 # Types GraphQL pour les modèles SQLAlchemy
 
@@ -25,17 +48,37 @@ class UserType(SQLAlchemyObjectType):
     class Meta:
         model = User
         interfaces = (relay.Node, )
+    
+    def resolve_organization(self, info):
+        return get_loaders().organization.load(self.org_id)
 
 class OrganizationType(SQLAlchemyObjectType):
     class Meta:
         model = Organization
         interfaces = (relay.Node, )
+    
+    users = ChildrenConnectionField(lambda: UserType.connection)
+    customers = ChildrenConnectionField(lambda: CustomerType.connection)
+    campaigns = ChildrenConnectionField(lambda: CampaignType.connection)
+    
+    # Relations chargées en une requête pour toutes les organisations du résultat (page en SQL)
+    def resolve_users(self, info, **args):
+        return get_loaders().users_by_org.load_page(self.id, args)
+    
+    def resolve_customers(self, info, **args):
+        return get_loaders().customers_by_org.load_page(self.id, args)
+    
+    def resolve_campaigns(self, info, **args):
+        return get_loaders().campaigns_by_org.load_page(self.id, args)
 
 class CustomerType(SQLAlchemyObjectType):
     class Meta:
         model = Customer
         interfaces = (relay.Node, )
     
+    def resolve_organization(self, info):
+        return get_loaders().organization.load(self.org_id)
+    
     # Champs personnalisés pour les données JSON
     tags = graphene.List(graphene.String)
     metadata = graphene.JSONString()
@@ -55,6 +98,9 @@ class CampaignType(SQLAlchemyObjectType):
         model = Campaign
         interfaces = (relay.Node, )
     
+    def resolve_organization(self, info):
+        return get_loaders().organization.load(self.org_id)
+    
     # Champs personnalisés pour les données JSON
     target_audience = graphene.List(graphene.String)
     metadata = graphene.JSONString()
@@ -69,6 +115,51 @@ class CampaignType(SQLAlchemyObjectType):
             return json.loads(self.metadata)
         return {}
 
+# Pagination par curseur des listes par organisation: tri (created_at, id) décroissant,
+# servi par les index (org_id, created_at, id), sans OFFSET
+
+def page_limits(info):
+    """Limites de la vue /graphql (GRAPHQL_DEFAULT_PAGE_SIZE, GRAPHQL_MAX_PAGE_SIZE), sinon celles par défaut"""
+    limits = info.context.get('limits') if isinstance(info.context, dict) else None
+    return limits or QueryLimits()
+
+def encode_cursor(row):
+    created_at = row.created_at.isoformat() if row.created_at else None
+    return base64.urlsafe_b64encode(json.dumps([created_at, row.id]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise GraphQLError('Curseur invalide')
+
+def keyset_connection(connection_type, model, query, limits, first=None, after=None):
+    first = limits.page_size(first)
+    if after:
+        created_at, row_id = decode_cursor(after)
+        if created_at is None:
+            query = query.filter(model.created_at.is_(None), model.id < row_id)
+        else:
+            query = query.filter(db.or_(
+                model.created_at < created_at,
+                db.and_(model.created_at == created_at, model.id < row_id)
+            ))
+
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(first + 1).all()
+    has_next_page = len(rows) > first
+    edges = [connection_type.Edge(node=row, cursor=encode_cursor(row)) for row in rows[:first]]
+    return connection_type(
+        edges=edges,
+        page_info=relay.PageInfo(
+            has_next_page=has_next_page,
+            has_previous_page=bool(after),
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None
+        )
+    )
+
 # Requêtes GraphQL
 
 class Query(graphene.ObjectType):
@@ -85,30 +176,46 @@ class Query(graphene.ObjectType):
     # Requêtes pour les clients
     all_customers = SQLAlchemyConnectionField(CustomerType.connection)
     customer = graphene.Field(CustomerType, id=graphene.Int())
-    customers_by_org = graphene.List(CustomerType, org_id=graphene.Int(required=True))
+    customers_by_org = graphene.Field(
+        CustomerType.connection,
+        org_id=graphene.Int(required=True),
+        first=graphene.Int(),
+        after=graphene.String(),
+        search=graphene.String(),
+        tags=graphene.List(graphene.String)
+    )
     
     # Requêtes pour les campagnes
     all_campaigns = SQLAlchemyConnectionField(CampaignType.connection)
     campaign = graphene.Field(CampaignType, id=graphene.Int())
-    campaigns_by_org = graphene.List(CampaignType, org_id=graphene.Int(required=True))
+    campaigns_by_org = graphene.Field(
+        CampaignType.connection,
+        org_id=graphene.Int(required=True),
+        first=graphene.Int(),
+        after=graphene.String(),
+        status=graphene.String(),
+        campaign_type=graphene.String()
+    )
     
     def resolve_user(self, info, id):
-        return db_session.query(User).filter(User.id == id).first()
+        return get_loaders().user.load(id)
     
     def resolve_organization(self, info, id):
-        return db_session.query(Organization).filter(Organization.id == id).first()
+        return get_loaders().organization.load(id)
     
     def resolve_customer(self, info, id):
-        return db_session.query(Customer).filter(Customer.id == id).first()
+        return get_loaders().customer.load(id)
     
-    def resolve_customers_by_org(self, info, org_id):
-        return db_session.query(Customer).filter(Customer.org_id == org_id).all()
+    def resolve_customers_by_org(self, info, org_id, first=None, after=None, search=None, tags=None):
+        query = filter_customers(db.session.query(Customer).filter(Customer.org_id == org_id), search, tags)
+        return keyset_connection(CustomerType.connection, Customer, query, page_limits(info), first, after)
     
     def resolve_campaign(self, info, id):
-        return db_session.query(Campaign).filter(Campaign.id == id).first()
+        return get_loaders().campaign.load(id)
     
-    def resolve_campaigns_by_org(self, info, org_id):
-        return db_session.query(Campaign).filter(Campaign.org_id == org_id).all()
+    def resolve_campaigns_by_org(self, info, org_id, first=None, after=None, status=None, campaign_type=None):
+        query = filter_campaigns(db.session.query(Campaign).filter(Campaign.org_id == org_id), status, campaign_type)
+        return keyset_connection(CampaignType.connection, Campaign, query, page_limits(info), first, after)
 
 # Mutations GraphQL
 
@@ -132,8 +239,8 @@ class CreateCustomer(graphene.Mutation):
             tags=json.dumps(tags or []),
             extra_data=json.dumps(metadata or {})
         )
-        db_session.add(customer)
-        db_session.commit()
+        db.session.add(customer)
+        db.session.commit()
         return CreateCustomer(customer=customer)
 
 class UpdateCustomer(graphene.Mutation):
@@ -148,7 +255,7 @@ class UpdateCustomer(graphene.Mutation):
     customer = graphene.Field(lambda: CustomerType)
     
     def mutate(self, info, id, name=None, email=None, phone=None, tags=None, metadata=None):
-        customer = db_session.query(Customer).filter(Customer.id == id).first()
+        customer = db.session.query(Customer).filter(Customer.id == id).first()
         if not customer:
             raise Exception("Customer not found")
         
@@ -164,7 +271,7 @@ class UpdateCustomer(graphene.Mutation):
             customer.extra_data = json.dumps(metadata)
         
         customer.updated_at = datetime.utcnow()
-        db_session.commit()
+        db.session.commit()
         return UpdateCustomer(customer=customer)
 
 class DeleteCustomer(graphene.Mutation):
@@ -174,12 +281,12 @@ class DeleteCustomer(graphene.Mutation):
     success = graphene.Boolean()
     
     def mutate(self, info, id):
-        customer = db_session.query(Customer).filter(Customer.id == id).first()
+        customer = db.session.query(Customer).filter(Customer.id == id).first()
         if not customer:
             raise Exception("Customer not found")
         
-        db_session.delete(customer)
-        db_session.commit()
+        db.session.delete(customer)
+        db.session.commit()
         return DeleteCustomer(success=True)
 
 class CreateCampaign(graphene.Mutation):
@@ -205,8 +312,8 @@ class CreateCampaign(graphene.Mutation):
             metadata=json.dumps(metadata or {}),
             status='draft'
         )
-        db_session.add(campaign)
-        db_session.commit()
+        db.session.add(campaign)
+        db.session.commit()
         return CreateCampaign(campaign=campaign)
 
 class UpdateCampaign(graphene.Mutation):
@@ -226,10 +333,15 @@ class UpdateCampaign(graphene.Mutation):
     def mutate(self, info, id, title=None, description=None, campaign_type=None, 
                target_audience=None, draft_content=None, final_content=None, 
                status=None, metadata=None):
-        campaign = db_session.query(Campaign).filter(Campaign.id == id).first()
+        campaign = db.session.query(Campaign).filter(Campaign.id == id).first()
         if not campaign:
             raise Exception("Campaign not found")
         
+        # La campagne appartient au planificateur jusqu'à la fin de l'envoi
+        values = {'status': status, 'draft_content': draft_content, 'target_audience': target_audience}
+        if campaign.status == 'sending' and any(values.get(field) is not None for field in SENDING_LOCKED_FIELDS):
+            raise GraphQLError('Impossible de modifier une campagne en cours d\'envoi')
+        
         if title is not None:
             campaign.title = title
         if description is not None:
@@ -248,7 +360,7 @@ class UpdateCampaign(graphene.Mutation):
             campaign.metadata = json.dumps(metadata)
         
         campaign.updated_at = datetime.utcnow()
-        db_session.commit()
+        db.session.commit()
         return UpdateCampaign(campaign=campaign)
 
 class DeleteCampaign(graphene.Mutation):
@@ -258,14 +370,407 @@ class DeleteCampaign(graphene.Mutation):
     success = graphene.Boolean()
     
     def mutate(self, info, id):
-        campaign = db_session.query(Campaign).filter(Campaign.id == id).first()
+        campaign = db.session.query(Campaign).filter(Campaign.id == id).first()
         if not campaign:
             raise Exception("Campaign not found")
+        if campaign.status == 'sent':
+            raise GraphQLError('Impossible de supprimer une campagne déjà envoyée')
+        if campaign.status == 'sending':
+            raise GraphQLError('Impossible de supprimer une campagne en cours d\'envoi')
         
-        db_session.delete(campaign)
-        db_session.commit()
+        db.session.query(CampaignDispatch).filter(CampaignDispatch.campaign_id == campaign.id).delete()
+        db.session.delete(campaign)
+        db.session.commit()
         return DeleteCampaign(success=True)
 
+# Mutations groupées: toute la liste dans une seule transaction, une instruction SQL
+# par lot. Chaque élément reçoit son propre résultat (id ou erreur); les erreurs de
+# validation n'empêchent pas l'enregistrement des autres éléments.
+
+BULK_MAX_ITEMS = 1000
+BULK_CHUNK_SIZE = 500
+CAMPAIGN_TYPES = ('facebook', 'sms', 'email', 'whatsapp')
+CAMPAIGN_STATUSES = ('draft', 'scheduled', 'sent', 'failed')
+
+class BulkItemResult(graphene.ObjectType):
+    index = graphene.Int()  # Position de l'élément dans la liste reçue
+    id = graphene.Int()
+    success = graphene.Boolean()
+    error = graphene.String()
+
+class BulkOutput(graphene.ObjectType):
+    results = graphene.List(BulkItemResult)
+    succeeded = graphene.Int()
+    failed = graphene.Int()
+
+def _chunks(items):
+    for start in range(0, len(items), BULK_CHUNK_SIZE):
+        yield items[start:start + BULK_CHUNK_SIZE]
+
+def _bulk_results(items):
+    if len(items) > BULK_MAX_ITEMS:
+        raise GraphQLError(f'Trop d\'éléments: {len(items)} (maximum {BULK_MAX_ITEMS})')
+    return [BulkItemResult(index=index, success=False) for index in range(len(items))]
+
+def _run_bulk(results, work):
+    """Exécute les écritures puis valide; en cas d'échec tout est annulé"""
+    try:
+        work()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for result in results:
+            if result.success:
+                result.success = False
+                result.id = None
+                result.error = f'Transaction annulée: {str(e)}'
+    succeeded = sum(1 for result in results if result.success)
+    return BulkOutput(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+def _existing_rows(model, columns, ids):
+    rows = {}
+    for chunk in _chunks(list(set(ids))):
+        for row in db.session.query(model.id, *columns).filter(model.id.in_(chunk)):
+            rows[row.id] = row
+    return rows
+
+def _fail(result, error):
+    result.error = error
+
+class CustomerInput(graphene.InputObjectType):
+    org_id = graphene.Int(required=True)
+    name = graphene.String(required=True)
+    email = graphene.String()
+    phone = graphene.String()
+    tags = graphene.List(graphene.String)
+    metadata = graphene.JSONString()
+
+class CustomerUpdateInput(graphene.InputObjectType):
+    id = graphene.Int(required=True)
+    name = graphene.String()
+    email = graphene.String()
+    phone = graphene.String()
+    tags = graphene.List(graphene.String)
+    metadata = graphene.JSONString()
+
+class CreateCustomers(graphene.Mutation):
+    class Arguments:
+        customers = graphene.List(graphene.NonNull(CustomerInput), required=True)
+    
+    Output = BulkOutput
+    
+    def mutate(self, info, customers):
+        results = _bulk_results(customers)
+        org_ids = {item.org_id for item in customers}
+        existing_orgs = {row.id for row in db.session.query(Organization.id).filter(Organization.id.in_(org_ids))}
+        emails = {item.email.strip().lower() for item in customers if item.email and item.email.strip()}
+        taken = set()
+        for chunk in _chunks(list(emails)):
+            taken.update(
+                (row.org_id, row.email) for row in db.session.query(Customer.org_id, Customer.email)
+                .filter(Customer.org_id.in_(org_ids), Customer.email.in_(chunk))
+            )
+        
+        valid = []
+        for item, result in zip(customers, results):
+            name = (item.name or '').strip()
+            email = item.email.strip().lower() if item.email and item.email.strip() else None
+            if not name:
+                _fail(result, 'Le nom du client est requis')
+            elif item.org_id not in existing_orgs:
+                _fail(result, 'Organisation non trouvée')
+            elif email and (item.org_id, email) in taken:
+                _fail(result, 'Un client avec cet email existe déjà')
+            else:
+                if email:
+                    taken.add((item.org_id, email))
+                valid.append((result, Customer(
+                    org_id=item.org_id,
+                    name=name,
+                    email=email,
+                    phone=item.phone.strip() if item.phone else None,
+                    tags=json.dumps(item.tags or []),
+                    extra_data=json.dumps(item.metadata or {})
+                )))
+        
+        def work():
+            # Un INSERT par lot; les statistiques suivent via l'écouteur before_flush
+            for chunk in _chunks(valid):
+                db.session.add_all([customer for _, customer in chunk])
+                db.session.flush()
+                for result, customer in chunk:
+                    result.id = customer.id
+                    result.success = True
+        
+        return _run_bulk(results, work)
+
+class UpdateCustomers(graphene.Mutation):
+    class Arguments:
+        customers = graphene.List(graphene.NonNull(CustomerUpdateInput), required=True)
+    
+    Output = BulkOutput
+    
+    def mutate(self, info, customers):
+        results = _bulk_results(customers)
+        existing = _existing_rows(Customer, [Customer.org_id, Customer.tags], [item.id for item in customers])
+        now = datetime.utcnow()
+        
+        # Propriétaire de chaque email demandé dans l'organisation: (org_id, email) -> id du client
+        org_ids = {row.org_id for row in existing.values()}
+        emails = {item.email.strip().lower() for item in customers if item.email and item.email.strip()}
+        owners = {}
+        for chunk in _chunks(list(emails)):
+            owners.update(
+                ((row.org_id, row.email), row.id) for row in db.session.query(Customer.id, Customer.org_id, Customer.email)
+                .filter(Customer.org_id.in_(org_ids), Customer.email.in_(chunk))
+            )
+        
+        updates, seen = [], set()
+        for item, result in zip(customers, results):
+            result.id = item.id
+            row = existing.get(item.id)
+            email = item.email.strip().lower() if item.email and item.email.strip() else None
+            if row is None:
+                _fail(result, 'Client non trouvé')
+            elif item.id in seen:
+                _fail(result, 'Client présent plusieurs fois dans la liste')
+            elif item.name is not None and not item.name.strip():
+                _fail(result, 'Le nom du client est requis')
+            elif email and owners.get((row.org_id, email), item.id) != item.id:
+                _fail(result, 'Un client avec cet email existe déjà')
+            else:
+                seen.add(item.id)
+                if email:
+                    owners[(row.org_id, email)] = item.id
+                mapping = {'id': item.id, 'updated_at': now}
+                if item.name is not None:
+                    mapping['name'] = item.name.strip()
+                if item.email is not None:
+                    mapping['email'] = email
+                if item.phone is not None:
+                    mapping['phone'] = item.phone.strip() or None
+                if item.tags is not None:
+                    mapping['tags'] = json.dumps(item.tags)
+                if item.metadata is not None:
+                    mapping['extra_data'] = json.dumps(item.metadata)
+                updates.append((result, row, mapping))
+        
+        def work():
+            for chunk in _chunks(updates):
+                deltas = Counter()
+                for _, row, mapping in chunk:
+                    if 'tags' in mapping:
+                        deltas.update(stats.customer_deltas(row.org_id, row.tags, -1))
+                        deltas.update(stats.customer_deltas(row.org_id, mapping['tags'], 1))
+                # Le total ne change pas, seuls les compteurs par tag bougent
+                stats.record_deltas(db.session, deltas)
+                db.session.bulk_update_mappings(Customer, [mapping for _, _, mapping in chunk])
+                for result, _, _ in chunk:
+                    result.success = True
+        
+        return _run_bulk(results, work)
+
+class DeleteCustomers(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.Int), required=True)
+    
+    Output = BulkOutput
+    
+    def mutate(self, info, ids):
+        results = _bulk_results(ids)
+        existing = _existing_rows(Customer, [Customer.org_id, Customer.tags], ids)
+        
+        deletions, seen = [], set()
+        for customer_id, result in zip(ids, results):
+            result.id = customer_id
+            row = existing.get(customer_id)
+            if row is None or customer_id in seen:
+                _fail(result, 'Client non trouvé')
+            else:
+                seen.add(customer_id)
+                deletions.append((result, row))
+        
+        def work():
+            for chunk in _chunks(deletions):
+                deltas = Counter()
+                for _, row in chunk:
+                    deltas.update(stats.customer_deltas(row.org_id, row.tags, -1))
+                stats.record_deltas(db.session, deltas)
+                sync.record_deletions(db.session, 'customer', [(row.org_id, row.id) for _, row in chunk])
+                db.session.query(Customer).filter(
+                    Customer.id.in_([row.id for _, row in chunk])
+                ).delete(synchronize_session=False)
+                for result, _ in chunk:
+                    result.success = True
+        
+        return _run_bulk(results, work)
+
+class CampaignInput(graphene.InputObjectType):
+    org_id = graphene.Int(required=True)
+    title = graphene.String(required=True)
+    campaign_type = graphene.String(required=True)
+    description = graphene.String()
+    target_audience = graphene.List(graphene.String)
+    draft_content = graphene.String()
+    metadata = graphene.JSONString()
+
+class CampaignUpdateInput(graphene.InputObjectType):
+    id = graphene.Int(required=True)
+    title = graphene.String()
+    description = graphene.String()
+    campaign_type = graphene.String()
+    target_audience = graphene.List(graphene.String)
+    draft_content = graphene.String()
+    generated_content = graphene.String()
+    status = graphene.String()
+    metadata = graphene.JSONString()
+
+class CreateCampaigns(graphene.Mutation):
+    class Arguments:
+        campaigns = graphene.List(graphene.NonNull(CampaignInput), required=True)
+    
+    Output = BulkOutput
+    
+    def mutate(self, info, campaigns):
+        results = _bulk_results(campaigns)
+        org_ids = {item.org_id for item in campaigns}
+        existing_orgs = {row.id for row in db.session.query(Organization.id).filter(Organization.id.in_(org_ids))}
+        
+        valid = []
+        for item, result in zip(campaigns, results):
+            title = (item.title or '').strip()
+            if not title:
+                _fail(result, 'Le titre de la campagne est requis')
+            elif item.campaign_type not in CAMPAIGN_TYPES:
+                _fail(result, f'Type de campagne invalide. Types valides: {", ".join(CAMPAIGN_TYPES)}')
+            elif item.org_id not in existing_orgs:
+                _fail(result, 'Organisation non trouvée')
+            else:
+                valid.append((result, Campaign(
+                    org_id=item.org_id,
+                    title=title,
+                    description=item.description,
+                    campaign_type=item.campaign_type,
+                    target_audience=json.dumps(item.target_audience or []),
+                    draft_content=item.draft_content,
+                    extra_data=json.dumps(item.metadata or {}),
+                    status='draft'
+                )))
+        
+        def work():
+            for chunk in _chunks(valid):
+                db.session.add_all([campaign for _, campaign in chunk])
+                db.session.flush()
+                for result, campaign in chunk:
+                    result.id = campaign.id
+                    result.success = True
+        
+        return _run_bulk(results, work)
+
+class UpdateCampaigns(graphene.Mutation):
+    class Arguments:
+        campaigns = graphene.List(graphene.NonNull(CampaignUpdateInput), required=True)
+    
+    Output = BulkOutput
+    
+    def mutate(self, info, campaigns):
+        results = _bulk_results(campaigns)
+        existing = _existing_rows(
+            Campaign, [Campaign.org_id, Campaign.status, Campaign.campaign_type],
+            [item.id for item in campaigns]
+        )
+        now = datetime.utcnow()
+        
+        updates, seen = [], set()
+        for item, result in zip(campaigns, results):
+            result.id = item.id
+            row = existing.get(item.id)
+            if row is None:
+                _fail(result, 'Campagne non trouvée')
+            elif item.id in seen:
+                _fail(result, 'Campagne présente plusieurs fois dans la liste')
+            elif row.status == 'sending':
+                # La campagne appartient au planificateur jusqu'à la fin de l'envoi
+                _fail(result, 'Impossible de modifier une campagne en cours d\'envoi')
+            elif item.campaign_type is not None and item.campaign_type not in CAMPAIGN_TYPES:
+                _fail(result, f'Type de campagne invalide. Types valides: {", ".join(CAMPAIGN_TYPES)}')
+            elif item.status is not None and item.status not in CAMPAIGN_STATUSES:
+                _fail(result, f'Statut invalide. Statuts valides: {", ".join(CAMPAIGN_STATUSES)}')
+            elif item.title is not None and not item.title.strip():
+                _fail(result, 'Le titre de la campagne est requis')
+            else:
+                seen.add(item.id)
+                mapping = {'id': item.id, 'updated_at': now}
+                for field in ('description', 'campaign_type', 'draft_content', 'generated_content', 'status'):
+                    value = getattr(item, field)
+                    if value is not None:
+                        mapping[field] = value
+                if item.title is not None:
+                    mapping['title'] = item.title.strip()
+                if item.target_audience is not None:
+                    mapping['target_audience'] = json.dumps(item.target_audience)
+                if item.metadata is not None:
+                    mapping['extra_data'] = json.dumps(item.metadata)
+                updates.append((result, row, mapping))
+        
+        def work():
+            for chunk in _chunks(updates):
+                deltas = Counter()
+                for _, row, mapping in chunk:
+                    for field, metric in (('status', stats.CAMPAIGNS_BY_STATUS), ('campaign_type', stats.CAMPAIGNS_BY_TYPE)):
+                        old_value = getattr(row, field) or ''
+                        new_value = mapping.get(field, old_value)
+                        if new_value != old_value:
+                            deltas[(row.org_id, metric, old_value)] -= 1
+                            deltas[(row.org_id, metric, new_value)] += 1
+                stats.record_deltas(db.session, deltas)
+                db.session.bulk_update_mappings(Campaign, [mapping for _, _, mapping in chunk])
+                for result, _, _ in chunk:
+                    result.success = True
+        
+        return _run_bulk(results, work)
+
+class DeleteCampaigns(graphene.Mutation):
+    class Arguments:
+        ids = graphene.List(graphene.NonNull(graphene.Int), required=True)
+    
+    Output = BulkOutput
+    
+    def mutate(self, info, ids):
+        results = _bulk_results(ids)
+        existing = _existing_rows(Campaign, [Campaign.org_id, Campaign.status, Campaign.campaign_type], ids)
+        
+        deletions, seen = [], set()
+        for campaign_id, result in zip(ids, results):
+            result.id = campaign_id
+            row = existing.get(campaign_id)
+            if row is None or campaign_id in seen:
+                _fail(result, 'Campagne non trouvée')
+            elif row.status == 'sent':
+                _fail(result, 'Impossible de supprimer une campagne déjà envoyée')
+            elif row.status == 'sending':
+                _fail(result, 'Impossible de supprimer une campagne en cours d\'envoi')
+            else:
+                seen.add(campaign_id)
+                deletions.append((result, row))
+        
+        def work():
+            for chunk in _chunks(deletions):
+                chunk_ids = [row.id for _, row in chunk]
+                deltas = Counter()
+                for _, row in chunk:
+                    deltas.update(stats.campaign_deltas(row.org_id, row.status, row.campaign_type, -1))
+                stats.record_deltas(db.session, deltas)
+                sync.record_deletions(db.session, 'campaign', [(row.org_id, row.id) for _, row in chunk])
+                db.session.query(CampaignDispatch).filter(
+                    CampaignDispatch.campaign_id.in_(chunk_ids)
+                ).delete(synchronize_session=False)
+                db.session.query(Campaign).filter(Campaign.id.in_(chunk_ids)).delete(synchronize_session=False)
+                for result, _ in chunk:
+                    result.success = True
+        
+        return _run_bulk(results, work)
+
 class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     update_customer = UpdateCustomer.Field()
@@ -273,6 +778,12 @@ class Mutation(graphene.ObjectType):
     create_campaign = CreateCampaign.Field()
     update_campaign = UpdateCampaign.Field()
     delete_campaign = DeleteCampaign.Field()
+    create_customers = CreateCustomers.Field()
+    update_customers = UpdateCustomers.Field()
+    delete_customers = DeleteCustomers.Field()
+    create_campaigns = CreateCampaigns.Field()
+    update_campaigns = UpdateCampaigns.Field()
+    delete_campaigns = DeleteCampaigns.Field()
 
 # Schéma GraphQL principal
 schema = graphene.Schema(query=Query, mutation=Mutation)
@@ -0,0 +1,236 @@
+"""Instrumentation des requêtes (optionnelle): durées par phase, SQL et profilage
+
+- En-tête `Server-Timing`: db (durée et nombre d'instructions SQL), serialize,
+  upstream (service AI), auth et total.
+- Journal des requêtes lentes (logger ai4local.instrumentation) avec les
+  instructions SQL les plus coûteuses.
+- Profilage d'une requête (cProfile, ou pyinstrument s'il est installé) déclenché par
+  l'en-tête `X-Profile: <INSTRUMENTATION_PROFILE_TOKEN>` ou par échantillonnage; le
+  fichier produit est indiqué dans l'en-tête `X-Profile-File`.
+
+Les phases sont mesurées par `timed('nom')` dans le code applicatif; hors requête
+instrumentée, `timed` ne fait rien. Les instructions SQL sont comptées par les
+événements du moteur SQLAlchemy dans chaque `SQLRecorder` actif.
+"""
+import contextvars
+import cProfile
+import logging
+import os
+import random
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - pyinstrument est optionnel
+    pyinstrument = None
+
+logger = logging.getLogger('ai4local.instrumentation')
+
+PHASES = ('auth', 'db', 'serialize', 'upstream')
+# Instructions conservées par requête (au-delà, seules les durées sont cumulées)
+MAX_RECORDED_STATEMENTS = 500
+SLOW_STATEMENTS_LOGGED = 5
+
+_recorders = contextvars.ContextVar('sql_recorders', default=())
+
+class SQLRecorder:
+    """Compte et chronomètre les instructions SQL exécutées pendant le bloc `with`"""
+
+    def __init__(self, max_statements=MAX_RECORDED_STATEMENTS):
+        self.max_statements = max_statements
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []  # (instruction, durée en secondes)
+        self._token = None
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        if len(self.statements) < self.max_statements:
+            self.statements.append((statement, duration))
+
+    def slowest(self, limit=SLOW_STATEMENTS_LOGGED):
+        return sorted(self.statements, key=lambda item: item[1], reverse=True)[:limit]
+
+    def start(self):
+        install_sql_hooks()
+        self._token = _recorders.set(_recorders.get() + (self,))
+        return self
+
+    def stop(self):
+        if self._token is not None:
+            _recorders.reset(self._token)
+            self._token = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('instrumentation_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('instrumentation_started')
+    if not started:
+        return
+    duration = time.perf_counter() - started.pop()
+    for recorder in _recorders.get():
+        recorder.record(statement, duration)
+
+def install_sql_hooks():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+@contextmanager
+def timed(phase):
+    """Ajoute la durée du bloc à la phase de la requête instrumentée en cours"""
+    phases = g.get('instrumentation_phases') if has_request_context() else None
+    if phases is None or phase in g.instrumentation_active:
+        yield
+        return
+    g.instrumentation_active.add(phase)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - started
+        g.instrumentation_active.discard(phase)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Encodeur de jsonify() dont la durée est comptée dans la phase serialize"""
+
+    def dumps(self, obj, **kwargs):
+        with timed('serialize'):
+            return super().dumps(obj, **kwargs)
+
+def server_timing(phases, total):
+    """Valeur de l'en-tête Server-Timing (durées en millisecondes)"""
+    entries = []
+    for phase in PHASES:
+        if phase in phases:
+            duration, description = phases[phase]
+            entry = f'{phase};dur={duration * 1000:.1f}'
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+class RequestInstrumentation:
+    """Active les mesures par requête sur une application Flask"""
+
+    def __init__(self, enabled=False, slow_request_ms=500, profile_token=None,
+                 profile_sample_rate=0.0, profile_dir=None, profiler='cprofile'):
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self.profile_token = profile_token
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_dir = profile_dir or os.path.join(tempfile.gettempdir(), 'ai4local-profiles')
+        self.profiler = profiler if profiler == 'pyinstrument' and pyinstrument is not None else 'cprofile'
+
+    @property
+    def profiling(self):
+        return bool(self.profile_token) or self.profile_sample_rate > 0
+
+    def init_app(self, app):
+        if not (self.enabled or self.profiling):
+            return
+        if self.enabled:
+            app.json = TimedJSONProvider(app)
+            install_sql_hooks()
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _profile_requested(self):
+        header = request.headers.get('X-Profile')
+        if self.profile_token and header == self.profile_token:
+            return True
+        return self.profile_sample_rate > 0 and random.random() < self.profile_sample_rate
+
+    def _before_request(self):
+        g.instrumentation_started = time.perf_counter()
+        if self.enabled:
+            g.instrumentation_phases = {}
+            g.instrumentation_active = set()
+            g.instrumentation_sql = SQLRecorder().start()
+        if self.profiling and self._profile_requested():
+            if self.profiler == 'pyinstrument':
+                profiler = pyinstrument.Profiler()
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            g.instrumentation_profiler = profiler
+
+    def _after_request(self, response):
+        started = g.pop('instrumentation_started', None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+
+        profiler = g.pop('instrumentation_profiler', None)
+        if profiler is not None:
+            response.headers['X-Profile-File'] = self._save_profile(profiler)
+
+        recorder = g.pop('instrumentation_sql', None)
+        if recorder is None:
+            return response
+        recorder.stop()
+        phases = {name: (duration, None) for name, duration in g.pop('instrumentation_phases', {}).items()}
+        phases['db'] = (recorder.duration, f'{recorder.count} SQL')
+        response.headers['Server-Timing'] = server_timing(phases, total)
+
+        if total * 1000 >= self.slow_request_ms:
+            self._log_slow_request(total, phases, recorder)
+        return response
+
+    def _teardown_request(self, exc):
+        # Requête interrompue avant after_request: arrêt des mesures
+        recorder = g.pop('instrumentation_sql', None)
+        if recorder is not None:
+            recorder.stop()
+        profiler = g.pop('instrumentation_profiler', None)
+        if profiler is not None:
+            if self.profiler == 'pyinstrument':
+                profiler.stop()
+            else:
+                profiler.disable()
+
+    def _save_profile(self, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path_part = re.sub(r'[^A-Za-z0-9]+', '_', request.path).strip('_') or 'root'
+        name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{request.method}-{path_part}"
+        if self.profiler == 'pyinstrument':
+            profiler.stop()
+            name += '.html'
+            with open(os.path.join(self.profile_dir, name), 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            name += '.prof'
+            profiler.dump_stats(os.path.join(self.profile_dir, name))
+        return name
+
+    def _log_slow_request(self, total, phases, recorder):
+        details = ', '.join(f'{name}={duration * 1000:.1f}ms' for name, (duration, _) in sorted(phases.items()))
+        statements = '\n'.join(
+            f'  {duration * 1000:.1f}ms {" ".join(statement.split())[:500]}'
+            for statement, duration in recorder.slowest()
+        )
+        logger.warning(
+            "Requête lente %s %s: %.1fms (%s, %d requête(s) SQL)\n%s",
+            request.method, request.full_path.rstrip('?'), total * 1000, details, recorder.count, statements
+        )
@@ -1,47 +1,187 @@
 import os
 import sys
-import requests
+import threading
 from datetime import datetime, timedelta
 import jwt
 from functools import wraps
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, request, jsonify
+from flask import Flask, current_app, send_from_directory, request, jsonify
 from flask_cors import CORS
-from flask_graphql import GraphQLView
 from src.models.user import db
+from src.database import database_uri, engine_options, install_sqlite_pragmas
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.customers import customers_bp
 from src.routes.campaigns import campaigns_bp
 from src.routes.ai import ai_bp
-from src.graphql_schema import schema
+from src.routes.stats import stats_bp
+from src.services import health, stats, sync
+from src.services.ai_client import AIClient
+from src.services.ai_scheduler import DEFAULT_ORG_LIMITS, DEFAULT_WEIGHTS, AIScheduler, parse_plan_values
+from src.instrumentation import RequestInstrumentation, timed
+from src.query_budget import QueryBudget, QueryBudgetGuard
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'ai4local_secret_key_2024'
+# Origines autorisées du frontend (aussi utilisées par l'application ASGI, src/asgi.py)
+CORS_ORIGINS = ['http://localhost:3000', 'http://localhost:5173']
+CORS_EXPOSE_HEADERS = ['ETag', 'Server-Timing', 'X-Profile-File', 'Retry-After']
 
-# Configuration CORS pour permettre les requêtes depuis le frontend
-CORS(app, origins=['http://localhost:3000', 'http://localhost:5173'])
+# Le schéma GraphQL (graphene, graphene_sqlalchemy, graphql-core) n'est importé
+# qu'à la première requête /graphql, ou au démarrage avec GRAPHQL_PRELOAD=true
+# (serveurs qui chargent l'application avant de créer les workers).
+# Le schéma de la base est mis à jour par `python -m src.migrate`, pas au démarrage.
 
-# Configuration de la base de données
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+def build_graphql_view():
+    """Vue /graphql avec limites, cache des documents et requêtes persistées"""
+    from src.graphql_schema import schema
+    from src.graphql_execution import (
+        CachedGraphQLBackend, GraphQLEndpoint, PageSizeMiddleware, PersistedQueries, QueryLimits
+    )
+
+    graphql_limits = QueryLimits(
+        max_depth=int(os.getenv('GRAPHQL_MAX_DEPTH', '10')),
+        max_cost=int(os.getenv('GRAPHQL_MAX_COST', '10000')),
+        default_page_size=int(os.getenv('GRAPHQL_DEFAULT_PAGE_SIZE', '50')),
+        max_page_size=int(os.getenv('GRAPHQL_MAX_PAGE_SIZE', '100'))
+    )
+    graphql_backend = CachedGraphQLBackend(
+        limits=graphql_limits,
+        cache_size=int(os.getenv('GRAPHQL_DOCUMENT_CACHE_SIZE', '500'))
+    )
+    persisted_queries = PersistedQueries(
+        path=os.getenv('GRAPHQL_PERSISTED_QUERIES_FILE') or None,
+        only=os.getenv('GRAPHQL_PERSISTED_ONLY', 'false').lower() == 'true'
+    )
+    return GraphQLEndpoint.as_view(
+        'graphql',
+        schema=schema,
+        backend=graphql_backend,
+        middleware=[PageSizeMiddleware(graphql_limits)],
+        persisted_queries=persisted_queries,
+        # Session de la requête, partagée avec les routes REST, et limites lues par la pagination par curseur
+        context={'session': db.session, 'limits': graphql_limits},
+        graphiql=True  # Interface GraphiQL pour les tests en développement
+    )
+
+class LazyView:
+    """Vue construite au premier appel (une seule fois, même avec plusieurs threads)"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.view = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.view is None:
+            with self.lock:
+                if self.view is None:
+                    self.view = self.factory()
+        return self.view
 
-# Configuration du service AI
-app.config['AI_SERVICE_URL'] = os.getenv('AI_SERVICE_URL', 'http://localhost:8000')
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
 
-# Enregistrement des blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(customers_bp, url_prefix='/api')
-app.register_blueprint(campaigns_bp, url_prefix='/api')
-app.register_blueprint(ai_bp, url_prefix='/api/ai')
+def create_app():
+    """Application Flask: configuration, extensions, blueprints et routes"""
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'ai4local_secret_key_2024'
 
-# Initialisation de la base de données
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    # Configuration CORS pour permettre les requêtes depuis le frontend
+    CORS(app, origins=CORS_ORIGINS, expose_headers=CORS_EXPOSE_HEADERS)
+
+    # Configuration de la base de données (DATABASE_URL, sinon SQLite local)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(os.path.join(os.path.dirname(__file__), 'database', 'app.db'))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    install_sqlite_pragmas()
+
+    # Configuration du service AI
+    app.config['AI_SERVICE_URL'] = os.getenv('AI_SERVICE_URL', 'http://localhost:8000')
+    app.config['AI_BULK_CONCURRENCY'] = int(os.getenv('AI_BULK_CONCURRENCY', '4'))
+
+    # Instrumentation des requêtes (désactivée par défaut)
+    instrumentation = RequestInstrumentation(
+        enabled=os.getenv('INSTRUMENTATION_ENABLED', 'false').lower() == 'true',
+        slow_request_ms=float(os.getenv('INSTRUMENTATION_SLOW_REQUEST_MS', '500')),
+        profile_token=os.getenv('INSTRUMENTATION_PROFILE_TOKEN') or None,
+        profile_sample_rate=float(os.getenv('INSTRUMENTATION_PROFILE_SAMPLE_RATE', '0')),
+        profile_dir=os.getenv('INSTRUMENTATION_PROFILE_DIR') or None,
+        profiler=os.getenv('INSTRUMENTATION_PROFILER', 'cprofile')
+    )
+    instrumentation.init_app(app)
+
+    # Budgets de requêtes SQL et détection N+1 (off, log, ou raise pour les tests)
+    query_budget_guard = QueryBudgetGuard(
+        mode=os.getenv('QUERY_BUDGET_MODE', 'off'),
+        default=QueryBudget(max_repeats=int(os.getenv('QUERY_BUDGET_MAX_REPEATS', '3')))
+    )
+    query_budget_guard.init_app(app)
+
+    # Enregistrement des blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(customers_bp, url_prefix='/api')
+    app.register_blueprint(campaigns_bp, url_prefix='/api')
+    app.register_blueprint(ai_bp, url_prefix='/api/ai')
+    app.register_blueprint(stats_bp, url_prefix='/api')
+
+    # Initialisation de la base de données
+    db.init_app(app)
+    stats.install_listeners()
+    sync.install_listeners()
+
+    # Sondes de santé en arrière-plan (statut en cache, échec rapide des appels au service AI)
+    if os.getenv('HEALTH_PROBE_ENABLED', 'true').lower() == 'true':
+        health.HealthProber(
+            interval=float(os.getenv('HEALTH_PROBE_INTERVAL', '10')),
+            timeout=float(os.getenv('HEALTH_PROBE_TIMEOUT', '2')),
+            failure_threshold=int(os.getenv('HEALTH_PROBE_FAILURE_THRESHOLD', '2'))
+        ).init_app(app)
+
+    # Ordonnancement équitable des appels AI par organisation (désactivé par défaut, poids et limites selon le plan)
+    if os.getenv('AI_SCHEDULER_ENABLED', 'false').lower() == 'true':
+        AIScheduler(
+            capacity=int(os.getenv('AI_SCHEDULER_CAPACITY', '32')),
+            bulk_capacity=int(os.getenv('AI_SCHEDULER_BULK_CAPACITY', '16')),
+            weights=parse_plan_values(os.getenv('AI_SCHEDULER_WEIGHTS'), DEFAULT_WEIGHTS),
+            org_limits=parse_plan_values(os.getenv('AI_SCHEDULER_ORG_LIMITS'), DEFAULT_ORG_LIMITS),
+            max_queue=int(os.getenv('AI_SCHEDULER_MAX_QUEUE', '100')),
+            plan_ttl=float(os.getenv('AI_SCHEDULER_PLAN_TTL', '300'))
+        ).init_app(app)
+
+    # Client du service AI: disjoncteur par endpoint, requêtes doublées pour /embed et /semantic-search
+    hedge_delay_ms = os.getenv('AI_HEDGE_DELAY_MS')
+    AIClient(
+        app.config['AI_SERVICE_URL'],
+        timeout=float(os.getenv('AI_SERVICE_TIMEOUT', '30')),
+        budget_ms=float(os.getenv('AI_REQUEST_BUDGET_MS', '30000')),
+        pool_size=max(10, app.config['AI_BULK_CONCURRENCY']),
+        breaker_options={
+            'window': int(os.getenv('AI_BREAKER_WINDOW', '20')),
+            'min_calls': int(os.getenv('AI_BREAKER_MIN_CALLS', '5')),
+            'failure_rate': float(os.getenv('AI_BREAKER_FAILURE_RATE', '0.5')),
+            'open_seconds': float(os.getenv('AI_BREAKER_OPEN_SECONDS', '30'))
+        },
+        hedge_paths=os.getenv('AI_HEDGE_PATHS', '/embed,/semantic-search').split(','),
+        hedge_delay_ms=float(hedge_delay_ms) if hedge_delay_ms else None,
+        hedge_max_ratio=float(os.getenv('AI_HEDGE_MAX_RATIO', '0.1')),
+        async_pool_size=int(os.getenv('AI_ASYNC_MAX_CONNECTIONS', '100'))
+    ).init_app(app)
+
+    # Endpoint GraphQL
+    graphql_view = LazyView(build_graphql_view)
+    app.add_url_rule('/graphql', 'graphql', view_func=graphql_view, methods=['GET', 'POST'])
+    if os.getenv('GRAPHQL_PRELOAD', 'false').lower() == 'true':
+        graphql_view.load()
+
+    app.add_url_rule('/api/health', 'health_check', health_check)
+    app.add_url_rule('/api/status', 'status', status)
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, internal_error)
+    return app
 
 # Middleware d'authentification JWT
 def token_required(f):
@@ -62,7 +202,8 @@ def token_required(f):
         
         try:
             # Décodage du token JWT
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            with timed('auth'):
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
             current_user_id = data['user_id']
             current_org_id = data.get('org_id')
         except jwt.ExpiredSignatureError:
@@ -75,7 +216,6 @@ def token_required(f):
     return decorated
 
 # Route de santé de l'API
-@app.route('/api/health')
 def health_check():
     return jsonify({
         'status': 'healthy',
@@ -84,28 +224,26 @@ def health_check():
         'version': '1.0.0'
     })
 
-# Route de statut avec informations sur les services
-@app.route('/api/status')
+# Route de statut avec informations sur les services (sondes en cache)
 def status():
-    ai_service_status = 'unknown'
-    try:
-        ai_response = requests.get(f"{app.config['AI_SERVICE_URL']}/health", timeout=5)
-        ai_service_status = 'healthy' if ai_response.status_code == 200 else 'unhealthy'
-    except:
-        ai_service_status = 'unreachable'
+    prober = health.get_prober()
+    checks = {name: prober.current(name) for name in prober.checks} if prober else {}
     
     return jsonify({
         'api': 'healthy',
-        'ai_service': ai_service_status,
-        'database': 'connected',
+        'ai_service': checks.get('ai_service', {}).get('status', health.UNKNOWN),
+        'database': checks.get('database', {}).get('status', health.UNKNOWN),
+        'checks': {
+            name: {key: result[key] for key in ('status', 'latency_ms', 'checked_at', 'error')}
+            for name, result in checks.items()
+        },
+        'ai_client': current_app.extensions['ai_client'].snapshot(),
         'timestamp': datetime.utcnow().isoformat()
     })
 
 # Route pour servir le frontend (SPA)
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
+    static_folder_path = current_app.static_folder
     if static_folder_path is None:
         return "Static folder not configured", 404
 
@@ -125,30 +263,25 @@ def serve(path):
                     'auth': '/api/auth/*',
                     'customers': '/api/orgs/{org_id}/customers',
                     'campaigns': '/api/orgs/{org_id}/campaigns',
+                    'stats': '/api/orgs/{org_id}/stats',
                     'ai': '/api/ai/*',
                     'graphql': '/graphql'
                 }
             })
 
-# Endpoint GraphQL
-app.add_url_rule(
-    '/graphql',
-    view_func=GraphQLView.as_view(
-        'graphql',
-        schema=schema,
-        graphiql=True  # Interface GraphiQL pour les tests en développement
-    )
-)
-
 # Gestionnaire d'erreurs
-@app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint non trouvé'}), 404
 
-@app.errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Erreur interne du serveur'}), 500
 
+app = create_app()
+
 if __name__ == '__main__':
+    # Serveur de développement: schéma de la base mis à jour au lancement
+    from src.migrate import upgrade
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
     app.run(host='0.0.0.0', port=5000, debug=True)
 
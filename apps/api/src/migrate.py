@@ -0,0 +1,63 @@
+"""Mise à jour du schéma de la base: python -m src.migrate [--dry-run]
+
+À lancer avant le démarrage de l'API (étape de déploiement), et non à chaque
+démarrage d'un conteneur. Crée les tables manquantes, puis les index déclarés dans
+les modèles qui n'existent pas encore sur des tables existantes (ce que
+`db.create_all()` ne fait pas). Les opérations sont idempotentes.
+"""
+import argparse
+import os
+import sys
+import time
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import inspect
+
+def pending(engine, metadata):
+    """Tables et index à créer: (tables, index)"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    tables = [table for table in metadata.sorted_tables if table.name not in existing_tables]
+    indexes = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        indexes.extend(index for index in table.indexes if index.name not in existing_indexes)
+    return tables, indexes
+
+def upgrade(engine, metadata, dry_run=False):
+    """Applique les changements en attente, retourne la liste des opérations"""
+    tables, indexes = pending(engine, metadata)
+    operations = [f'table {table.name}' for table in tables] + \
+        [f'index {index.name} ({index.table.name})' for index in indexes]
+    if dry_run:
+        return operations
+    with engine.begin() as connection:
+        # Tables créées avec leurs index
+        metadata.create_all(connection, tables=tables)
+        for index in indexes:
+            index.create(connection)
+    return operations
+
+def main():
+    parser = argparse.ArgumentParser(description="Crée les tables et index manquants")
+    parser.add_argument('--dry-run', action='store_true', help='afficher les opérations sans les appliquer')
+    args = parser.parse_args()
+
+    from src.main import app
+    from src.models.user import db
+
+    started = time.perf_counter()
+    with app.app_context():
+        operations = upgrade(db.engine, db.metadata, dry_run=args.dry_run)
+    for operation in operations:
+        print(f"{'À créer' if args.dry_run else 'Créé'}: {operation}")
+    if not operations:
+        print('Schéma à jour')
+    print(f"Terminé en {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import deferred
 from datetime import datetime
 import json
 
@@ -11,7 +12,7 @@ class Organization(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     plan = db.Column(db.String(20), default='free')  # free, basic, premium
-    billing_info = db.Column(db.Text)  # JSON string pour les infos de facturation
+    billing_info = deferred(db.Column(db.Text))  # JSON string pour les infos de facturation (chargé à la demande)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relations
@@ -71,6 +72,12 @@ class Customer(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_customers_org_updated_at', 'org_id', 'updated_at'),
+        # Listes paginées par organisation, des plus récents aux plus anciens
+        db.Index('ix_customers_org_created_at', 'org_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -117,6 +124,9 @@ class Product(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+# Champs non modifiables pendant l'envoi (statut, contenu et audience lus par le planificateur)
+SENDING_LOCKED_FIELDS = ('status', 'draft_content', 'generated_content', 'target_audience')
+
 class Campaign(db.Model):
     """Modèle pour les campagnes marketing"""
     __tablename__ = 'campaigns'
@@ -129,12 +139,21 @@ class Campaign(db.Model):
     generated_content = db.Column(db.Text)  # Contenu généré par l'IA
     target_audience = db.Column(db.Text)  # JSON string pour les critères de ciblage
     schedule_at = db.Column(db.DateTime)
-    status = db.Column(db.String(20), default='draft')  # draft, scheduled, sent, failed
+    status = db.Column(db.String(20), default='draft')  # draft, scheduled, sending, sent, failed
     campaign_type = db.Column(db.String(20))  # facebook, sms, email, etc.
     extra_data = db.Column(db.Text)  # JSON string pour données additionnelles
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Index utilisé par le planificateur pour trouver les campagnes dues
+        db.Index('ix_campaigns_status_schedule_at', 'status', 'schedule_at'),
+        # Empreinte des listes (ETag) et synchronisation par organisation
+        db.Index('ix_campaigns_org_updated_at', 'org_id', 'updated_at'),
+        # Listes paginées par organisation, des plus récentes aux plus anciennes
+        db.Index('ix_campaigns_org_created_at', 'org_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -152,6 +171,66 @@ class Campaign(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class CampaignDispatch(db.Model):
+    """Modèle pour le suivi de l'envoi d'une campagne planifiée"""
+    __tablename__ = 'campaign_dispatches'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=False, unique=True)
+    org_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
+    status = db.Column(db.String(20), default='running')  # running, completed, failed
+    worker_id = db.Column(db.String(100))  # Instance du planificateur propriétaire de l'envoi
+    last_customer_id = db.Column(db.Integer, default=0)  # Curseur de reprise dans l'audience
+    recipients_count = db.Column(db.Integer, default=0)
+    sent_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'org_id': self.org_id,
+            'status': self.status,
+            'worker_id': self.worker_id,
+            'recipients_count': self.recipients_count,
+            'sent_count': self.sent_count,
+            'failed_count': self.failed_count,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class OrgStat(db.Model):
+    """Compteurs agrégés par organisation pour le tableau de bord (maintenus à chaque écriture)"""
+    __tablename__ = 'org_stats'
+    
+    org_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)  # customers_total, customers_by_tag, campaigns_by_status, campaigns_by_type
+    key = db.Column(db.String(100), primary_key=True, default='')
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class DeletionLog(db.Model):
+    """Journal des suppressions (tombstones) pour la synchronisation incrémentale"""
+    __tablename__ = 'deletion_log'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # customer, campaign
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Lecture des suppressions depuis un jeton de synchronisation
+        db.Index('ix_deletion_log_org_entity_id', 'org_id', 'entity', 'id'),
+        # Purge des entrées expirées
+        db.Index('ix_deletion_log_deleted_at', 'deleted_at'),
+    )
+
 class Course(db.Model):
     """Modèle pour les cours de formation (LMS)"""
     __tablename__ = 'courses'
@@ -160,7 +239,7 @@ class Course(db.Model):
     org_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    lessons = db.Column(db.Text)  # JSON string pour les leçons
+    lessons = deferred(db.Column(db.Text))  # JSON string pour les leçons (chargé à la demande)
     duration_minutes = db.Column(db.Integer)
     difficulty_level = db.Column(db.String(20))  # beginner, intermediate, advanced
     is_active = db.Column(db.Boolean, default=True)
@@ -0,0 +1,123 @@
+"""Budgets de requêtes SQL par endpoint et détection des requêtes N+1
+
+Une vue déclare son budget avec `@query_budget(max_statements, max_repeats=...)`;
+sans déclaration, seule la détection N+1 s'applique: une même forme d'instruction
+(littéraux et paramètres remplacés par ?) exécutée plus de `max_repeats` fois dans
+une requête signale une boucle de requêtes par ligne.
+
+Le contrôle est activé par QUERY_BUDGET_MODE: off (défaut), log (avertissement dans
+le logger ai4local.query_budget) ou raise (exception QueryBudgetExceeded, pour les
+tests). Pour vérifier un appel précis dans un test:
+
+    with assert_query_budget(max_statements=4):
+        client.get('/api/orgs/1/customers', headers=headers)
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import current_app, g, request
+
+from src.instrumentation import SQLRecorder
+
+logger = logging.getLogger('ai4local.query_budget')
+
+# Répétitions tolérées d'une même forme d'instruction dans une requête
+DEFAULT_MAX_REPEATS = 3
+MODES = ('off', 'log', 'raise')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAMETER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+|\?')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_POSTCOMPILE = re.compile(r'\(?\s*__\[POSTCOMPILE_\w+\]\s*\)?')
+
+class QueryBudgetExceeded(AssertionError):
+    """Budget de requêtes dépassé ou requêtes répétées (N+1)"""
+
+def statement_shape(statement):
+    """Forme normalisée d'une instruction: valeurs et listes IN remplacées par ?"""
+    shape = _STRING.sub('?', statement)
+    shape = _POSTCOMPILE.sub(' (?)', shape)
+    shape = _PARAMETER.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (?)', shape)
+    return ' '.join(shape.split())
+
+class QueryBudget:
+    """Nombre maximal d'instructions et de répétitions d'une même forme (None = illimité)"""
+
+    def __init__(self, max_statements=None, max_repeats=DEFAULT_MAX_REPEATS):
+        self.max_statements = max_statements
+        self.max_repeats = max_repeats
+
+    def violations(self, recorder):
+        problems = []
+        if self.max_statements is not None and recorder.count > self.max_statements:
+            problems.append(f'{recorder.count} requête(s) SQL pour un budget de {self.max_statements}')
+        if self.max_repeats is not None:
+            shapes = Counter(statement_shape(statement) for statement, _ in recorder.statements)
+            for shape, count in shapes.most_common():
+                if count <= self.max_repeats:
+                    break
+                problems.append(f'{count} exécutions de la même requête (N+1?): {shape[:300]}')
+        return problems
+
+    def check(self, recorder, label):
+        problems = self.violations(recorder)
+        if problems:
+            raise QueryBudgetExceeded(f'{label}: ' + '; '.join(problems))
+
+def query_budget(max_statements=None, max_repeats=DEFAULT_MAX_REPEATS):
+    """Déclare le budget de requêtes d'une vue"""
+    def decorator(f):
+        f.query_budget = QueryBudget(max_statements, max_repeats)
+        return f
+    return decorator
+
+@contextmanager
+def assert_query_budget(max_statements=None, max_repeats=DEFAULT_MAX_REPEATS):
+    """Vérifie les requêtes exécutées dans le bloc (tests)"""
+    with SQLRecorder() as recorder:
+        yield recorder
+    QueryBudget(max_statements, max_repeats).check(recorder, 'Bloc')
+
+class QueryBudgetGuard:
+    """Contrôle du budget de chaque requête HTTP selon la vue appelée"""
+
+    def __init__(self, mode='off', default=None):
+        if mode not in MODES:
+            raise ValueError(f'QUERY_BUDGET_MODE invalide: {mode} ({", ".join(MODES)})')
+        self.mode = mode
+        self.default = default or QueryBudget()
+
+    def init_app(self, app):
+        if self.mode == 'off':
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g.query_budget_sql = SQLRecorder().start()
+
+    def _after_request(self, response):
+        recorder = g.pop('query_budget_sql', None)
+        if recorder is None:
+            return response
+        recorder.stop()
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None) or self.default
+        label = f'{request.method} {request.path}'
+        if self.mode == 'raise':
+            budget.check(recorder, label)
+        else:
+            for problem in budget.violations(recorder):
+                logger.warning('%s: %s', label, problem)
+        return response
+
+    def _teardown_request(self, exc):
+        recorder = g.pop('query_budget_sql', None)
+        if recorder is not None:
+            recorder.stop()
@@ -0,0 +1,25 @@
+"""Reconstruction des statistiques par organisation: python -m src.reconcile_stats [--org-id N]"""
+import argparse
+import os
+import sys
+import time
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcule la table org_stats depuis les clients et campagnes")
+    parser.add_argument('--org-id', type=int, default=None, help='organisation à reconstruire (toutes par défaut)')
+    args = parser.parse_args()
+
+    from src.main import app
+    from src.services.stats import rebuild
+
+    started = time.perf_counter()
+    with app.app_context():
+        rebuild(args.org_id)
+    scope = f"l'organisation {args.org_id}" if args.org_id is not None else 'toutes les organisations'
+    print(f"Statistiques reconstruites pour {scope} en {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
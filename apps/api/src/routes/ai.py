@@ -1,36 +1,27 @@
 from flask import Blueprint, request, jsonify, current_app
-import requests
 import json
+from src.instrumentation import timed
+from src.routes.auth import TokenError, decode_token
+from src.services import health
+from src.services.content_generation import OPTIMIZATION_SUGGESTIONS, optimization_request
+from src.services.ai_client import (
+    CircuitOpen, DeadlineExceeded, deadline_response, get_ai_client, queue_full_response, unavailable_response
+)
+from src.services.ai_scheduler import QueueFull
 
 ai_bp = Blueprint('ai', __name__)
 
 def token_required(f):
     """Décorateur pour vérifier l'authentification JWT"""
     from functools import wraps
-    import jwt
     
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'error': 'Token format invalide'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Token manquant'}), 401
-        
         try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user_id = data['user_id']
-            current_org_id = data.get('org_id')
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token expiré'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Token invalide'}), 401
+            with timed('auth'):
+                current_user_id, current_org_id = decode_token(request.headers, current_app.config['SECRET_KEY'])
+        except TokenError as e:
+            return jsonify({'error': str(e)}), 401
         
         return f(current_user_id, current_org_id, *args, **kwargs)
     
@@ -40,6 +31,8 @@ def token_required(f):
 @token_required
 def generate_text(current_user_id, current_org_id):
     """Proxy pour la génération de texte via le service AI"""
+    import requests
+    
     try:
         data = request.get_json()
         
@@ -48,17 +41,20 @@ def generate_text(current_user_id, current_org_id):
             return jsonify({'error': 'Le prompt est requis'}), 400
         
         # Appel au service AI
-        ai_response = requests.post(
-            f"{current_app.config['AI_SERVICE_URL']}/generate-text",
-            json=data,
-            timeout=30
-        )
+        with timed('upstream'):
+            ai_response = get_ai_client().post('/generate-text', data, org_id=current_org_id)
         
         if ai_response.status_code != 200:
             return jsonify({'error': 'Erreur du service AI'}), 500
         
         return jsonify(ai_response.json()), 200
         
+    except CircuitOpen as e:
+        return unavailable_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except QueueFull as e:
+        return queue_full_response(e)
     except requests.RequestException as e:
         return jsonify({'error': f'Erreur de communication avec le service AI: {str(e)}'}), 500
     except Exception as e:
@@ -68,6 +64,8 @@ def generate_text(current_user_id, current_org_id):
 @token_required
 def create_embeddings(current_user_id, current_org_id):
     """Proxy pour la création d'embeddings via le service AI"""
+    import requests
+    
     try:
         data = request.get_json()
         
@@ -76,17 +74,20 @@ def create_embeddings(current_user_id, current_org_id):
             return jsonify({'error': 'Une liste de textes est requise'}), 400
         
         # Appel au service AI
-        ai_response = requests.post(
-            f"{current_app.config['AI_SERVICE_URL']}/embed",
-            json=data,
-            timeout=30
-        )
+        with timed('upstream'):
+            ai_response = get_ai_client().post('/embed', data, org_id=current_org_id)
         
         if ai_response.status_code != 200:
             return jsonify({'error': 'Erreur du service AI'}), 500
         
         return jsonify(ai_response.json()), 200
         
+    except CircuitOpen as e:
+        return unavailable_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except QueueFull as e:
+        return queue_full_response(e)
     except requests.RequestException as e:
         return jsonify({'error': f'Erreur de communication avec le service AI: {str(e)}'}), 500
     except Exception as e:
@@ -96,6 +97,8 @@ def create_embeddings(current_user_id, current_org_id):
 @token_required
 def semantic_search(current_user_id, current_org_id):
     """Proxy pour la recherche sémantique via le service AI"""
+    import requests
+    
     try:
         data = request.get_json()
         
@@ -104,17 +107,20 @@ def semantic_search(current_user_id, current_org_id):
             return jsonify({'error': 'La requête de recherche est requise'}), 400
         
         # Appel au service AI
-        ai_response = requests.post(
-            f"{current_app.config['AI_SERVICE_URL']}/semantic-search",
-            json=data,
-            timeout=30
-        )
+        with timed('upstream'):
+            ai_response = get_ai_client().post('/semantic-search', data, org_id=current_org_id)
         
         if ai_response.status_code != 200:
             return jsonify({'error': 'Erreur du service AI'}), 500
         
         return jsonify(ai_response.json()), 200
         
+    except CircuitOpen as e:
+        return unavailable_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except QueueFull as e:
+        return queue_full_response(e)
     except requests.RequestException as e:
         return jsonify({'error': f'Erreur de communication avec le service AI: {str(e)}'}), 500
     except Exception as e:
@@ -173,6 +179,8 @@ def get_content_suggestions(current_user_id, current_org_id):
 @token_required
 def optimize_content(current_user_id, current_org_id):
     """Optimisation de contenu existant"""
+    import requests
+    
     try:
         data = request.get_json()
         
@@ -184,26 +192,12 @@ def optimize_content(current_user_id, current_org_id):
         campaign_type = data.get('campaign_type', 'facebook')
         optimization_goal = data.get('goal', 'engagement')  # engagement, conversion, awareness
         
-        # Création du prompt d'optimisation
-        optimization_prompts = {
-            'engagement': f"Optimisez ce contenu {campaign_type} pour maximiser l'engagement (likes, commentaires, partages): {content}",
-            'conversion': f"Réécrivez ce contenu {campaign_type} pour inciter à l'action et améliorer les conversions: {content}",
-            'awareness': f"Adaptez ce contenu {campaign_type} pour améliorer la notoriété de la marque: {content}"
-        }
-        
-        prompt = optimization_prompts.get(optimization_goal, optimization_prompts['engagement'])
-        
         # Appel au service AI pour l'optimisation
-        ai_response = requests.post(
-            f"{current_app.config['AI_SERVICE_URL']}/generate-text",
-            json={
-                'prompt': content,
-                'template': prompt,
-                'max_tokens': 200,
-                'temperature': 0.6
-            },
-            timeout=30
-        )
+        with timed('upstream'):
+            ai_response = get_ai_client().post(
+                '/generate-text', optimization_request(content, campaign_type, optimization_goal),
+                org_id=current_org_id
+            )
         
         if ai_response.status_code != 200:
             return jsonify({'error': 'Erreur du service AI'}), 500
@@ -216,14 +210,15 @@ def optimize_content(current_user_id, current_org_id):
             'optimized_content': optimized_content,
             'optimization_goal': optimization_goal,
             'campaign_type': campaign_type,
-            'suggestions': [
-                "Ajoutez des emojis pour plus d'engagement",
-                "Incluez un appel à l'action clair",
-                "Mentionnez votre localisation (Madagascar)",
-                "Utilisez des hashtags pertinents"
-            ]
+            'suggestions': OPTIMIZATION_SUGGESTIONS
         }), 200
         
+    except CircuitOpen as e:
+        return unavailable_response(e)
+    except DeadlineExceeded as e:
+        return deadline_response(e)
+    except QueueFull as e:
+        return queue_full_response(e)
     except requests.RequestException as e:
         return jsonify({'error': f'Erreur de communication avec le service AI: {str(e)}'}), 500
     except Exception as e:
@@ -232,19 +227,19 @@ def optimize_content(current_user_id, current_org_id):
 @ai_bp.route('/status', methods=['GET'])
 @token_required
 def ai_service_status(current_user_id, current_org_id):
-    """Vérification du statut du service AI"""
+    """Statut du service AI (dernière sonde en cache, sans appel réseau)"""
     try:
-        # Test de connectivité avec le service AI
-        ai_response = requests.get(
-            f"{current_app.config['AI_SERVICE_URL']}/health",
-            timeout=5
-        )
-        
-        if ai_response.status_code == 200:
-            ai_data = ai_response.json()
+        prober = health.get_prober()
+        if prober is None:
+            return jsonify({'status': health.UNKNOWN, 'error': 'Sondes de santé désactivées'}), 503
+        
+        result = prober.current('ai_service')
+        if result['status'] == health.HEALTHY:
             return jsonify({
                 'status': 'healthy',
-                'ai_service': ai_data,
+                'ai_service': result['details'],
+                'latency_ms': result['latency_ms'],
+                'checked_at': result['checked_at'],
                 'features': {
                     'text_generation': True,
                     'embeddings': True,
@@ -252,20 +247,17 @@ def ai_service_status(current_user_id, current_org_id):
                     'content_optimization': True
                 }
             }), 200
-        else:
-            return jsonify({
-                'status': 'unhealthy',
-                'error': 'Service AI non disponible'
-            }), 503
-            
-    except requests.RequestException as e:
+        
+        message = 'Service AI non disponible' if result['status'] == health.UNHEALTHY \
+            else f"Impossible de contacter le service AI: {result['error']}"
         return jsonify({
-            'status': 'unreachable',
-            'error': f'Impossible de contacter le service AI: {str(e)}'
+            'status': result['status'],
+            'error': message,
+            'checked_at': result['checked_at']
         }), 503
+        
     except Exception as e:
         return jsonify({
             'status': 'error',
             'error': f'Erreur lors de la vérification: {str(e)}'
         }), 500
-
@@ -0,0 +1,177 @@
+"""Proxys AI asynchrones servis par l'application ASGI (src/asgi.py)
+
+Mêmes contrats que les routes Flask de src/routes/ai.py, mais un appel en attente du
+service AI n'occupe aucun thread: un worker peut garder des centaines de générations
+en cours. Les disjoncteurs, le budget de temps et les requêtes doublées sont ceux du
+client AI de l'application Flask, comme l'ordonnancement par organisation. Si le
+client se déconnecte, l'appel au service AI est annulé.
+"""
+import asyncio
+from functools import wraps
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.routes.auth import TokenError, decode_token
+from src.services.ai_client import CircuitOpen, DeadlineExceeded, request_deadline
+from src.services.ai_scheduler import QueueFull
+from src.services.content_generation import OPTIMIZATION_SUGGESTIONS, optimization_request
+
+class ClientDisconnected(Exception):
+    """Le client a fermé la connexion avant la réponse"""
+
+def token_required(f):
+    """Décorateur pour vérifier l'authentification JWT"""
+    @wraps(f)
+    async def decorated(request):
+        try:
+            current_user_id, current_org_id = decode_token(
+                request.headers, request.app.state.flask_app.config['SECRET_KEY']
+            )
+        except TokenError as e:
+            return JSONResponse({'error': str(e)}, 401)
+
+        return await f(request, current_user_id, current_org_id)
+
+    return decorated
+
+async def _wait_disconnect(request):
+    # Le corps est déjà lu: le prochain message ASGI est la déconnexion du client
+    while True:
+        message = await request.receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+async def call_ai_service(request, path, payload, org_id):
+    """Appel au service AI (file interactive de l'organisation), annulé si le client se déconnecte"""
+    ai_client = request.app.state.flask_app.extensions['ai_client']
+    deadline = request_deadline(request.headers, ai_client.budget)
+    scheduler = ai_client.scheduler
+    if scheduler is not None and not scheduler.has_plan(org_id):
+        # Lecture du plan en base hors de la boucle d'événements
+        await run_in_threadpool(scheduler.plan, org_id)
+    call = asyncio.ensure_future(ai_client.post_async(path, payload, deadline, org_id=org_id))
+    watcher = asyncio.ensure_future(_wait_disconnect(request))
+    try:
+        await asyncio.wait({call, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if not call.done():
+        call.cancel()
+        raise ClientDisconnected()
+    return call.result()
+
+def ai_errors(action):
+    """Traduit les erreurs d'appel au service AI en réponses JSON (comme les routes Flask)"""
+    def decorator(f):
+        @wraps(f)
+        async def decorated(request, *args):
+            import httpx
+
+            try:
+                return await f(request, *args)
+            except CircuitOpen as e:
+                retry_after = max(1, round(e.retry_after))
+                return JSONResponse({'error': 'Service AI indisponible', 'retry_after': round(e.retry_after)}, 503,
+                                    headers={'Retry-After': str(retry_after)})
+            except DeadlineExceeded:
+                return JSONResponse({'error': 'Délai dépassé pour le service AI'}, 504)
+            except QueueFull:
+                return JSONResponse({'error': 'Trop de requêtes AI en attente, réessayez plus tard'}, 429,
+                                    headers={'Retry-After': '1'})
+            except ClientDisconnected:
+                return JSONResponse({'error': 'Client déconnecté'}, 499)
+            except httpx.HTTPError as e:
+                return JSONResponse({'error': f'Erreur de communication avec le service AI: {str(e)}'}, 500)
+            except Exception as e:
+                return JSONResponse({'error': f'Erreur lors {action}: {str(e)}'}, 500)
+        return decorated
+    return decorator
+
+def upstream_error():
+    return JSONResponse({'error': 'Erreur du service AI'}, 500)
+
+@token_required
+@ai_errors('de la génération')
+async def generate_text(request, current_user_id, current_org_id):
+    """Proxy pour la génération de texte via le service AI"""
+    data = await request.json()
+
+    # Validation des données requises
+    if not data.get('prompt'):
+        return JSONResponse({'error': 'Le prompt est requis'}, 400)
+
+    ai_response = await call_ai_service(request, '/generate-text', data, current_org_id)
+    if ai_response.status_code != 200:
+        return upstream_error()
+
+    return JSONResponse(ai_response.json())
+
+@token_required
+@ai_errors("de la création d'embeddings")
+async def create_embeddings(request, current_user_id, current_org_id):
+    """Proxy pour la création d'embeddings via le service AI"""
+    data = await request.json()
+
+    # Validation des données requises
+    if not data.get('texts') or not isinstance(data['texts'], list):
+        return JSONResponse({'error': 'Une liste de textes est requise'}, 400)
+
+    ai_response = await call_ai_service(request, '/embed', data, current_org_id)
+    if ai_response.status_code != 200:
+        return upstream_error()
+
+    return JSONResponse(ai_response.json())
+
+@token_required
+@ai_errors('de la recherche')
+async def semantic_search(request, current_user_id, current_org_id):
+    """Proxy pour la recherche sémantique via le service AI"""
+    data = await request.json()
+
+    # Validation des données requises
+    if not data.get('query'):
+        return JSONResponse({'error': 'La requête de recherche est requise'}, 400)
+
+    ai_response = await call_ai_service(request, '/semantic-search', data, current_org_id)
+    if ai_response.status_code != 200:
+        return upstream_error()
+
+    return JSONResponse(ai_response.json())
+
+@token_required
+@ai_errors("de l'optimisation")
+async def optimize_content(request, current_user_id, current_org_id):
+    """Optimisation de contenu existant"""
+    data = await request.json()
+
+    # Validation des données requises
+    if not data.get('content'):
+        return JSONResponse({'error': 'Le contenu à optimiser est requis'}, 400)
+
+    content = data['content']
+    campaign_type = data.get('campaign_type', 'facebook')
+    optimization_goal = data.get('goal', 'engagement')  # engagement, conversion, awareness
+
+    ai_response = await call_ai_service(
+        request, '/generate-text', optimization_request(content, campaign_type, optimization_goal), current_org_id
+    )
+    if ai_response.status_code != 200:
+        return upstream_error()
+
+    return JSONResponse({
+        'original_content': content,
+        'optimized_content': ai_response.json().get('generated_text', ''),
+        'optimization_goal': optimization_goal,
+        'campaign_type': campaign_type,
+        'suggestions': OPTIMIZATION_SUGGESTIONS
+    })
+
+# Routes prioritaires sur l'application Flask montée à la racine
+routes = [
+    Route('/api/ai/generate-text', generate_text, methods=['POST']),
+    Route('/api/ai/embed', create_embeddings, methods=['POST']),
+    Route('/api/ai/semantic-search', semantic_search, methods=['POST']),
+    Route('/api/ai/optimize-content', optimize_content, methods=['POST'])
+]
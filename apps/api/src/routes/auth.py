@@ -4,9 +4,34 @@ import jwt
 from datetime import datetime, timedelta
 import re
 from src.models.user import db, User, Organization
+from src.instrumentation import timed
+from src.query_budget import query_budget
 
 auth_bp = Blueprint('auth', __name__)
 
+class TokenError(Exception):
+    """Token absent ou invalide (message de la réponse 401)"""
+
+def decode_token(headers, secret_key):
+    """Identité (user_id, org_id) du token de l'en-tête `Authorization: Bearer <token>`; lève TokenError"""
+    auth_header = headers.get('Authorization')
+    if auth_header is None:
+        raise TokenError('Token manquant')
+    try:
+        token = auth_header.split(" ")[1]
+    except IndexError:
+        raise TokenError('Token format invalide')
+    if not token:
+        raise TokenError('Token manquant')
+    
+    try:
+        data = jwt.decode(token, secret_key, algorithms=['HS256'])
+    except jwt.ExpiredSignatureError:
+        raise TokenError('Token expiré')
+    except jwt.InvalidTokenError:
+        raise TokenError('Token invalide')
+    return data['user_id'], data.get('org_id')
+
 def validate_email(email):
     """Valide le format de l'email"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -19,6 +44,7 @@ def validate_password(password):
     return True, ""
 
 @auth_bp.route('/signup', methods=['POST'])
+@query_budget(5)
 def signup():
     """Inscription d'un nouvel utilisateur et création d'organisation"""
     try:
@@ -59,10 +85,12 @@ def signup():
         db.session.flush()  # Pour obtenir l'ID de l'organisation
         
         # Création de l'utilisateur (propriétaire de l'organisation)
+        with timed('auth'):
+            password_hash = generate_password_hash(password)
         user = User(
             email=email,
             name=name,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hash,
             role='OWNER',
             org_id=organization.id,
             created_at=datetime.utcnow()
@@ -96,6 +124,7 @@ def signup():
         return jsonify({'error': f'Erreur lors de l\'inscription: {str(e)}'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@query_budget(1)
 def login():
     """Connexion d'un utilisateur existant"""
     try:
@@ -108,13 +137,15 @@ def login():
         email = data['email'].lower().strip()
         password = data['password']
         
-        # Recherche de l'utilisateur
-        user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        # Recherche de l'utilisateur et de son organisation (une seule requête)
+        user, organization = db.session.query(User, Organization) \
+            .outerjoin(Organization, Organization.id == User.org_id) \
+            .filter(User.email == email).first() or (None, None)
+        with timed('auth'):
+            valid_password = user is not None and check_password_hash(user.password_hash, password)
+        if not valid_password:
             return jsonify({'error': 'Email ou mot de passe incorrect'}), 401
         
-        # Récupération de l'organisation
-        organization = Organization.query.get(user.org_id)
         if not organization:
             return jsonify({'error': 'Organisation non trouvée'}), 404
         
@@ -143,6 +174,7 @@ def login():
         return jsonify({'error': f'Erreur lors de la connexion: {str(e)}'}), 500
 
 @auth_bp.route('/me', methods=['GET'])
+@query_budget(1)
 def get_current_user():
     """Récupération des informations de l'utilisateur connecté"""
     try:
@@ -160,17 +192,17 @@ def get_current_user():
             return jsonify({'error': 'Token manquant'}), 401
         
         # Décodage du token JWT
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        with timed('auth'):
+            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
         user_id = data['user_id']
         
-        # Récupération de l'utilisateur
-        user = User.query.get(user_id)
+        # Récupération de l'utilisateur et de son organisation (une seule requête)
+        user, organization = db.session.query(User, Organization) \
+            .outerjoin(Organization, Organization.id == User.org_id) \
+            .filter(User.id == user_id).first() or (None, None)
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
         
-        # Récupération de l'organisation
-        organization = Organization.query.get(user.org_id)
-        
         return jsonify({
             'user': {
                 'id': user.id,
@@ -207,7 +239,8 @@ def refresh_token():
             return jsonify({'error': 'Token manquant'}), 401
         
         # Décodage du token JWT (même expiré)
-        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'], options={"verify_exp": False})
+        with timed('auth'):
+            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'], options={"verify_exp": False})
         user_id = data['user_id']
         
         # Vérification que l'utilisateur existe toujours
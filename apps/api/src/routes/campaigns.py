@@ -1,11 +1,26 @@
 from flask import Blueprint, request, jsonify, current_app
 import json
-import requests
 from datetime import datetime, timedelta
-from src.models.user import db, Campaign, Customer
+from src.models.user import db, Campaign, CampaignDispatch, Customer, SENDING_LOCKED_FIELDS
+from src.serializers import campaign_serializer, pagination_dict, json_response
+from src.etags import list_etag, resource_etag, not_modified, with_etag
+from src.filters import filter_campaigns
+from src.services import sync
+from src.services.content_generation import render_request, generate_many
+from src.instrumentation import timed
+from src.services.ai_client import (
+    CircuitOpen, DeadlineExceeded, deadline_response, get_ai_client, queue_full_response, unavailable_response
+)
+from src.services.ai_scheduler import QueueFull
+from src.query_budget import query_budget
 
 campaigns_bp = Blueprint('campaigns', __name__)
 
+# Nombre maximal de campagnes traitées par un appel de génération en masse
+BULK_GENERATE_MAX = 100
+# Taille des lots d'écriture du contenu généré
+BULK_UPDATE_CHUNK = 50
+
 def token_required(f):
     """Décorateur pour vérifier l'authentification JWT"""
     from functools import wraps
@@ -26,7 +41,8 @@ def token_required(f):
             return jsonify({'error': 'Token manquant'}), 401
         
         try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+            with timed('auth'):
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
             current_user_id = data['user_id']
             current_org_id = data.get('org_id')
         except jwt.ExpiredSignatureError:
@@ -39,6 +55,7 @@ def token_required(f):
     return decorated
 
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns', methods=['GET'])
+@query_budget(3)
 @token_required
 def get_campaigns(current_user_id, current_org_id, org_id):
     """Récupération de la liste des campagnes d'une organisation"""
@@ -53,38 +70,73 @@ def get_campaigns(current_user_id, current_org_id, org_id):
         status = request.args.get('status', '').strip()
         campaign_type = request.args.get('type', '').strip()
         
-        # Construction de la requête
-        query = Campaign.query.filter_by(org_id=org_id)
+        # Champs à retourner (?fields=), projection légère par défaut
+        try:
+            serializer = campaign_serializer.project(request.args.get('fields'), lean=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Filtrage par statut
-        if status:
-            query = query.filter_by(status=status)
+        # Construction de la requête (filtrage par statut et type de campagne)
+        query = filter_campaigns(Campaign.query.filter_by(org_id=org_id), status, campaign_type)
         
-        # Filtrage par type de campagne
-        if campaign_type:
-            query = query.filter_by(campaign_type=campaign_type)
+        # Requête conditionnelle: liste inchangée depuis le dernier sondage
+        etag = list_etag(query, Campaign)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
         
-        # Pagination
-        campaigns_paginated = query.order_by(Campaign.created_at.desc()).paginate(
+        # Pagination (colonnes sérialisées uniquement)
+        campaigns_paginated = query.with_entities(*serializer.columns).order_by(Campaign.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        return jsonify({
-            'campaigns': [campaign.to_dict() for campaign in campaigns_paginated.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': campaigns_paginated.total,
-                'pages': campaigns_paginated.pages,
-                'has_next': campaigns_paginated.has_next,
-                'has_prev': campaigns_paginated.has_prev
-            }
-        }), 200
+        return with_etag(json_response({
+            'campaigns': serializer.serialize(campaigns_paginated.items),
+            'pagination': pagination_dict(campaigns_paginated, page, per_page)
+        }), etag, weak=True)
         
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la récupération: {str(e)}'}), 500
 
+@campaigns_bp.route('/orgs/<int:org_id>/campaigns/changes', methods=['GET'])
+@query_budget(3)
+@token_required
+def get_campaigns_changes(current_user_id, current_org_id, org_id):
+    """Synchronisation incrémentale: campagnes modifiées et supprimées depuis ?since=<jeton>"""
+    try:
+        # Vérification des permissions
+        if current_org_id != org_id:
+            return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
+        
+        limit = max(1, min(request.args.get('limit', sync.DEFAULT_LIMIT, type=int), sync.MAX_LIMIT))
+        
+        # Champs à retourner (?fields=), tous par défaut pour une réplique locale
+        try:
+            serializer = campaign_serializer.project(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            rows, deleted, token, has_more = sync.changes(
+                Campaign, org_id, request.args.get('since'), serializer.columns, limit
+            )
+        except sync.SyncTokenExpired as e:
+            return jsonify({'error': str(e)}), 410
+        except sync.SyncTokenError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return json_response({
+            'campaigns': serializer.serialize(rows),
+            'deleted': deleted,
+            'next_token': token,
+            'has_more': has_more
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Erreur lors de la synchronisation: {str(e)}'}), 500
+
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns', methods=['POST'])
+@query_budget(3)
 @token_required
 def create_campaign(current_user_id, current_org_id, org_id):
     """Création d'une nouvelle campagne"""
@@ -140,6 +192,7 @@ def create_campaign(current_user_id, current_org_id, org_id):
         return jsonify({'error': f'Erreur lors de la création: {str(e)}'}), 500
 
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns/<int:campaign_id>', methods=['GET'])
+@query_budget(2)
 @token_required
 def get_campaign(current_user_id, current_org_id, org_id, campaign_id):
     """Récupération d'une campagne spécifique"""
@@ -148,19 +201,140 @@ def get_campaign(current_user_id, current_org_id, org_id, campaign_id):
         if current_org_id != org_id:
             return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
         
-        campaign = Campaign.query.filter_by(id=campaign_id, org_id=org_id).first()
+        # Champs à retourner (?fields=), tous par défaut
+        try:
+            serializer = campaign_serializer.project(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Requête conditionnelle: une seule lecture de updated_at si inchangé
+        etag = resource_etag(Campaign, campaign_id, org_id)
+        if etag is None:
+            return jsonify({'error': 'Campagne non trouvée'}), 404
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        campaign = db.session.query(*serializer.columns).filter(
+            Campaign.id == campaign_id,
+            Campaign.org_id == org_id
+        ).first()
         if not campaign:
             return jsonify({'error': 'Campagne non trouvée'}), 404
         
-        return jsonify({'campaign': campaign.to_dict()}), 200
+        return with_etag(json_response({'campaign': serializer.row_to_dict(campaign)}), etag)
         
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la récupération: {str(e)}'}), 500
 
+@campaigns_bp.route('/orgs/<int:org_id>/campaigns/generate-content', methods=['POST'])
+@token_required
+def bulk_generate_campaign_content(current_user_id, current_org_id, org_id):
+    """Génération de contenu pour plusieurs campagnes en un seul appel"""
+    try:
+        # Vérification des permissions
+        if current_org_id != org_id:
+            return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
+        
+        data = request.get_json() or {}
+        campaign_ids = data.get('campaign_ids')
+        filters = data.get('filter')
+        
+        if not campaign_ids and not filters:
+            return jsonify({'error': 'Une liste campaign_ids ou un filtre est requis'}), 400
+        
+        # Sélection des campagnes (colonnes nécessaires au prompt uniquement)
+        query = db.session.query(
+            Campaign.id, Campaign.title, Campaign.campaign_type, Campaign.status
+        ).filter(Campaign.org_id == org_id)
+        
+        if campaign_ids:
+            if (not isinstance(campaign_ids, list) or len(campaign_ids) > BULK_GENERATE_MAX
+                    or not all(isinstance(campaign_id, int) and not isinstance(campaign_id, bool)
+                               for campaign_id in campaign_ids)):
+                return jsonify({'error': f'campaign_ids doit être une liste de {BULK_GENERATE_MAX} identifiants maximum'}), 400
+            query = query.filter(Campaign.id.in_(campaign_ids))
+        if filters:
+            if not isinstance(filters, dict) or not all(
+                    isinstance(filters.get(key) or '', str) for key in ('status', 'type')):
+                return jsonify({'error': 'filter doit être un objet (status, type, only_empty)'}), 400
+            if filters.get('status'):
+                query = query.filter(Campaign.status == filters['status'])
+            if filters.get('type'):
+                query = query.filter(Campaign.campaign_type == filters['type'])
+            if filters.get('only_empty'):
+                query = query.filter(db.or_(Campaign.generated_content.is_(None), Campaign.generated_content == ''))
+        
+        campaigns = query.order_by(Campaign.id).limit(BULK_GENERATE_MAX).all()
+        # Campagnes en cours d'envoi: contenu verrouillé jusqu'à la fin de l'envoi
+        sending = [campaign.id for campaign in campaigns if campaign.status == 'sending']
+        campaigns = [campaign for campaign in campaigns if campaign.status != 'sending']
+        
+        # Rendu des prompts en masse
+        prompt = data.get('prompt')
+        template = data.get('template', '')
+        jobs = [
+            (campaign.id, render_request(campaign.campaign_type, prompt or campaign.title, template))
+            for campaign in campaigns
+        ]
+        
+        # Libère la connexion pendant les appels au service AI
+        db.session.commit()
+        
+        if not get_ai_client().available('/generate-text'):
+            return jsonify({'error': 'Service AI indisponible'}), 503
+        
+        with timed('upstream'):
+            outcomes = generate_many(
+                get_ai_client(),
+                jobs,
+                concurrency=current_app.config.get('AI_BULK_CONCURRENCY', 4),
+                deadline=get_ai_client().deadline(),
+                org_id=org_id
+            )
+        
+        results = [
+            {'campaign_id': campaign_id, 'status': 'error', 'error': 'Campagne en cours d\'envoi'}
+            for campaign_id in sending
+        ]
+        updates = []
+        now = datetime.utcnow()
+        for campaign in campaigns:
+            generated_content, error = outcomes[campaign.id]
+            if error:
+                results.append({'campaign_id': campaign.id, 'status': 'error', 'error': error})
+                continue
+            updates.append({'id': campaign.id, 'generated_content': generated_content, 'updated_at': now})
+            results.append({'campaign_id': campaign.id, 'status': 'generated', 'generated_content': generated_content})
+        
+        # Écriture du contenu généré par lots
+        for start in range(0, len(updates), BULK_UPDATE_CHUNK):
+            db.session.bulk_update_mappings(Campaign, updates[start:start + BULK_UPDATE_CHUNK])
+        db.session.commit()
+        
+        if campaign_ids:
+            found = {campaign.id for campaign in campaigns} | set(sending)
+            for campaign_id in campaign_ids:
+                if campaign_id not in found:
+                    results.append({'campaign_id': campaign_id, 'status': 'error', 'error': 'Campagne non trouvée'})
+        
+        return jsonify({
+            'message': f'{len(updates)} contenu(s) généré(s)',
+            'generated_count': len(updates),
+            'error_count': len(results) - len(updates),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erreur lors de la génération: {str(e)}'}), 500
+
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns/<int:campaign_id>/generate-content', methods=['POST'])
 @token_required
 def generate_campaign_content(current_user_id, current_org_id, org_id, campaign_id):
     """Génération de contenu pour une campagne avec l'IA"""
+    import requests
+    
     try:
         # Vérification des permissions
         if current_org_id != org_id:
@@ -169,6 +343,8 @@ def generate_campaign_content(current_user_id, current_org_id, org_id, campaign_
         campaign = Campaign.query.filter_by(id=campaign_id, org_id=org_id).first()
         if not campaign:
             return jsonify({'error': 'Campagne non trouvée'}), 404
+        if campaign.status == 'sending':
+            return jsonify({'error': 'Impossible de modifier une campagne en cours d\'envoi'}), 409
         
         data = request.get_json()
         
@@ -176,28 +352,12 @@ def generate_campaign_content(current_user_id, current_org_id, org_id, campaign_
         prompt = data.get('prompt', campaign.title)
         template = data.get('template', '')
         
-        # Sélection du template par défaut selon le type de campagne
-        if not template:
-            templates = {
-                'facebook': "Créez une publication Facebook engageante pour promouvoir {prompt}. Incluez des emojis et un appel à l'action. Maximum 150 caractères.",
-                'sms': "Rédigez un SMS promotionnel pour {prompt}. Maximum 160 caractères. Incluez un appel à l'action clair.",
-                'email': "Rédigez l'objet et le contenu d'un email marketing pour {prompt}. Ton professionnel mais engageant.",
-                'whatsapp': "Créez un message WhatsApp Business pour promouvoir {prompt}. Ton amical et direct."
-            }
-            template = templates.get(campaign.campaign_type, "Créez du contenu marketing pour {prompt}")
-        
-        # Appel au service AI
+        # Appel au service AI (template par défaut selon le type de campagne)
         try:
-            ai_response = requests.post(
-                f"{current_app.config['AI_SERVICE_URL']}/generate-text",
-                json={
-                    'prompt': prompt,
-                    'template': template,
-                    'max_tokens': 200,
-                    'temperature': 0.7
-                },
-                timeout=30
-            )
+            with timed('upstream'):
+                ai_response = get_ai_client().post(
+                    '/generate-text', render_request(campaign.campaign_type, prompt, template), org_id=org_id
+                )
             
             if ai_response.status_code != 200:
                 return jsonify({'error': 'Erreur du service AI'}), 500
@@ -205,6 +365,12 @@ def generate_campaign_content(current_user_id, current_org_id, org_id, campaign_
             ai_data = ai_response.json()
             generated_content = ai_data.get('generated_text', '')
             
+        except CircuitOpen as e:
+            return unavailable_response(e)
+        except DeadlineExceeded as e:
+            return deadline_response(e)
+        except QueueFull as e:
+            return queue_full_response(e)
         except requests.RequestException as e:
             return jsonify({'error': f'Erreur de communication avec le service AI: {str(e)}'}), 500
         
@@ -224,6 +390,7 @@ def generate_campaign_content(current_user_id, current_org_id, org_id, campaign_
         return jsonify({'error': f'Erreur lors de la génération: {str(e)}'}), 500
 
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns/<int:campaign_id>', methods=['PUT'])
+@query_budget(3)
 @token_required
 def update_campaign(current_user_id, current_org_id, org_id, campaign_id):
     """Mise à jour d'une campagne"""
@@ -238,6 +405,10 @@ def update_campaign(current_user_id, current_org_id, org_id, campaign_id):
         
         data = request.get_json()
         
+        # La campagne appartient au planificateur jusqu'à la fin de l'envoi
+        if campaign.status == 'sending' and any(field in data for field in SENDING_LOCKED_FIELDS):
+            return jsonify({'error': 'Impossible de modifier une campagne en cours d\'envoi'}), 409
+        
         # Mise à jour des champs
         if 'title' in data:
             campaign.title = data['title'].strip()
@@ -277,6 +448,7 @@ def update_campaign(current_user_id, current_org_id, org_id, campaign_id):
         return jsonify({'error': f'Erreur lors de la mise à jour: {str(e)}'}), 500
 
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns/<int:campaign_id>', methods=['DELETE'])
+@query_budget(5)
 @token_required
 def delete_campaign(current_user_id, current_org_id, org_id, campaign_id):
     """Suppression d'une campagne"""
@@ -292,6 +464,10 @@ def delete_campaign(current_user_id, current_org_id, org_id, campaign_id):
         # Vérification que la campagne n'est pas déjà envoyée
         if campaign.status == 'sent':
             return jsonify({'error': 'Impossible de supprimer une campagne déjà envoyée'}), 400
+        if campaign.status == 'sending':
+            return jsonify({'error': 'Impossible de supprimer une campagne en cours d\'envoi'}), 400
+        
+        CampaignDispatch.query.filter_by(campaign_id=campaign.id).delete()
         
         db.session.delete(campaign)
         db.session.commit()
@@ -302,6 +478,24 @@ def delete_campaign(current_user_id, current_org_id, org_id, campaign_id):
         db.session.rollback()
         return jsonify({'error': f'Erreur lors de la suppression: {str(e)}'}), 500
 
+@campaigns_bp.route('/orgs/<int:org_id>/campaigns/<int:campaign_id>/dispatch', methods=['GET'])
+@token_required
+def get_campaign_dispatch(current_user_id, current_org_id, org_id, campaign_id):
+    """Suivi de l'envoi d'une campagne planifiée (statut et compteurs)"""
+    try:
+        # Vérification des permissions
+        if current_org_id != org_id:
+            return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
+        
+        dispatch = CampaignDispatch.query.filter_by(campaign_id=campaign_id, org_id=org_id).first()
+        if not dispatch:
+            return jsonify({'error': 'Aucun envoi pour cette campagne'}), 404
+        
+        return jsonify({'dispatch': dispatch.to_dict()}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erreur lors de la récupération: {str(e)}'}), 500
+
 @campaigns_bp.route('/orgs/<int:org_id>/campaigns/<int:campaign_id>/preview', methods=['GET'])
 @token_required
 def preview_campaign(current_user_id, current_org_id, org_id, campaign_id):
@@ -2,11 +2,21 @@ from flask import Blueprint, request, jsonify, current_app
 import json
 import csv
 import io
+from collections import Counter
 from datetime import datetime
 from src.models.user import db, Customer
+from src.serializers import customer_serializer, pagination_dict, json_response
+from src.etags import list_etag, resource_etag, not_modified, with_etag
+from src.filters import filter_customers, split_tags
+from src.services import bulk_customers as bulk_customers_service, stats, sync
+from src.instrumentation import timed
+from src.query_budget import query_budget
 
 customers_bp = Blueprint('customers', __name__)
 
+# Emails vérifiés par requête lors d'un import CSV
+IMPORT_EMAIL_CHUNK_SIZE = 500
+
 def token_required(f):
     """Décorateur pour vérifier l'authentification JWT"""
     from functools import wraps
@@ -27,7 +37,8 @@ def token_required(f):
             return jsonify({'error': 'Token manquant'}), 401
         
         try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+            with timed('auth'):
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
             current_user_id = data['user_id']
             current_org_id = data.get('org_id')
         except jwt.ExpiredSignatureError:
@@ -40,6 +51,7 @@ def token_required(f):
     return decorated
 
 @customers_bp.route('/orgs/<int:org_id>/customers', methods=['GET'])
+@query_budget(3)
 @token_required
 def get_customers(current_user_id, current_org_id, org_id):
     """Récupération de la liste des clients d'une organisation"""
@@ -54,47 +66,73 @@ def get_customers(current_user_id, current_org_id, org_id):
         search = request.args.get('search', '').strip()
         tags = request.args.get('tags', '').strip()
         
-        # Construction de la requête
-        query = Customer.query.filter_by(org_id=org_id)
-        
-        # Filtrage par recherche (nom, email, téléphone)
-        if search:
-            search_filter = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    Customer.name.ilike(search_filter),
-                    Customer.email.ilike(search_filter),
-                    Customer.phone.ilike(search_filter)
-                )
-            )
+        # Champs à retourner (?fields=), projection légère par défaut
+        try:
+            serializer = customer_serializer.project(request.args.get('fields'), lean=True)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Filtrage par tags
-        if tags:
-            tag_list = [tag.strip() for tag in tags.split(',')]
-            for tag in tag_list:
-                query = query.filter(Customer.tags.contains(f'"{tag}"'))
+        # Construction de la requête (recherche: nom, email, téléphone; tags: tous requis)
+        query = filter_customers(Customer.query.filter_by(org_id=org_id), search, split_tags(tags))
         
-        # Pagination
-        customers_paginated = query.order_by(Customer.created_at.desc()).paginate(
+        # Requête conditionnelle: liste inchangée depuis le dernier sondage
+        etag = list_etag(query, Customer)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+        
+        # Pagination (colonnes sérialisées uniquement)
+        customers_paginated = query.with_entities(*serializer.columns).order_by(Customer.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        return jsonify({
-            'customers': [customer.to_dict() for customer in customers_paginated.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': customers_paginated.total,
-                'pages': customers_paginated.pages,
-                'has_next': customers_paginated.has_next,
-                'has_prev': customers_paginated.has_prev
-            }
-        }), 200
+        return with_etag(json_response({
+            'customers': serializer.serialize(customers_paginated.items),
+            'pagination': pagination_dict(customers_paginated, page, per_page)
+        }), etag, weak=True)
         
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la récupération: {str(e)}'}), 500
 
+@customers_bp.route('/orgs/<int:org_id>/customers/changes', methods=['GET'])
+@query_budget(3)
+@token_required
+def get_customers_changes(current_user_id, current_org_id, org_id):
+    """Synchronisation incrémentale: clients modifiés et supprimés depuis ?since=<jeton>"""
+    try:
+        # Vérification des permissions
+        if current_org_id != org_id:
+            return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
+        
+        limit = max(1, min(request.args.get('limit', sync.DEFAULT_LIMIT, type=int), sync.MAX_LIMIT))
+        
+        # Champs à retourner (?fields=), tous par défaut pour une réplique locale
+        try:
+            serializer = customer_serializer.project(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            rows, deleted, token, has_more = sync.changes(
+                Customer, org_id, request.args.get('since'), serializer.columns, limit
+            )
+        except sync.SyncTokenExpired as e:
+            return jsonify({'error': str(e)}), 410
+        except sync.SyncTokenError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return json_response({
+            'customers': serializer.serialize(rows),
+            'deleted': deleted,
+            'next_token': token,
+            'has_more': has_more
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Erreur lors de la synchronisation: {str(e)}'}), 500
+
 @customers_bp.route('/orgs/<int:org_id>/customers', methods=['POST'])
+@query_budget(4)
 @token_required
 def create_customer(current_user_id, current_org_id, org_id):
     """Création d'un nouveau client"""
@@ -141,6 +179,7 @@ def create_customer(current_user_id, current_org_id, org_id):
         return jsonify({'error': f'Erreur lors de la création: {str(e)}'}), 500
 
 @customers_bp.route('/orgs/<int:org_id>/customers/<int:customer_id>', methods=['GET'])
+@query_budget(2)
 @token_required
 def get_customer(current_user_id, current_org_id, org_id, customer_id):
     """Récupération d'un client spécifique"""
@@ -149,16 +188,34 @@ def get_customer(current_user_id, current_org_id, org_id, customer_id):
         if current_org_id != org_id:
             return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
         
-        customer = Customer.query.filter_by(id=customer_id, org_id=org_id).first()
+        # Champs à retourner (?fields=), tous par défaut
+        try:
+            serializer = customer_serializer.project(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Requête conditionnelle: une seule lecture de updated_at si inchangé
+        etag = resource_etag(Customer, customer_id, org_id)
+        if etag is None:
+            return jsonify({'error': 'Client non trouvé'}), 404
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        
+        customer = db.session.query(*serializer.columns).filter(
+            Customer.id == customer_id,
+            Customer.org_id == org_id
+        ).first()
         if not customer:
             return jsonify({'error': 'Client non trouvé'}), 404
         
-        return jsonify({'customer': customer.to_dict()}), 200
+        return with_etag(json_response({'customer': serializer.row_to_dict(customer)}), etag)
         
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la récupération: {str(e)}'}), 500
 
 @customers_bp.route('/orgs/<int:org_id>/customers/<int:customer_id>', methods=['PUT'])
+@query_budget(4)
 @token_required
 def update_customer(current_user_id, current_org_id, org_id, customer_id):
     """Mise à jour d'un client"""
@@ -207,6 +264,7 @@ def update_customer(current_user_id, current_org_id, org_id, customer_id):
         return jsonify({'error': f'Erreur lors de la mise à jour: {str(e)}'}), 500
 
 @customers_bp.route('/orgs/<int:org_id>/customers/<int:customer_id>', methods=['DELETE'])
+@query_budget(4)
 @token_required
 def delete_customer(current_user_id, current_org_id, org_id, customer_id):
     """Suppression d'un client"""
@@ -228,6 +286,39 @@ def delete_customer(current_user_id, current_org_id, org_id, customer_id):
         db.session.rollback()
         return jsonify({'error': f'Erreur lors de la suppression: {str(e)}'}), 500
 
+@customers_bp.route('/orgs/<int:org_id>/customers/bulk', methods=['POST'])
+@query_budget(max_repeats=None)
+@token_required
+def bulk_customers(current_user_id, current_org_id, org_id):
+    """Opération groupée sur les clients correspondant à un filtre
+    
+    Corps: {"filter": {"search", "tags", "ids" | "all": true},
+            "operation": "add_tags" | "remove_tags" | "set" | "delete",
+            "tags": [...] (add_tags/remove_tags), "fields": {...} (set)}
+    """
+    try:
+        # Vérification des permissions
+        if current_org_id != org_id:
+            return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
+        
+        try:
+            filters, operation, params = bulk_customers_service.validate(request.get_json() or {})
+        except bulk_customers_service.BulkOperationError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        counts = bulk_customers_service.run(org_id, filters, operation, params)
+        
+        return jsonify({
+            'message': 'Opération groupée effectuée avec succès',
+            'operation': operation,
+            'matched': counts['matched'],
+            'affected': counts['affected']
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erreur lors de l\'opération groupée: {str(e)}'}), 500
+
 @customers_bp.route('/orgs/<int:org_id>/customers/import', methods=['POST'])
 @token_required
 def import_customers(current_user_id, current_org_id, org_id):
@@ -251,49 +342,65 @@ def import_customers(current_user_id, current_org_id, org_id):
         stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
         csv_input = csv.DictReader(stream)
         
-        imported_count = 0
+        rows = list(enumerate(csv_input, start=2))  # Start=2 car ligne 1 = headers
+        
+        # Emails déjà présents, lus par lots plutôt qu'une requête par ligne
+        file_emails = list({row['email'].strip().lower() for _, row in rows if row.get('email') and row['email'].strip()})
+        existing_emails = set()
+        for start in range(0, len(file_emails), IMPORT_EMAIL_CHUNK_SIZE):
+            chunk = file_emails[start:start + IMPORT_EMAIL_CHUNK_SIZE]
+            existing_emails.update(
+                email for (email,) in db.session.query(Customer.email)
+                .filter(Customer.org_id == org_id, Customer.email.in_(chunk))
+            )
+        
+        imported = []
         errors = []
+        now = datetime.utcnow()
         
-        for row_num, row in enumerate(csv_input, start=2):  # Start=2 car ligne 1 = headers
+        for row_num, row in rows:
             try:
                 # Validation des données requises
                 if not row.get('name', '').strip():
                     errors.append(f"Ligne {row_num}: Le nom est requis")
                     continue
                 
-                # Vérification de l'unicité de l'email
+                # Vérification de l'unicité de l'email (base et lignes précédentes du fichier)
                 email = row.get('email', '').strip().lower() if row.get('email') else None
                 if email:
-                    existing_customer = Customer.query.filter_by(
-                        org_id=org_id, 
-                        email=email
-                    ).first()
-                    if existing_customer:
+                    if email in existing_emails:
                         errors.append(f"Ligne {row_num}: Email {email} déjà existant")
                         continue
+                    existing_emails.add(email)
                 
                 # Traitement des tags (séparés par des virgules)
                 tags = []
                 if row.get('tags'):
                     tags = [tag.strip() for tag in row['tags'].split(',') if tag.strip()]
                 
-                # Création du client
-                customer = Customer(
-                    org_id=org_id,
-                    name=row['name'].strip(),
-                    phone=row.get('phone', '').strip() if row.get('phone') else None,
-                    email=email,
-                    tags=json.dumps(tags),
-                    extra_data=json.dumps({})
-                )
-                
-                db.session.add(customer)
-                imported_count += 1
+                imported.append({
+                    'org_id': org_id,
+                    'name': row['name'].strip(),
+                    'phone': row.get('phone', '').strip() if row.get('phone') else None,
+                    'email': email,
+                    'tags': json.dumps(tags),
+                    'extra_data': json.dumps({}),
+                    'created_at': now,
+                    'updated_at': now
+                })
                 
             except Exception as e:
                 errors.append(f"Ligne {row_num}: {str(e)}")
         
+        # Insertion groupée: statistiques mises à jour explicitement (hors écouteur ORM)
+        if imported:
+            db.session.bulk_insert_mappings(Customer, imported)
+            deltas = Counter()
+            for customer in imported:
+                deltas.update(stats.customer_deltas(org_id, customer['tags'], 1))
+            stats.record_deltas(db.session, deltas)
         db.session.commit()
+        imported_count = len(imported)
         
         return jsonify({
             'message': f'{imported_count} clients importés avec succès',
@@ -306,6 +413,7 @@ def import_customers(current_user_id, current_org_id, org_id):
         return jsonify({'error': f'Erreur lors de l\'importation: {str(e)}'}), 500
 
 @customers_bp.route('/orgs/<int:org_id>/customers/export', methods=['GET'])
+@query_budget(1)
 @token_required
 def export_customers(current_user_id, current_org_id, org_id):
     """Exportation des clients au format CSV"""
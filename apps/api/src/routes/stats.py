@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.services.stats import get_org_stats
+from src.instrumentation import timed
+from src.query_budget import query_budget
+
+stats_bp = Blueprint('stats', __name__)
+
+def token_required(f):
+    """Décorateur pour vérifier l'authentification JWT"""
+    from functools import wraps
+    import jwt
+    
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = None
+        
+        if 'Authorization' in request.headers:
+            auth_header = request.headers['Authorization']
+            try:
+                token = auth_header.split(" ")[1]
+            except IndexError:
+                return jsonify({'error': 'Token format invalide'}), 401
+        
+        if not token:
+            return jsonify({'error': 'Token manquant'}), 401
+        
+        try:
+            with timed('auth'):
+                data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+            current_user_id = data['user_id']
+            current_org_id = data.get('org_id')
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token expiré'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Token invalide'}), 401
+        
+        return f(current_user_id, current_org_id, *args, **kwargs)
+    
+    return decorated
+
+@stats_bp.route('/orgs/<int:org_id>/stats', methods=['GET'])
+@query_budget(8)
+@token_required
+def get_stats(current_user_id, current_org_id, org_id):
+    """Statistiques du tableau de bord (lecture unique de la table org_stats)"""
+    try:
+        # Vérification des permissions
+        if current_org_id != org_id:
+            return jsonify({'error': 'Accès non autorisé à cette organisation'}), 403
+        
+        return jsonify({'stats': get_org_stats(org_id)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'Erreur lors de la récupération des statistiques: {str(e)}'}), 500
@@ -0,0 +1,65 @@
+"""Planificateur des campagnes: python -m src.scheduler (depuis apps/api)"""
+import logging
+import os
+import signal
+import sys
+import time
+
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.services.dispatcher import CampaignDispatcher
+from src.services import sync
+
+logger = logging.getLogger('ai4local.scheduler')
+
+def main():
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+
+    from src.main import app
+
+    poll_interval = float(os.getenv('SCHEDULER_POLL_INTERVAL', '15'))
+    purge_interval = float(os.getenv('SYNC_PURGE_INTERVAL', '3600'))
+    last_purge = None
+    dispatcher = CampaignDispatcher(
+        worker_id=os.getenv('SCHEDULER_WORKER_ID'),
+        batch_size=int(os.getenv('SCHEDULER_BATCH_SIZE', '1000')),
+        concurrency=int(os.getenv('SCHEDULER_CONCURRENCY', '4')),
+        lease_seconds=int(os.getenv('SCHEDULER_LEASE_SECONDS', '300'))
+    )
+
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    logger.info("Planificateur démarré (%s)", dispatcher.worker_id)
+    while running:
+        with app.app_context():
+            try:
+                processed = dispatcher.run_once()
+            except Exception:
+                logger.exception("Erreur lors du cycle de planification")
+                processed = 0
+            # Purge périodique du journal des suppressions (synchronisation incrémentale)
+            if last_purge is None or time.monotonic() - last_purge >= purge_interval:
+                try:
+                    purged = sync.purge()
+                    if purged:
+                        logger.info("%d suppression(s) expirée(s) purgée(s) du journal", purged)
+                except Exception:
+                    logger.exception("Erreur lors de la purge du journal des suppressions")
+                last_purge = time.monotonic()
+        if not processed:
+            time.sleep(poll_interval)
+    logger.info("Planificateur arrêté")
+
+if __name__ == '__main__':
+    main()
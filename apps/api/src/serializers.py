@@ -0,0 +1,158 @@
+"""Sérialisation rapide des clients et campagnes
+
+Contrairement à `Model.to_dict()`, les sérialiseurs ne chargent que les colonnes
+nécessaires (projection choisie par ?fields=), transmettent tel quel le JSON
+stocké dans les colonnes texte (tags, extra_data, target_audience) quand orjson
+est disponible et que ce JSON est valide (null sinon), et encodent la réponse en
+une seule passe.
+"""
+import json
+
+from flask import current_app
+
+from src.models.user import Customer, Campaign
+from src.instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson est optionnel
+    orjson = None
+
+def _decode_stored(text):
+    # JSON stocké illisible (données anciennes ou corrompues): null plutôt qu'une erreur
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+if orjson is not None and hasattr(orjson, 'Fragment'):
+    def _stored_json(text):
+        # Validé par orjson.loads (bien moins coûteux qu'un décodage suivi d'un encodage)
+        # puis inséré tel quel; sinon décodé par json, qui accepte NaN et Infinity
+        try:
+            orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return _decode_stored(text)
+        return orjson.Fragment(text)
+
+    def dumps(obj):
+        return orjson.dumps(obj)
+else:
+    _stored_json = _decode_stored
+
+    def _default(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        raise TypeError(f'Type non sérialisable: {type(value).__name__}')
+
+    def dumps(obj):
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+# Types de champ
+VALUE = 'value'
+JSON = 'json'
+
+class ListSerializer:
+    """Sérialiseur de lignes pour un modèle: clé de sortie -> (colonne, type, défaut JSON)"""
+
+    def __init__(self, fields, default_fields=None):
+        self.fields = fields
+        # Projection utilisée pour les listes quand ?fields= est absent
+        self.default_fields = default_fields
+        self.keys = list(fields)
+        self.columns = [column for column, _, _ in fields.values()]
+        self.json_fields = [
+            (index, default)
+            for index, (_, kind, default) in enumerate(fields.values())
+            if kind == JSON
+        ]
+
+    def row_to_dict(self, row):
+        values = list(row)
+        for index, default in self.json_fields:
+            text = values[index]
+            values[index] = _stored_json(text) if text else _stored_json(default)
+        return dict(zip(self.keys, values))
+
+    def serialize(self, rows):
+        with timed('serialize'):
+            return [self.row_to_dict(row) for row in rows]
+
+    def project(self, fields_param, lean=False):
+        """Sérialiseur restreint aux champs demandés (?fields=a,b,c ou ?fields=* pour tout).
+
+        Sans paramètre, les listes (`lean=True`) utilisent la projection par défaut et
+        les ressources individuelles tous les champs. L'id est toujours inclus.
+        Lève ValueError pour un champ inconnu.
+        """
+        if fields_param:
+            fields_param = fields_param.strip()
+        if fields_param == '*':
+            return self
+        if not fields_param:
+            if not lean or not self.default_fields:
+                return self
+            requested = set(self.default_fields)
+        else:
+            requested = {name.strip() for name in fields_param.split(',') if name.strip()}
+            unknown = requested - set(self.fields)
+            if unknown:
+                raise ValueError(
+                    f"Champ(s) inconnu(s): {', '.join(sorted(unknown))}. "
+                    f"Champs disponibles: {', '.join(self.keys)}"
+                )
+        requested.add('id')
+        return ListSerializer({key: spec for key, spec in self.fields.items() if key in requested})
+
+CUSTOMER_FIELDS = {
+    'id': (Customer.id, VALUE, None),
+    'org_id': (Customer.org_id, VALUE, None),
+    'name': (Customer.name, VALUE, None),
+    'phone': (Customer.phone, VALUE, None),
+    'email': (Customer.email, VALUE, None),
+    'tags': (Customer.tags, JSON, '[]'),
+    'metadata': (Customer.extra_data, JSON, '{}'),
+    'created_at': (Customer.created_at, VALUE, None),
+    'updated_at': (Customer.updated_at, VALUE, None)
+}
+
+CAMPAIGN_FIELDS = {
+    'id': (Campaign.id, VALUE, None),
+    'org_id': (Campaign.org_id, VALUE, None),
+    'title': (Campaign.title, VALUE, None),
+    'description': (Campaign.description, VALUE, None),
+    'draft_content': (Campaign.draft_content, VALUE, None),
+    'generated_content': (Campaign.generated_content, VALUE, None),
+    'target_audience': (Campaign.target_audience, JSON, '[]'),
+    'schedule_at': (Campaign.schedule_at, VALUE, None),
+    'status': (Campaign.status, VALUE, None),
+    'campaign_type': (Campaign.campaign_type, VALUE, None),
+    'metadata': (Campaign.extra_data, JSON, '{}'),
+    'created_at': (Campaign.created_at, VALUE, None),
+    'updated_at': (Campaign.updated_at, VALUE, None)
+}
+
+# Projection légère des listes de campagnes: sans les textes longs
+CAMPAIGN_LIST_FIELDS = (
+    'id', 'org_id', 'title', 'target_audience', 'schedule_at', 'status',
+    'campaign_type', 'metadata', 'created_at', 'updated_at'
+)
+
+customer_serializer = ListSerializer(CUSTOMER_FIELDS)
+campaign_serializer = ListSerializer(CAMPAIGN_FIELDS, default_fields=CAMPAIGN_LIST_FIELDS)
+
+def pagination_dict(paginated, page, per_page):
+    return {
+        'page': page,
+        'per_page': per_page,
+        'total': paginated.total,
+        'pages': paginated.pages,
+        'has_next': paginated.has_next,
+        'has_prev': paginated.has_prev
+    }
+
+def json_response(payload, status=200):
+    """Équivalent de jsonify() utilisant l'encodeur rapide"""
+    with timed('serialize'):
+        body = dumps(payload)
+    return current_app.response_class(body, status=status, mimetype='application/json')
@@ -0,0 +1,506 @@
+"""Client du service AI: disjoncteur par endpoint et requêtes doublées (hedging)
+
+Chaque endpoint amont (/generate-text, /embed...) a son disjoncteur:
+- fermé: les appels passent, les résultats des derniers appels sont conservés;
+- ouvert: quand le taux d'échec dépasse AI_BREAKER_FAILURE_RATE sur au moins
+  AI_BREAKER_MIN_CALLS appels, les appels échouent immédiatement (CircuitOpen)
+  pendant AI_BREAKER_OPEN_SECONDS;
+- semi-ouvert: ensuite, quelques appels d'essai passent; un succès referme le
+  disjoncteur, un échec le rouvre.
+Les sondes de santé ouvrent tous les disjoncteurs quand le service ne répond plus.
+
+Les endpoints idempotents (AI_HEDGE_PATHS, /embed et /semantic-search par défaut)
+peuvent être doublés: si la réponse n'est pas arrivée après AI_HEDGE_DELAY_MS, une
+seconde requête est envoyée et la première réponse reçue est retenue. Les requêtes
+doublées sont limitées à AI_HEDGE_MAX_RATIO des appels. Elles passent par un pool de
+threads de la taille de l'ordonnanceur (AI_SCHEDULER_CAPACITY): quand il est plein,
+l'appel part sur le thread appelant, sans doublage, plutôt que d'attendre un thread.
+
+`post` sert les routes Flask (requests, un thread par appel); `post_async` sert les
+routes ASGI (src/asgi.py, httpx, aucun thread bloqué pendant l'attente) avec les
+mêmes disjoncteurs et le même budget de requêtes doublées. Avec un ordonnanceur
+(src/services/ai_scheduler.py), chaque appel attend sa place dans la file de son
+organisation avant de partir.
+
+Chaque requête HTTP a un budget de temps (en-tête X-Request-Timeout-Ms du client,
+sinon AI_REQUEST_BUDGET_MS). Les appels au service AI sont bornés par le budget
+restant, transmis dans le même en-tête pour que le service AI arrête l'appel au
+modèle quand plus personne n'attend la réponse.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager, contextmanager
+
+from flask import current_app, g, has_request_context, jsonify, request
+
+from src.services.ai_scheduler import INTERACTIVE, QueueFull, SlotTimeout
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Budget restant de la requête, en millisecondes (client -> API -> service AI)
+DEADLINE_HEADER = 'X-Request-Timeout-Ms'
+
+class CircuitOpen(Exception):
+    """Appel refusé: le disjoncteur de l'endpoint est ouvert"""
+
+    def __init__(self, path, retry_after):
+        super().__init__(f'Service AI indisponible ({path})')
+        self.path = path
+        self.retry_after = retry_after
+
+def request_deadline(headers, budget):
+    """Échéance (time.monotonic) d'une requête: budget demandé par le client, borné par `budget`"""
+    try:
+        requested = float(headers.get(DEADLINE_HEADER, 0)) / 1000
+    except ValueError:
+        requested = 0
+    if requested > 0:
+        budget = min(budget, requested)
+    return time.monotonic() + budget
+
+class DeadlineExceeded(Exception):
+    """Budget de temps de la requête épuisé avant ou pendant l'appel"""
+
+    def __init__(self, path):
+        super().__init__(f'Délai dépassé pour le service AI ({path})')
+        self.path = path
+
+class CircuitBreaker:
+    """Disjoncteur à taux d'échec sur une fenêtre glissante d'appels"""
+
+    def __init__(self, name, window=20, min_calls=5, failure_rate=0.5, open_seconds=30.0, half_open_calls=1):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.trials = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        if state != self.state:
+            logger.warning("Disjoncteur %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        else:
+            self.opened_at = None
+        self.trials = 0
+        self.outcomes.clear()
+
+    def retry_after(self):
+        if self.state != OPEN:
+            return 0
+        return max(0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def allow(self):
+        """True si l'appel peut partir (compte les appels d'essai en semi-ouvert)"""
+        with self._lock:
+            if self.state == OPEN:
+                if self.retry_after() > 0:
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self.trials >= self.half_open_calls:
+                    return False
+                self.trials += 1
+            return True
+
+    def record(self, success):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED if success else OPEN)
+                return
+            if self.state == OPEN:
+                return
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.failure_rate:
+                self._transition(OPEN)
+
+    def release(self):
+        """Appel abandonné sans résultat: libère l'essai semi-ouvert éventuel"""
+        with self._lock:
+            if self.state == HALF_OPEN and self.trials > 0:
+                self.trials -= 1
+
+    def trip(self):
+        """Ouverture forcée (service injoignable d'après les sondes)"""
+        with self._lock:
+            if self.state != OPEN:
+                self._transition(OPEN)
+
+    def half_open(self):
+        """Service de nouveau joignable d'après les sondes: essai sans attendre la fin du délai"""
+        with self._lock:
+            if self.state == OPEN:
+                self._transition(HALF_OPEN)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'calls': len(self.outcomes),
+                'failures': self.outcomes.count(False),
+                'retry_after': round(self.retry_after(), 1)
+            }
+
+class AIClient:
+    """Appels HTTP au service AI avec disjoncteurs et requêtes doublées"""
+
+    def __init__(self, base_url, timeout=30.0, budget_ms=30000, pool_size=10, breaker_options=None,
+                 hedge_paths=('/embed', '/semantic-search'), hedge_delay_ms=None, hedge_max_ratio=0.1,
+                 async_pool_size=100):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.budget = budget_ms / 1000
+        self.breaker_options = breaker_options or {}
+        self.breakers = {}
+        self.upstream_available = True
+        self.hedge_paths = set(hedge_paths)
+        self.hedge_delay = hedge_delay_ms / 1000 if hedge_delay_ms else None
+        self.hedge_max_ratio = hedge_max_ratio
+        self.calls = 0
+        self.hedged = 0
+        self.pool_size = pool_size
+        self.async_pool_size = async_pool_size
+        self.scheduler = None
+        self._session = None
+        self._async_session = None
+        self._executor = None
+        self._executor_busy = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['ai_client'] = self
+        app.before_request(self.start_deadline)
+        self.scheduler = app.extensions.get('ai_scheduler')
+        prober = app.extensions.get('health')
+        if prober is not None:
+            prober.listeners.append(self.on_probe)
+
+    def start_deadline(self):
+        """Échéance de la requête courante: budget demandé par le client, borné par AI_REQUEST_BUDGET_MS"""
+        g.ai_deadline = request_deadline(request.headers, self.budget)
+
+    def deadline(self):
+        """Échéance de la requête courante (monotonic), None hors requête"""
+        if has_request_context():
+            return g.get('ai_deadline')
+        return None
+
+    def breaker(self, path):
+        with self._lock:
+            if path not in self.breakers:
+                self.breakers[path] = CircuitBreaker(path, **self.breaker_options)
+            return self.breakers[path]
+
+    def on_probe(self, name, ok, available):
+        """Résultat des sondes de santé: service injoignable = tous les disjoncteurs ouverts"""
+        if name != 'ai_service' or available == self.upstream_available:
+            return
+        self.upstream_available = available
+        for path in list(self.breakers):
+            if available:
+                self.breaker(path).half_open()
+            else:
+                self.breaker(path).trip()
+
+    @property
+    def session(self):
+        """Session HTTP partagée (requests importé au premier appel)"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def async_session(self):
+        """Client httpx partagé par les routes ASGI (créé dans la boucle du worker)"""
+        if self._async_session is None:
+            import httpx
+
+            self._async_session = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.async_pool_size,
+                                    max_keepalive_connections=self.async_pool_size)
+            )
+        return self._async_session
+
+    async def aclose(self):
+        if self._async_session is not None:
+            await self._async_session.aclose()
+            self._async_session = None
+
+    def available(self, path):
+        """False si les appels vers `path` seraient refusés (sans consommer d'essai)"""
+        breaker = self.breaker(path)
+        return self.upstream_available and breaker.retry_after() == 0
+
+    def _send(self, path, payload, timeout):
+        headers = {DEADLINE_HEADER: str(max(1, int(timeout * 1000)))}
+        return self.session.post(f'{self.base_url}{path}', json=payload, headers=headers, timeout=timeout)
+
+    async def _send_async(self, path, payload, timeout):
+        headers = {DEADLINE_HEADER: str(max(1, int(timeout * 1000)))}
+        return await self.async_session.post(f'{self.base_url}{path}', json=payload, headers=headers, timeout=timeout)
+
+    def _hedge_allowed(self):
+        """Réserve une requête doublée si le budget (part des appels) le permet"""
+        with self._lock:
+            if self.hedged + 1 > self.hedge_max_ratio * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    @property
+    def executor_size(self):
+        """Threads des requêtes doublées: autant que de places de l'ordonnanceur (sinon du pool HTTP)"""
+        return self.scheduler.capacity if self.scheduler is not None else self.pool_size
+
+    def _submit(self, path, payload, timeout):
+        """Envoi sur un thread libre du pool, None si tous sont occupés (jamais de file d'attente)"""
+        with self._lock:
+            if self._executor_busy >= self.executor_size:
+                return None
+            self._executor_busy += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.executor_size, thread_name_prefix='ai-hedge')
+        return self._executor.submit(self._pooled_send, path, payload, timeout)
+
+    def _pooled_send(self, path, payload, timeout):
+        try:
+            return self._send(path, payload, timeout)
+        finally:
+            with self._lock:
+                self._executor_busy -= 1
+
+    def _hedged_send(self, path, payload, timeout):
+        primary = self._submit(path, payload, timeout)
+        if primary is None:
+            # Pool saturé: appel sur le thread appelant, sans requête doublée
+            return self._send(path, payload, timeout)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done or not self._hedge_allowed():
+            return primary.result()
+        secondary = self._submit(path, payload, max(0.001, timeout - self.hedge_delay))
+        if secondary is None:
+            with self._lock:
+                self.hedged -= 1
+            return primary.result()
+        pending = {primary, secondary}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+        raise error
+
+    async def _hedged_send_async(self, path, payload, timeout):
+        attempts = [asyncio.ensure_future(self._send_async(path, payload, timeout))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedge_delay)
+            if done or not self._hedge_allowed():
+                return await attempts[0]
+            attempts.append(asyncio.ensure_future(
+                self._send_async(path, payload, max(0.001, timeout - self.hedge_delay))
+            ))
+            pending = set(attempts)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            # Requête perdante (ou client déconnecté): annulée, le service AI abandonne l'appel au modèle
+            for future in attempts:
+                future.cancel()
+
+    def _check_open(self, path):
+        """Refus immédiat si le disjoncteur est ouvert (avant d'attendre une place)"""
+        breaker = self.breaker(path)
+        if not self.upstream_available:
+            breaker.trip()
+        if breaker.retry_after() > 0:
+            raise CircuitOpen(path, breaker.retry_after())
+
+    @staticmethod
+    def _wait_timeout(deadline):
+        return None if deadline is None else max(0, deadline - time.monotonic())
+
+    @contextmanager
+    def _slot(self, path, org_id, lane, deadline):
+        """Place de l'ordonnanceur pendant l'appel (sans ordonnanceur ni organisation: aucune attente)"""
+        if self.scheduler is None or org_id is None:
+            yield
+            return
+        try:
+            self.scheduler.acquire(org_id, lane, self._wait_timeout(deadline))
+        except SlotTimeout:
+            raise DeadlineExceeded(path)
+        try:
+            yield
+        finally:
+            self.scheduler.release(org_id, lane)
+
+    @asynccontextmanager
+    async def _slot_async(self, path, org_id, lane, deadline):
+        if self.scheduler is None or org_id is None:
+            yield
+            return
+        try:
+            await self.scheduler.acquire_async(org_id, lane, self._wait_timeout(deadline))
+        except SlotTimeout:
+            raise DeadlineExceeded(path)
+        try:
+            yield
+        finally:
+            self.scheduler.release(org_id, lane)
+
+    def _begin(self, path, timeout, hedge, deadline):
+        """Contrôles avant l'appel: échéance, disjoncteur; retourne (disjoncteur, délai, borné, doublé)"""
+        timeout = timeout or self.timeout
+        bounded = False
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(path)
+            if remaining < timeout:
+                timeout, bounded = remaining, True
+        breaker = self.breaker(path)
+        if not self.upstream_available:
+            breaker.trip()
+        if not breaker.allow():
+            raise CircuitOpen(path, breaker.retry_after())
+        if hedge is None:
+            hedge = self.hedge_delay is not None and path in self.hedge_paths
+        if hedge:
+            with self._lock:
+                self.calls += 1
+        return breaker, timeout, bounded, hedge
+
+    @staticmethod
+    def _complete(path, breaker, response, bounded):
+        if response.status_code == 504 and bounded:
+            # Échéance de la requête (budget du client) atteinte par le service AI: pas un échec de l'endpoint
+            breaker.release()
+            raise DeadlineExceeded(path)
+        breaker.record(response.status_code < 500 and response.status_code != 429)
+        if response.status_code == 504:
+            raise DeadlineExceeded(path)
+        return response
+
+    def post(self, path, payload, timeout=None, hedge=None, deadline=None, org_id=None, lane=INTERACTIVE):
+        """POST vers le service AI; lève CircuitOpen si l'endpoint est coupé,
+        DeadlineExceeded si le budget de la requête est épuisé et QueueFull si
+        l'organisation a trop d'appels en attente.
+
+        `deadline` (time.monotonic) vaut par défaut l'échéance de la requête HTTP
+        courante; l'attente d'une place et l'appel sont bornés par le budget restant.
+        Les erreurs réseau et les réponses 5xx/429 comptent comme des échecs, sauf
+        quand l'appel est borné par l'échéance de la requête (délai dépassé ou 504):
+        un client pressé ne coupe pas l'endpoint pour les autres organisations.
+        """
+        import requests
+
+        deadline = deadline or self.deadline()
+        self._check_open(path)
+        with self._slot(path, org_id, lane, deadline):
+            breaker, timeout, bounded, hedge = self._begin(path, timeout, hedge, deadline)
+            try:
+                response = self._hedged_send(path, payload, timeout) if hedge else self._send(path, payload, timeout)
+            except requests.Timeout:
+                if bounded:
+                    # Budget du client épuisé: l'essai semi-ouvert est rendu, pas d'échec compté
+                    breaker.release()
+                    raise DeadlineExceeded(path)
+                breaker.record(False)
+                raise
+            except requests.RequestException:
+                breaker.record(False)
+                raise
+            return self._complete(path, breaker, response, bounded)
+
+    async def post_async(self, path, payload, deadline, timeout=None, hedge=None, org_id=None, lane=INTERACTIVE):
+        """Équivalent asynchrone de `post` (httpx); `deadline` est obligatoire hors requête Flask"""
+        self._check_open(path)
+        async with self._slot_async(path, org_id, lane, deadline):
+            return await self._post_async(path, payload, deadline, timeout, hedge)
+
+    async def _post_async(self, path, payload, deadline, timeout, hedge):
+        import httpx
+
+        breaker, timeout, bounded, hedge = self._begin(path, timeout, hedge, deadline)
+        try:
+            if hedge:
+                response = await self._hedged_send_async(path, payload, timeout)
+            else:
+                response = await self._send_async(path, payload, timeout)
+        except asyncio.CancelledError:
+            # Client déconnecté: ni succès ni échec de l'endpoint, l'essai semi-ouvert est rendu
+            breaker.release()
+            raise
+        except httpx.TimeoutException:
+            if bounded:
+                # Budget du client épuisé: l'essai semi-ouvert est rendu, pas d'échec compté
+                breaker.release()
+                raise DeadlineExceeded(path)
+            breaker.record(False)
+            raise
+        except httpx.HTTPError:
+            breaker.record(False)
+            raise
+        return self._complete(path, breaker, response, bounded)
+
+    def snapshot(self):
+        with self._lock:
+            paths = list(self.breakers)
+            hedging = {'calls': self.calls, 'hedged': self.hedged}
+        snapshot = {'circuits': {path: self.breaker(path).snapshot() for path in paths}, 'hedging': hedging}
+        if self.scheduler is not None:
+            snapshot['scheduler'] = self.scheduler.snapshot()
+        return snapshot
+
+def get_ai_client():
+    return current_app.extensions['ai_client']
+
+def unavailable_response(error):
+    """Réponse 503 pour un appel refusé par le disjoncteur"""
+    response = jsonify({'error': 'Service AI indisponible', 'retry_after': round(error.retry_after)})
+    response.headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return response, 503
+
+def deadline_response(error):
+    """Réponse 504 quand le budget de la requête est épuisé"""
+    return jsonify({'error': 'Délai dépassé pour le service AI'}), 504
+
+def queue_full_response(error):
+    """Réponse 429 quand l'organisation a trop d'appels AI en attente"""
+    response = jsonify({'error': 'Trop de requêtes AI en attente, réessayez plus tard'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
@@ -0,0 +1,236 @@
+"""Ordonnancement équitable des appels au service AI entre organisations
+
+Chaque appel au service AI prend une place parmi AI_SCHEDULER_CAPACITY (par processus)
+avant de partir. Quand les places manquent, les appels attendent dans deux files:
+- interactive (génération à la demande, embeddings, recherche): servie en priorité;
+- bulk (génération en masse): au plus AI_SCHEDULER_BULK_CAPACITY places, le reste
+  étant toujours disponible pour les requêtes interactives.
+Dans une file, les organisations sont servies à tour de rôle pondéré par leur plan
+(ordonnancement par pas: une organisation de poids 4 passe 4 fois plus souvent qu'une
+organisation de poids 1) et chacune est limitée à un nombre d'appels simultanés selon
+son plan, dans chaque file. Une organisation qui lance un traitement en masse ne retarde donc ni les
+autres organisations, ni ses propres requêtes interactives.
+
+Le plan de l'organisation (Organization.plan) est lu en base puis gardé en cache
+AI_SCHEDULER_PLAN_TTL secondes.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+INTERACTIVE = 'interactive'
+BULK = 'bulk'
+LANES = (INTERACTIVE, BULK)
+
+DEFAULT_WEIGHTS = {'free': 1, 'basic': 2, 'premium': 4}
+DEFAULT_ORG_LIMITS = {'free': 2, 'basic': 4, 'premium': 8}
+
+class QueueFull(Exception):
+    """Trop d'appels en attente pour l'organisation"""
+
+    def __init__(self, org_id):
+        super().__init__(f"Trop de requêtes AI en attente pour l'organisation {org_id}")
+        self.org_id = org_id
+
+class SlotTimeout(Exception):
+    """Aucune place libérée avant l'échéance de la requête"""
+
+def parse_plan_values(value, defaults):
+    """'free:1,basic:2,premium:4' -> {'free': 1, ...} (valeurs par défaut sinon)"""
+    values = dict(defaults)
+    for item in filter(None, (value or '').split(',')):
+        plan, number = item.split(':')
+        values[plan.strip()] = int(number)
+    return values
+
+class _Waiter:
+    """Appel en attente d'une place: thread (Event) ou coroutine (Future)"""
+
+    def __init__(self, org_id, lane, loop=None):
+        self.org_id = org_id
+        self.lane = lane
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+class _OrgState:
+    def __init__(self, weight, limit):
+        self.weight = weight
+        self.limit = limit
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.queues = {lane: deque() for lane in LANES}
+        self.passes = {lane: 0.0 for lane in LANES}
+
+class AIScheduler:
+    """Places d'appel au service AI: priorité interactive, tour pondéré par organisation"""
+
+    def __init__(self, capacity=32, bulk_capacity=16, weights=None, org_limits=None,
+                 max_queue=100, plan_lookup=None, plan_ttl=300.0):
+        self.capacity = capacity
+        self.bulk_capacity = min(bulk_capacity, capacity)
+        self.weights = weights or dict(DEFAULT_WEIGHTS)
+        self.org_limits = org_limits or dict(DEFAULT_ORG_LIMITS)
+        self.max_queue = max_queue
+        self.plan_lookup = plan_lookup
+        self.plan_ttl = plan_ttl
+        self.in_flight = {lane: 0 for lane in LANES}
+        # Temps virtuel de chaque file: pas de la dernière organisation servie
+        self.virtual_time = {lane: 0.0 for lane in LANES}
+        self.orgs = {}
+        self.plans = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from src.models.user import db, Organization
+
+        def plan_lookup(org_id):
+            with app.app_context():
+                try:
+                    return db.session.query(Organization.plan).filter(Organization.id == org_id).scalar()
+                finally:
+                    db.session.remove()
+
+        if self.plan_lookup is None:
+            self.plan_lookup = plan_lookup
+        app.extensions['ai_scheduler'] = self
+
+    # Plans des organisations
+
+    def has_plan(self, org_id):
+        cached = self.plans.get(org_id)
+        return cached is not None and cached[1] > time.monotonic()
+
+    def plan(self, org_id):
+        """Plan de l'organisation (cache, lecture en base à l'expiration)"""
+        if not self.has_plan(org_id):
+            plan = (self.plan_lookup(org_id) if self.plan_lookup and org_id is not None else None) or 'free'
+            self.plans[org_id] = (plan, time.monotonic() + self.plan_ttl)
+        return self.plans[org_id][0]
+
+    def _org(self, org_id, plan):
+        state = self.orgs.get(org_id)
+        if state is None:
+            state = self.orgs[org_id] = _OrgState(self.weights.get(plan, 1), self.org_limits.get(plan, 1))
+        else:
+            # Changement de plan pris en compte à l'expiration du cache
+            state.weight = self.weights.get(plan, 1)
+            state.limit = self.org_limits.get(plan, 1)
+        return state
+
+    # Attribution des places (sous verrou)
+
+    def _lane_open(self, lane):
+        if sum(self.in_flight.values()) >= self.capacity:
+            return False
+        return lane == INTERACTIVE or self.in_flight[BULK] < self.bulk_capacity
+
+    def _can_start(self, state, lane):
+        return self._lane_open(lane) and state.in_flight[lane] < state.limit
+
+    def _start(self, org_id, state, lane):
+        state.in_flight[lane] += 1
+        self.in_flight[lane] += 1
+        # Organisation de retour après une période d'inactivité: pas de crédit accumulé
+        state.passes[lane] = max(state.passes[lane], self.virtual_time[lane]) + 1 / state.weight
+        self.virtual_time[lane] = state.passes[lane] - 1 / state.weight
+
+    def _dispatch(self):
+        """Attribue les places libres: file interactive d'abord, puis bulk, par pas croissant"""
+        for lane in LANES:
+            while self._lane_open(lane):
+                candidates = [
+                    (state.passes[lane], org_id) for org_id, state in self.orgs.items()
+                    if state.queues[lane] and state.in_flight[lane] < state.limit
+                ]
+                if not candidates:
+                    break
+                _, org_id = min(candidates)
+                state = self.orgs[org_id]
+                waiter = state.queues[lane].popleft()
+                self._start(org_id, state, lane)
+                waiter.grant()
+
+    def _enqueue(self, org_id, plan, lane, loop=None):
+        """Place immédiate (None) ou attente enregistrée (_Waiter)"""
+        with self._lock:
+            state = self._org(org_id, plan)
+            queue = state.queues[lane]
+            if not queue and self._can_start(state, lane):
+                self._start(org_id, state, lane)
+                return None
+            if len(queue) >= self.max_queue:
+                raise QueueFull(org_id)
+            waiter = _Waiter(org_id, lane, loop)
+            queue.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter):
+        """Attente expirée; False si la place a été attribuée entre-temps"""
+        with self._lock:
+            if waiter.granted:
+                return False
+            state = self.orgs[waiter.org_id]
+            state.queues[waiter.lane].remove(waiter)
+            if not any(state.in_flight.values()) and not any(state.queues.values()):
+                del self.orgs[waiter.org_id]
+            return True
+
+    def release(self, org_id, lane):
+        with self._lock:
+            state = self.orgs[org_id]
+            state.in_flight[lane] -= 1
+            self.in_flight[lane] -= 1
+            if not any(state.in_flight.values()) and not any(state.queues.values()):
+                del self.orgs[org_id]
+            self._dispatch()
+
+    # Acquisition
+
+    def acquire(self, org_id, lane=INTERACTIVE, timeout=None):
+        """Attend une place (thread); lève SlotTimeout après `timeout` secondes"""
+        waiter = self._enqueue(org_id, self.plan(org_id), lane)
+        if waiter is None or waiter.event.wait(timeout):
+            return
+        if self._abandon(waiter):
+            raise SlotTimeout()
+
+    async def acquire_async(self, org_id, lane=INTERACTIVE, timeout=None):
+        """Équivalent asynchrone de `acquire` (le plan doit être en cache, voir `has_plan`)"""
+        waiter = self._enqueue(org_id, self.plan(org_id), lane, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                raise SlotTimeout()
+        except asyncio.CancelledError:
+            # Client déconnecté: place rendue si elle a été attribuée entre-temps
+            if not self._abandon(waiter):
+                self.release(org_id, lane)
+            raise
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'bulk_capacity': self.bulk_capacity,
+                'in_flight': dict(self.in_flight),
+                'queued': {lane: sum(len(state.queues[lane]) for state in self.orgs.values()) for lane in LANES},
+                'active_orgs': len(self.orgs)
+            }
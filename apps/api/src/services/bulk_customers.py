@@ -0,0 +1,159 @@
+"""Opérations ensemblistes sur les clients filtrés (ajout/retrait de tags, champs, suppression)
+
+Les clients ciblés sont parcourus par lots d'identifiants (pagination par clé sur
+l'id); chaque lot est modifié par une seule instruction UPDATE/DELETE puis validé.
+L'ajout et le retrait de tags sont faits directement en SQL sur le JSON stocké
+(produit par json.dumps, séparateur ', '), sans relire ni re-sérialiser les lignes.
+"""
+import json
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import case, func, or_
+
+from src.models.user import db, Customer
+from src.filters import filter_customers
+from src.services import stats, sync
+
+CHUNK_SIZE = 1000
+OPERATIONS = ('add_tags', 'remove_tags', 'set', 'delete')
+# Champs modifiables en masse (l'email est unique par client)
+SETTABLE_FIELDS = ('name', 'phone', 'tags', 'metadata')
+
+class BulkOperationError(ValueError):
+    """Requête d'opération groupée invalide"""
+
+def _tag_json(tag):
+    return json.dumps(str(tag))
+
+def _add_tag_values(tag):
+    tag_json = _tag_json(tag)
+    empty = or_(Customer.tags.is_(None), Customer.tags == '', Customer.tags == '[]')
+    return case(
+        (empty, f'[{tag_json}]'),
+        else_=func.substr(Customer.tags, 1, func.length(Customer.tags) - 1) + f', {tag_json}]'
+    )
+
+def _remove_tag_values(tag):
+    tag_json = _tag_json(tag)
+    # Premier, milieu ou dernier élément, puis élément unique
+    return func.replace(
+        func.replace(func.replace(Customer.tags, f'{tag_json}, ', ''), f', {tag_json}', ''),
+        tag_json, ''
+    )
+
+def validate(data):
+    """Vérifie la requête, retourne (filtre, opération, paramètres)"""
+    operation = data.get('operation')
+    if operation not in OPERATIONS:
+        raise BulkOperationError(f'Opération invalide. Opérations valides: {", ".join(OPERATIONS)}')
+
+    filters = data.get('filter') or {}
+    tags = filters.get('tags') or []
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    ids = filters.get('ids') or []
+    search = (filters.get('search') or '').strip()
+    if not (search or tags or ids or filters.get('all') is True):
+        raise BulkOperationError('Filtre requis (search, tags, ids, ou "all": true pour toute l\'organisation)')
+    filters = {'search': search, 'tags': tags, 'ids': ids}
+
+    params = {}
+    if operation in ('add_tags', 'remove_tags'):
+        params['tags'] = [str(tag).strip() for tag in data.get('tags') or [] if str(tag).strip()]
+        if not params['tags']:
+            raise BulkOperationError('Liste de tags requise')
+    elif operation == 'set':
+        fields = data.get('fields') or {}
+        unknown = set(fields) - set(SETTABLE_FIELDS)
+        if not fields or unknown:
+            raise BulkOperationError(f'Champs modifiables: {", ".join(SETTABLE_FIELDS)}')
+        if 'name' in fields and not (fields['name'] or '').strip():
+            raise BulkOperationError('Le nom du client est requis')
+        values = {}
+        if 'name' in fields:
+            values['name'] = fields['name'].strip()
+        if 'phone' in fields:
+            values['phone'] = fields['phone'].strip() if fields['phone'] else None
+        if 'tags' in fields:
+            values['tags'] = json.dumps(fields['tags'] or [])
+        if 'metadata' in fields:
+            values['extra_data'] = json.dumps(fields['metadata'] or {})
+        params['values'] = values
+    return filters, operation, params
+
+def _chunk_ids(org_id, filters, after_id):
+    query = filter_customers(
+        db.session.query(Customer.id).filter(Customer.org_id == org_id, Customer.id > after_id),
+        filters['search'], filters['tags']
+    )
+    if filters['ids']:
+        query = query.filter(Customer.id.in_(filters['ids']))
+    return [row.id for row in query.order_by(Customer.id).limit(CHUNK_SIZE)]
+
+def _apply_chunk(org_id, ids, operation, params):
+    """Modifie un lot, retourne le nombre de clients modifiés"""
+    now = datetime.utcnow()
+    in_chunk = Customer.id.in_(ids)
+
+    if operation == 'add_tags' or operation == 'remove_tags':
+        touched = set()
+        deltas = Counter()
+        for tag in params['tags']:
+            contains = Customer.tags.contains(_tag_json(tag))
+            if operation == 'add_tags':
+                condition, values, sign = or_(Customer.tags.is_(None), ~contains), _add_tag_values(tag), 1
+            else:
+                condition, values, sign = contains, _remove_tag_values(tag), -1
+            changed = [row.id for row in db.session.query(Customer.id).filter(in_chunk, condition)]
+            if not changed:
+                continue
+            db.session.execute(
+                db.update(Customer)
+                .where(Customer.id.in_(changed))
+                .values(tags=values, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            deltas[(org_id, stats.CUSTOMERS_BY_TAG, str(tag))] += sign * len(changed)
+            touched.update(changed)
+        stats.record_deltas(db.session, deltas)
+        return len(touched)
+
+    if operation == 'delete' or 'tags' in params.get('values', {}):
+        # Anciens tags nécessaires aux statistiques
+        deltas = Counter()
+        for row in db.session.query(Customer.tags).filter(in_chunk):
+            if operation == 'delete':
+                deltas.update(stats.customer_deltas(org_id, row.tags, -1))
+            else:
+                for tag in stats.parse_tags(row.tags):
+                    deltas[(org_id, stats.CUSTOMERS_BY_TAG, tag)] -= 1
+                for tag in stats.parse_tags(params['values']['tags']):
+                    deltas[(org_id, stats.CUSTOMERS_BY_TAG, tag)] += 1
+        stats.record_deltas(db.session, deltas)
+
+    if operation == 'delete':
+        sync.record_deletions(db.session, 'customer', [(org_id, customer_id) for customer_id in ids])
+        result = db.session.execute(
+            db.delete(Customer).where(in_chunk).execution_options(synchronize_session=False)
+        )
+    else:
+        result = db.session.execute(
+            db.update(Customer).where(in_chunk)
+            .values(updated_at=now, **params['values'])
+            .execution_options(synchronize_session=False)
+        )
+    return result.rowcount
+
+def run(org_id, filters, operation, params):
+    """Applique l'opération par lots validés un à un, retourne les compteurs"""
+    counts = {'matched': 0, 'affected': 0}
+    after_id = 0
+    while True:
+        ids = _chunk_ids(org_id, filters, after_id)
+        if not ids:
+            return counts
+        counts['affected'] += _apply_chunk(org_id, ids, operation, params)
+        counts['matched'] += len(ids)
+        db.session.commit()
+        after_id = ids[-1]
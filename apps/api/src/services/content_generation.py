@@ -0,0 +1,85 @@
+"""Génération de contenu de campagne via le service AI"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Templates par défaut selon le type de campagne
+DEFAULT_TEMPLATES = {
+    'facebook': "Créez une publication Facebook engageante pour promouvoir {prompt}. Incluez des emojis et un appel à l'action. Maximum 150 caractères.",
+    'sms': "Rédigez un SMS promotionnel pour {prompt}. Maximum 160 caractères. Incluez un appel à l'action clair.",
+    'email': "Rédigez l'objet et le contenu d'un email marketing pour {prompt}. Ton professionnel mais engageant.",
+    'whatsapp': "Créez un message WhatsApp Business pour promouvoir {prompt}. Ton amical et direct."
+}
+FALLBACK_TEMPLATE = "Créez du contenu marketing pour {prompt}"
+
+def render_request(campaign_type, prompt, template=None, max_tokens=200, temperature=0.7):
+    """Construit la requête /generate-text pour une campagne"""
+    if not template:
+        template = DEFAULT_TEMPLATES.get(campaign_type, FALLBACK_TEMPLATE)
+    return {
+        'prompt': prompt,
+        'template': template,
+        'max_tokens': max_tokens,
+        'temperature': temperature
+    }
+
+# Conseils renvoyés avec le contenu optimisé
+OPTIMIZATION_SUGGESTIONS = [
+    "Ajoutez des emojis pour plus d'engagement",
+    "Incluez un appel à l'action clair",
+    "Mentionnez votre localisation (Madagascar)",
+    "Utilisez des hashtags pertinents"
+]
+
+def optimization_request(content, campaign_type, optimization_goal):
+    """Construit la requête /generate-text d'optimisation d'un contenu existant"""
+    optimization_prompts = {
+        'engagement': f"Optimisez ce contenu {campaign_type} pour maximiser l'engagement (likes, commentaires, partages): {content}",
+        'conversion': f"Réécrivez ce contenu {campaign_type} pour inciter à l'action et améliorer les conversions: {content}",
+        'awareness': f"Adaptez ce contenu {campaign_type} pour améliorer la notoriété de la marque: {content}"
+    }
+    return {
+        'prompt': content,
+        'template': optimization_prompts.get(optimization_goal, optimization_prompts['engagement']),
+        'max_tokens': 200,
+        'temperature': 0.6
+    }
+
+def generate_many(ai_client, jobs, concurrency=4, deadline=None, org_id=None, job_budget=None):
+    """Envoie les requêtes de génération au service AI avec une concurrence bornée.
+
+    `jobs` est une liste de (clé, requête); retourne {clé: (texte, erreur)}.
+    Les appels passent par la file bulk de l'organisation `org_id`. Chaque appel a
+    son propre budget (`job_budget` secondes, par défaut celui d'une requête du
+    client AI) compté à son départ: les derniers appels d'un lot ne partent pas avec
+    un reste de budget. Ceux qui n'ont pas commencé à l'échéance de la requête
+    `deadline` (time.monotonic) ne sont pas envoyés; ceux refusés par le disjoncteur
+    échouent sans attendre.
+    """
+    import requests
+    from src.services.ai_client import CircuitOpen, DeadlineExceeded
+    from src.services.ai_scheduler import BULK, QueueFull
+
+    job_budget = job_budget or ai_client.budget
+
+    def call(payload):
+        started = time.monotonic()
+        if deadline is not None and started >= deadline:
+            return None, 'Délai de la requête dépassé, campagne non traitée'
+        try:
+            response = ai_client.post('/generate-text', payload, deadline=started + job_budget, org_id=org_id,
+                                      lane=BULK)
+        except CircuitOpen:
+            return None, 'Service AI indisponible'
+        except DeadlineExceeded:
+            return None, 'Délai dépassé pour le service AI'
+        except QueueFull:
+            return None, 'Trop de requêtes AI en attente'
+        except requests.RequestException as e:
+            return None, f'Erreur de communication avec le service AI: {str(e)}'
+        if response.status_code != 200:
+            return None, 'Erreur du service AI'
+        return response.json().get('generated_text', ''), None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {key: executor.submit(call, payload) for key, payload in jobs}
+        return {key: future.result() for key, future in futures.items()}
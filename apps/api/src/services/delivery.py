@@ -0,0 +1,285 @@
+"""Couche de livraison des campagnes par canal"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class DeliveryResult:
+    """Résultat de l'envoi d'un lot de destinataires"""
+    sent: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+class TransientDeliveryError(Exception):
+    """Erreur temporaire du fournisseur (quota, timeout...), l'envoi peut être retenté"""
+
+class RateLimiter:
+    """Seau à jetons partagé entre les threads d'un même canal"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(rate, 1))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count=1):
+        """Bloque jusqu'à ce que `count` jetons soient disponibles"""
+        if self.rate <= 0:
+            return
+        count = min(count, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                wait = (count - self.tokens) / self.rate
+            time.sleep(wait)
+
+# Fournisseurs
+
+class LogProvider:
+    """Fournisseur qui se contente de journaliser les envois"""
+
+    def send(self, channel, messages):
+        logger.info("Envoi %s de %d message(s)", channel, len(messages))
+        return {message['key']: 'sent' for message in messages}
+
+class StubProvider:
+    """Fournisseur local qui enregistre les envois sur disque (un fichier JSONL par canal).
+
+    Les clés d'idempotence déjà enregistrées ne sont pas renvoyées, ce qui permet de
+    mesurer le débit de bout en bout sans passerelle SMS ou email réelle.
+    """
+
+    def __init__(self, directory, latency_ms=0, failure_rate=0.0):
+        self.directory = directory
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.sent_keys = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _keys(self, channel):
+        if channel not in self.sent_keys:
+            keys = set()
+            path = os.path.join(self.directory, f'{channel}.jsonl')
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    for line in f:
+                        keys.add(json.loads(line)['key'])
+            self.sent_keys[channel] = keys
+        return self.sent_keys[channel]
+
+    def send(self, channel, messages):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise TransientDeliveryError('Échec simulé du fournisseur')
+
+        statuses = {}
+        with self.lock:
+            keys = self._keys(channel)
+            path = os.path.join(self.directory, f'{channel}.jsonl')
+            with open(path, 'a', encoding='utf-8') as f:
+                for message in messages:
+                    if message['key'] in keys:
+                        statuses[message['key']] = 'duplicate'
+                        continue
+                    keys.add(message['key'])
+                    f.write(json.dumps(message, ensure_ascii=False) + '\n')
+                    statuses[message['key']] = 'sent'
+        return statuses
+
+# Adaptateurs de canal
+
+class ChannelAdapter:
+    """Adaptateur de base pour un canal de diffusion.
+
+    Découpe les lots selon la taille acceptée par l'API du fournisseur, respecte le
+    débit et la concurrence configurés, et retente les erreurs temporaires avec un
+    backoff exponentiel. Chaque message porte une clé d'idempotence par envoi et par
+    destinataire: les reprises d'un même envoi sont dédupliquées, une nouvelle
+    planification de la campagne ne l'est pas.
+    """
+    channel = None
+    # Champ de contact requis pour chaque destinataire (None = diffusion unique, ex: publication Facebook)
+    contact_field = None
+    default_rate = 10.0  # messages par seconde
+    default_batch_size = 1
+    default_concurrency = 1
+
+    def __init__(self, provider, rate=None, batch_size=None, concurrency=None,
+                 max_retries=3, backoff_base=0.5, backoff_max=30.0):
+        self.provider = provider
+        self.rate = self.default_rate if rate is None else rate
+        self.batch_size = batch_size or self.default_batch_size
+        self.concurrency = concurrency or self.default_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = RateLimiter(self.rate, burst=max(self.rate, self.batch_size))
+        # Pool partagé par tous les envois du canal: borne les appels simultanés au fournisseur
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f'delivery-{self.channel}')
+
+    def idempotency_key(self, campaign, recipient):
+        recipient_id = recipient['id'] if recipient else 'broadcast'
+        return f"{campaign['id']}:{campaign['dispatch']}:{self.channel}:{recipient_id}"
+
+    def build_message(self, campaign, recipient):
+        message = {
+            'key': self.idempotency_key(campaign, recipient),
+            'campaign_id': campaign['id'],
+            'org_id': campaign['org_id'],
+            'content': campaign['content']
+        }
+        if recipient:
+            message['customer_id'] = recipient['id']
+            message['to'] = recipient[self.contact_field]
+        return message
+
+    def _send_with_retry(self, messages):
+        attempt = 0
+        while True:
+            try:
+                self.limiter.acquire(len(messages))
+                return self.provider.send(self.channel, messages)
+            except TransientDeliveryError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+
+    def send_batch(self, campaign, recipients):
+        """Envoie le contenu de la campagne à un lot de destinataires"""
+        if self.contact_field is None:
+            messages = [self.build_message(campaign, None)]
+        else:
+            messages = [self.build_message(campaign, recipient) for recipient in recipients]
+
+        chunks = [messages[start:start + self.batch_size] for start in range(0, len(messages), self.batch_size)]
+        futures = [self.executor.submit(self._send_with_retry, chunk) for chunk in chunks]
+
+        result = DeliveryResult()
+        for chunk, future in zip(chunks, futures):
+            try:
+                statuses = future.result()
+            except Exception as e:
+                result.failed += len(chunk)
+                result.errors.append(str(e))
+                continue
+            for message in chunk:
+                if statuses.get(message['key']) in ('sent', 'duplicate'):
+                    result.sent += 1
+                else:
+                    result.failed += 1
+        return result
+
+class FacebookAdapter(ChannelAdapter):
+    """Publication unique sur la page de l'organisation"""
+    channel = 'facebook'
+    contact_field = None
+    default_rate = 1.0
+
+class SmsAdapter(ChannelAdapter):
+    channel = 'sms'
+    contact_field = 'phone'
+    default_rate = 50.0
+    default_batch_size = 100
+    default_concurrency = 4
+
+    def build_message(self, campaign, recipient):
+        message = super().build_message(campaign, recipient)
+        message['content'] = message['content'][:160]
+        return message
+
+class EmailAdapter(ChannelAdapter):
+    channel = 'email'
+    contact_field = 'email'
+    default_rate = 100.0
+    default_batch_size = 500
+    default_concurrency = 4
+
+    def build_message(self, campaign, recipient):
+        message = super().build_message(campaign, recipient)
+        message['subject'] = campaign['title']
+        return message
+
+class WhatsAppAdapter(ChannelAdapter):
+    channel = 'whatsapp'
+    contact_field = 'phone'
+    default_rate = 20.0
+    default_batch_size = 1
+    default_concurrency = 8
+
+ADAPTERS = {
+    'facebook': FacebookAdapter,
+    'sms': SmsAdapter,
+    'email': EmailAdapter,
+    'whatsapp': WhatsAppAdapter
+}
+
+_provider = None
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+def _env_number(name, cast):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, '') else None
+
+def get_provider():
+    """Fournisseur configuré par DELIVERY_PROVIDER (stub par défaut, ou log)"""
+    global _provider
+    if _provider is None:
+        name = os.getenv('DELIVERY_PROVIDER', 'stub')
+        if name == 'log':
+            _provider = LogProvider()
+        elif name == 'stub':
+            _provider = StubProvider(
+                os.getenv('DELIVERY_STUB_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'deliveries')),
+                latency_ms=float(os.getenv('DELIVERY_STUB_LATENCY_MS', '0')),
+                failure_rate=float(os.getenv('DELIVERY_STUB_FAILURE_RATE', '0'))
+            )
+        else:
+            raise ValueError(f'Fournisseur de livraison inconnu: {name}')
+    return _provider
+
+def get_adapter(channel):
+    """Retourne l'adaptateur (partagé par processus) correspondant au type de campagne.
+
+    Débit, taille de lot et concurrence se règlent par canal, par exemple
+    DELIVERY_SMS_RATE, DELIVERY_SMS_BATCH_SIZE et DELIVERY_SMS_CONCURRENCY.
+    """
+    if channel not in ADAPTERS:
+        raise ValueError(f'Canal de diffusion inconnu: {channel}')
+    with _adapters_lock:
+        if channel not in _adapters:
+            prefix = f'DELIVERY_{channel.upper()}_'
+            _adapters[channel] = ADAPTERS[channel](
+                get_provider(),
+                rate=_env_number(prefix + 'RATE', float),
+                batch_size=_env_number(prefix + 'BATCH_SIZE', int),
+                concurrency=_env_number(prefix + 'CONCURRENCY', int),
+                max_retries=int(os.getenv('DELIVERY_MAX_RETRIES', '3'))
+            )
+        return _adapters[channel]
+
+def reset_adapters(provider=None):
+    """Réinitialise les adaptateurs (changement de configuration, benchmarks)"""
+    global _provider
+    with _adapters_lock:
+        for adapter in _adapters.values():
+            adapter.executor.shutdown(wait=True)
+        _adapters.clear()
+        _provider = provider
@@ -0,0 +1,242 @@
+"""Envoi des campagnes planifiées arrivées à échéance"""
+import json
+import logging
+import os
+import socket
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from src.models.user import db, Campaign, CampaignDispatch, Customer
+from src.services.delivery import DeliveryResult, get_adapter
+from src.services import stats
+
+logger = logging.getLogger(__name__)
+
+class CampaignDispatcher:
+    """Réclame les campagnes dues et répartit leur envoi sur les workers de canal.
+
+    La réclamation se fait par un UPDATE conditionnel (status='scheduled' -> 'sending'),
+    si bien que plusieurs instances du planificateur ne peuvent pas envoyer la même
+    campagne. L'audience est parcourue par lots ordonnés par id, envoyés en parallèle;
+    chaque lot terminé est validé dans sa propre transaction avec un curseur de reprise
+    et renouvelle le bail (heartbeat), qui doit donc couvrir la durée d'un lot.
+    """
+
+    def __init__(self, worker_id=None, batch_size=1000, concurrency=4,
+                 lease_seconds=300, claim_limit=10):
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.claim_limit = claim_limit
+
+    def due_campaign_ids(self, now):
+        """Campagnes planifiées dont l'échéance est passée (parcours de l'index status/schedule_at)"""
+        rows = db.session.query(Campaign.id).filter(
+            Campaign.status == 'scheduled',
+            Campaign.schedule_at <= now
+        ).order_by(Campaign.schedule_at).limit(self.claim_limit).all()
+        return [row.id for row in rows]
+
+    def claim(self, campaign_id, now):
+        """Réclame atomiquement une campagne, retourne False si une autre instance l'a prise"""
+        result = db.session.execute(
+            db.update(Campaign)
+            .where(Campaign.id == campaign_id, Campaign.status == 'scheduled')
+            .values(status='sending', updated_at=now)
+        )
+        if result.rowcount != 1:
+            db.session.rollback()
+            return False
+
+        org_id = db.session.query(Campaign.org_id).filter(Campaign.id == campaign_id).scalar()
+        stats.record_deltas(db.session, stats.status_change_deltas(org_id, 'scheduled', 'sending'))
+        dispatch = CampaignDispatch.query.filter_by(campaign_id=campaign_id).first()
+        if dispatch is None:
+            dispatch = CampaignDispatch(campaign_id=campaign_id, org_id=org_id)
+            db.session.add(dispatch)
+        dispatch.status = 'running'
+        dispatch.worker_id = self.worker_id
+        dispatch.last_customer_id = 0
+        dispatch.recipients_count = 0
+        dispatch.sent_count = 0
+        dispatch.failed_count = 0
+        dispatch.error = None
+        dispatch.started_at = now
+        dispatch.heartbeat_at = now
+        dispatch.finished_at = None
+        db.session.commit()
+        return True
+
+    def reclaim_stale(self, now):
+        """Reprend les envois dont l'instance propriétaire ne donne plus signe de vie"""
+        stale_before = now - timedelta(seconds=self.lease_seconds)
+        rows = db.session.query(CampaignDispatch.id, CampaignDispatch.campaign_id).filter(
+            CampaignDispatch.status == 'running',
+            CampaignDispatch.heartbeat_at < stale_before
+        ).limit(self.claim_limit).all()
+
+        reclaimed = []
+        for row in rows:
+            result = db.session.execute(
+                db.update(CampaignDispatch)
+                .where(
+                    CampaignDispatch.id == row.id,
+                    CampaignDispatch.status == 'running',
+                    CampaignDispatch.heartbeat_at < stale_before
+                )
+                .values(worker_id=self.worker_id, heartbeat_at=now)
+            )
+            if result.rowcount == 1:
+                reclaimed.append(row.campaign_id)
+        db.session.commit()
+        return reclaimed
+
+    def iter_audience(self, org_id, tags, contact_field, after_id):
+        """Parcourt l'audience ciblée par lots (pagination par clé sur l'id)"""
+        columns = [Customer.id, Customer.name, Customer.phone, Customer.email]
+        while True:
+            query = db.session.query(*columns).filter(
+                Customer.org_id == org_id,
+                Customer.id > after_id
+            )
+            for tag in tags:
+                query = query.filter(Customer.tags.contains(f'"{tag}"'))
+            if contact_field:
+                query = query.filter(getattr(Customer, contact_field).isnot(None))
+
+            rows = query.order_by(Customer.id).limit(self.batch_size).all()
+            if not rows:
+                return
+            yield [row._asdict() for row in rows]
+            after_id = rows[-1].id
+
+    def _heartbeat(self, dispatch_id, values):
+        """Enregistre la progression, retourne False si le bail a été perdu"""
+        result = db.session.execute(
+            db.update(CampaignDispatch)
+            .where(CampaignDispatch.id == dispatch_id, CampaignDispatch.worker_id == self.worker_id)
+            .values(heartbeat_at=datetime.utcnow(), **values)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _collect(self, campaign_id, dispatch_id, counters, pending):
+        """Comptabilise le plus ancien lot en cours et renouvelle le bail.
+
+        Retourne False si le bail a été perdu: les lots pas encore commencés sont
+        annulés et l'envoi est laissé à l'instance qui l'a repris.
+        """
+        batch, future = pending.popleft()
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.exception("Campagne %s: échec d'un lot", campaign_id)
+            result = DeliveryResult(failed=len(batch), errors=[str(e)])
+        counters['recipients_count'] += len(batch)
+        counters['sent_count'] += result.sent
+        counters['failed_count'] += result.failed
+
+        if self._heartbeat(dispatch_id, dict(counters, last_customer_id=batch[-1]['id'])):
+            return True
+        logger.warning("Campagne %s: bail perdu, envoi abandonné", campaign_id)
+        for _, future in pending:
+            future.cancel()
+        return False
+
+    def _finish(self, campaign_id, dispatch_id, status, error=None):
+        now = datetime.utcnow()
+        org_id = db.session.query(Campaign.org_id).filter(Campaign.id == campaign_id).scalar()
+        db.session.execute(
+            db.update(CampaignDispatch)
+            .where(CampaignDispatch.id == dispatch_id)
+            .values(status='completed' if status == 'sent' else 'failed',
+                    error=error, finished_at=now, heartbeat_at=now)
+        )
+        result = db.session.execute(
+            db.update(Campaign)
+            .where(Campaign.id == campaign_id, Campaign.status == 'sending')
+            .values(status=status, updated_at=now)
+        )
+        # Compteurs de statut mis à jour seulement si la campagne était encore en envoi
+        if result.rowcount == 1:
+            stats.record_deltas(db.session, stats.status_change_deltas(org_id, 'sending', status))
+        db.session.commit()
+
+    def dispatch(self, campaign_id):
+        """Envoie une campagne réclamée à toute son audience"""
+        campaign = Campaign.query.get(campaign_id)
+        dispatch = CampaignDispatch.query.filter_by(campaign_id=campaign_id).first()
+        dispatch_id = dispatch.id
+
+        content = campaign.generated_content or campaign.draft_content
+        if not content:
+            self._finish(campaign_id, dispatch_id, 'failed', 'Aucun contenu à envoyer')
+            return
+
+        payload = {
+            'id': campaign.id,
+            'org_id': campaign.org_id,
+            # Identifiant de l'envoi pour les clés d'idempotence: started_at change à chaque
+            # réclamation mais pas à la reprise d'un envoi abandonné (reclaim_stale)
+            'dispatch': f"{dispatch_id}.{dispatch.started_at:%Y%m%d%H%M%S%f}",
+            'title': campaign.title,
+            'channel': campaign.campaign_type,
+            'content': content
+        }
+        tags = json.loads(campaign.target_audience) if campaign.target_audience else []
+        cursor = dispatch.last_customer_id or 0
+        counters = {
+            'recipients_count': dispatch.recipients_count or 0,
+            'sent_count': dispatch.sent_count or 0,
+            'failed_count': dispatch.failed_count or 0
+        }
+        # Libère la transaction de lecture avant les envois réseau
+        db.session.commit()
+
+        try:
+            adapter = get_adapter(payload['channel'])
+
+            if adapter.contact_field is None:
+                # Diffusion unique (publication sur une page), pas d'envoi par destinataire
+                result = adapter.send_batch(payload, [])
+                counters['sent_count'] += result.sent
+                counters['failed_count'] += result.failed
+                self._heartbeat(dispatch_id, counters)
+            else:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    batches = self.iter_audience(payload['org_id'], tags, adapter.contact_field, cursor)
+                    # Au plus `concurrency` lots en cours; chaque lot terminé (dans l'ordre) renouvelle le bail
+                    pending = deque()
+                    for batch in batches:
+                        pending.append((batch, executor.submit(adapter.send_batch, payload, batch)))
+                        if len(pending) >= self.concurrency and not self._collect(campaign_id, dispatch_id,
+                                                                                 counters, pending):
+                            return
+                    while pending:
+                        if not self._collect(campaign_id, dispatch_id, counters, pending):
+                            return
+
+            failed = counters['failed_count'] > 0 and counters['sent_count'] == 0
+            self._finish(campaign_id, dispatch_id, 'failed' if failed else 'sent')
+            logger.info(
+                "Campagne %s envoyée: %d envoyé(s), %d échec(s)",
+                campaign_id, counters['sent_count'], counters['failed_count']
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Campagne %s: erreur lors de l'envoi", campaign_id)
+            self._finish(campaign_id, dispatch_id, 'failed', str(e))
+
+    def run_once(self):
+        """Un cycle de planification, retourne le nombre de campagnes traitées"""
+        now = datetime.utcnow()
+        campaign_ids = self.reclaim_stale(now)
+        for campaign_id in self.due_campaign_ids(now):
+            if self.claim(campaign_id, now):
+                campaign_ids.append(campaign_id)
+
+        for campaign_id in campaign_ids:
+            self.dispatch(campaign_id)
+        return len(campaign_ids)
@@ -0,0 +1,144 @@
+"""Sondes de santé en arrière-plan: service AI et base de données
+
+Un thread par processus vérifie les dépendances toutes les HEALTH_PROBE_INTERVAL
+secondes et garde en cache leur statut et leur latence; les routes de statut
+répondent depuis ce cache sans appel réseau. Après HEALTH_PROBE_FAILURE_THRESHOLD
+échecs consécutifs, `is_available` retourne False et les écouteurs (disjoncteurs
+du client AI) coupent les appels au service au lieu d'attendre le délai d'expiration.
+
+Le thread est démarré à la première requête du processus (après un fork éventuel
+du serveur), jamais par les commandes (planificateur, migrations).
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import text
+
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = 'healthy'
+UNHEALTHY = 'unhealthy'
+UNREACHABLE = 'unreachable'
+UNKNOWN = 'unknown'
+
+class HealthProber:
+    """Vérifie périodiquement les dépendances et garde le dernier résultat"""
+
+    def __init__(self, interval=10.0, timeout=2.0, failure_threshold=2):
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.app = None
+        self.checks = {'ai_service': self._check_ai_service, 'database': self._check_database}
+        self.results = {name: self._result(UNKNOWN) for name in self.checks}
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['health'] = self
+        app.before_request(self.ensure_started)
+
+    @staticmethod
+    def _result(status, latency=None, error=None, details=None, failures=0):
+        return {
+            'status': status,
+            'latency_ms': round(latency * 1000, 1) if latency is not None else None,
+            'checked_at': datetime.utcnow().isoformat() if status != UNKNOWN else None,
+            'error': error,
+            'details': details,
+            'consecutive_failures': failures
+        }
+
+    def _check_ai_service(self):
+        import requests
+
+        response = requests.get(f"{self.app.config['AI_SERVICE_URL']}/health", timeout=self.timeout)
+        if response.status_code != 200:
+            return UNHEALTHY, f'HTTP {response.status_code}', None
+        try:
+            details = response.json()
+        except ValueError:
+            details = None
+        return HEALTHY, None, details
+
+    def _check_database(self):
+        with self.app.app_context():
+            try:
+                db.session.execute(text('SELECT 1'))
+            finally:
+                db.session.remove()
+        return HEALTHY, None, None
+
+    def probe(self, name):
+        """Exécute une vérification et met à jour le cache"""
+        started = time.perf_counter()
+        try:
+            status, error, details = self.checks[name]()
+        except Exception as e:
+            status, error, details = UNREACHABLE, str(e), None
+        latency = time.perf_counter() - started
+        with self._lock:
+            previous = self.results[name]
+            failures = 0 if status == HEALTHY else previous['consecutive_failures'] + 1
+            self.results[name] = self._result(status, latency, error, details, failures)
+        if status != previous['status'] and previous['status'] != UNKNOWN:
+            logger.warning("Dépendance %s: %s -> %s (%s)", name, previous['status'], status, error or 'ok')
+        for listener in self.listeners:
+            listener(name, status == HEALTHY, self.is_available(name))
+
+    def probe_all(self):
+        for name in self.checks:
+            self.probe(name)
+
+    def _run(self):
+        while True:
+            self.probe_all()
+            if self._stop.wait(self.interval):
+                return
+
+    def ensure_started(self):
+        """Démarre le thread dans le processus courant s'il ne tourne pas"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self, name):
+        with self._lock:
+            return dict(self.results[name])
+
+    def current(self, name):
+        """Statut en cache; vérifié immédiatement si aucune sonde n'a encore abouti"""
+        if self.status(name)['status'] == UNKNOWN:
+            self.probe(name)
+        return self.status(name)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(result) for name, result in self.results.items()}
+
+    def is_available(self, name):
+        """False après `failure_threshold` échecs consécutifs (inconnu = disponible)"""
+        with self._lock:
+            return self.results[name]['consecutive_failures'] < self.failure_threshold
+
+def get_prober():
+    return current_app.extensions.get('health')
@@ -0,0 +1,216 @@
+"""Statistiques par organisation maintenues de façon incrémentale
+
+Les compteurs de la table org_stats sont mis à jour dans la même transaction que
+les écritures: un écouteur `before_flush` calcule les variations pour les clients
+et campagnes ajoutés, modifiés ou supprimés via l'ORM (routes REST et mutations
+GraphQL). Les mises à jour ensemblistes (UPDATE sans passer par l'ORM) appellent
+`record_deltas` explicitement. `rebuild` recalcule tout depuis zéro.
+"""
+import json
+from collections import Counter
+
+from sqlalchemy import event, inspect, select, func
+from sqlalchemy.orm import Session
+
+from src.models.user import db, Organization, Customer, Campaign, OrgStat
+
+CUSTOMERS_TOTAL = 'customers_total'
+CUSTOMERS_BY_TAG = 'customers_by_tag'
+CAMPAIGNS_BY_STATUS = 'campaigns_by_status'
+CAMPAIGNS_BY_TYPE = 'campaigns_by_type'
+# Ligne témoin: l'organisation a été initialisée par une reconstruction
+INITIALIZED = 'initialized'
+
+_UNCHANGED = object()
+
+def parse_tags(text):
+    try:
+        tags = json.loads(text) if text else []
+    except (TypeError, ValueError):
+        return set()
+    return {str(tag) for tag in tags} if isinstance(tags, list) else set()
+
+def customer_deltas(org_id, tags_text, sign):
+    deltas = Counter({(org_id, CUSTOMERS_TOTAL, ''): sign})
+    for tag in parse_tags(tags_text):
+        deltas[(org_id, CUSTOMERS_BY_TAG, tag)] += sign
+    return deltas
+
+def campaign_deltas(org_id, status, campaign_type, sign):
+    deltas = Counter()
+    deltas[(org_id, CAMPAIGNS_BY_STATUS, status or '')] += sign
+    deltas[(org_id, CAMPAIGNS_BY_TYPE, campaign_type or '')] += sign
+    return deltas
+
+def status_change_deltas(org_id, old_status, new_status):
+    """Variation pour un changement de statut fait hors ORM (ex: planificateur)"""
+    return Counter({
+        (org_id, CAMPAIGNS_BY_STATUS, old_status): -1,
+        (org_id, CAMPAIGNS_BY_STATUS, new_status): 1
+    })
+
+def _previous_value(session, obj, attr):
+    """Ancienne valeur d'un attribut modifié, _UNCHANGED s'il ne l'est pas"""
+    history = inspect(obj).attrs[attr].history
+    if not history.has_changes():
+        return _UNCHANGED
+    if history.deleted:
+        return history.deleted[0]
+    # Ancienne valeur non chargée: le flush n'a pas encore eu lieu, la base la contient encore
+    model = type(obj)
+    return session.connection().execute(
+        select(getattr(model, attr)).where(model.id == obj.id)
+    ).scalar()
+
+def _column_default(model, attr):
+    default = model.__table__.c[attr].default
+    return default.arg if default is not None and not callable(default.arg) else None
+
+def _flush_deltas(session):
+    deltas = Counter()
+
+    for obj in session.new:
+        if isinstance(obj, Customer):
+            deltas.update(customer_deltas(obj.org_id, obj.tags, 1))
+        elif isinstance(obj, Campaign):
+            status = obj.status or _column_default(Campaign, 'status')
+            deltas.update(campaign_deltas(obj.org_id, status, obj.campaign_type, 1))
+
+    for obj in session.deleted:
+        if isinstance(obj, Customer):
+            deltas.update(customer_deltas(obj.org_id, obj.tags, -1))
+        elif isinstance(obj, Campaign):
+            deltas.update(campaign_deltas(obj.org_id, obj.status, obj.campaign_type, -1))
+
+    for obj in session.dirty:
+        if isinstance(obj, Customer):
+            old_tags = _previous_value(session, obj, 'tags')
+            if old_tags is not _UNCHANGED:
+                for tag in parse_tags(old_tags):
+                    deltas[(obj.org_id, CUSTOMERS_BY_TAG, tag)] -= 1
+                for tag in parse_tags(obj.tags):
+                    deltas[(obj.org_id, CUSTOMERS_BY_TAG, tag)] += 1
+        elif isinstance(obj, Campaign):
+            for attr, metric in (('status', CAMPAIGNS_BY_STATUS), ('campaign_type', CAMPAIGNS_BY_TYPE)):
+                old_value = _previous_value(session, obj, attr)
+                if old_value is not _UNCHANGED:
+                    deltas[(obj.org_id, metric, old_value or '')] -= 1
+                    deltas[(obj.org_id, metric, getattr(obj, attr) or '')] += 1
+
+    return deltas
+
+def record_deltas(session, deltas):
+    """Applique des variations {(org_id, métrique, clé): n} dans la transaction courante"""
+    rows = [
+        {'org_id': org_id, 'metric': metric, 'key': key[:100], 'value': value}
+        for (org_id, metric, key), value in deltas.items()
+        if value and org_id is not None
+    ]
+    if not rows:
+        return
+
+    table = OrgStat.__table__
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.org_id, table.c.metric, table.c.key],
+            set_={'value': table.c.value + stmt.excluded.value}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    # Autres bases: mise à jour puis insertion si la ligne n'existe pas
+    for row in rows:
+        result = connection.execute(
+            table.update()
+            .where(table.c.org_id == row['org_id'], table.c.metric == row['metric'], table.c.key == row['key'])
+            .values(value=table.c.value + row['value'])
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+def _before_flush(session, flush_context, instances):
+    record_deltas(session, _flush_deltas(session))
+
+def install_listeners():
+    """Active la maintenance incrémentale pour toutes les sessions (REST et GraphQL)"""
+    if not event.contains(Session, 'before_flush', _before_flush):
+        event.listen(Session, 'before_flush', _before_flush)
+
+def rebuild(org_id=None):
+    """Recalcule les statistiques (d'une organisation ou de toutes) depuis les tables sources"""
+    session = db.session
+    table = OrgStat.__table__
+    delete = table.delete()
+    if org_id is not None:
+        delete = delete.where(table.c.org_id == org_id)
+    session.execute(delete)
+
+    def scoped(query, model):
+        return query.filter(model.org_id == org_id) if org_id is not None else query
+
+    deltas = Counter()
+    for row in scoped(session.query(Customer.org_id, func.count(Customer.id)), Customer).group_by(Customer.org_id):
+        deltas[(row[0], CUSTOMERS_TOTAL, '')] += row[1]
+
+    # Les tags sont stockés en JSON: agrégation par lots côté Python
+    tags_query = scoped(session.query(Customer.org_id, Customer.tags), Customer) \
+        .filter(Customer.tags.isnot(None)).execution_options(yield_per=5000)
+    for row_org_id, tags in tags_query:
+        for tag in parse_tags(tags):
+            deltas[(row_org_id, CUSTOMERS_BY_TAG, tag)] += 1
+
+    for column, metric in ((Campaign.status, CAMPAIGNS_BY_STATUS), (Campaign.campaign_type, CAMPAIGNS_BY_TYPE)):
+        query = scoped(session.query(Campaign.org_id, column, func.count(Campaign.id)), Campaign)
+        for row_org_id, value, count in query.group_by(Campaign.org_id, column):
+            deltas[(row_org_id, metric, value or '')] += count
+
+    if org_id is not None:
+        deltas[(org_id, INITIALIZED, '')] = 1
+    else:
+        for (row_org_id,) in session.query(Organization.id):
+            deltas[(row_org_id, INITIALIZED, '')] = 1
+
+    record_deltas(session, deltas)
+    session.commit()
+
+def get_org_stats(org_id):
+    """Lecture des statistiques d'une organisation (reconstruction si jamais initialisée)"""
+    rows = db.session.query(OrgStat.metric, OrgStat.key, OrgStat.value) \
+        .filter(OrgStat.org_id == org_id).all()
+    if not any(metric == INITIALIZED for metric, _, _ in rows):
+        rebuild(org_id)
+        rows = db.session.query(OrgStat.metric, OrgStat.key, OrgStat.value) \
+            .filter(OrgStat.org_id == org_id).all()
+
+    customers_total = 0
+    by_tag, by_status, by_type = {}, {}, {}
+    for metric, key, value in rows:
+        if value <= 0:
+            continue
+        if metric == CUSTOMERS_TOTAL:
+            customers_total = value
+        elif metric == CUSTOMERS_BY_TAG:
+            by_tag[key] = value
+        elif metric == CAMPAIGNS_BY_STATUS:
+            by_status[key] = value
+        elif metric == CAMPAIGNS_BY_TYPE:
+            by_type[key] = value
+
+    return {
+        'customers': {
+            'total': customers_total,
+            'by_tag': by_tag
+        },
+        'campaigns': {
+            'total': sum(by_status.values()),
+            'by_status': by_status,
+            'by_type': by_type
+        }
+    }
@@ -0,0 +1,139 @@
+"""Synchronisation incrémentale des clients et campagnes (GET .../changes?since=<jeton>)
+
+Les lignes ajoutées ou modifiées sont lues par l'index (org_id, updated_at) avec une
+pagination par clé (updated_at, id); les suppressions sont lues dans le journal
+deletion_log, alimenté par un écouteur `before_flush` (suppressions ORM) et par
+`record_deletions` pour les DELETE ensemblistes.
+
+Le jeton est opaque pour le client: il contient la position atteinte dans les deux
+flux. Les lignes modifiées depuis moins de SYNC_SAFETY_LAG_SECONDS ne sont pas
+encore retournées, pour ne pas dépasser une transaction concurrente pas encore
+validée dont l'horodatage serait antérieur.
+"""
+import base64
+import binascii
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from src.models.user import db, Customer, Campaign, DeletionLog
+
+ENTITIES = {Customer: 'customer', Campaign: 'campaign'}
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+class SyncTokenError(ValueError):
+    """Jeton invalide"""
+
+class SyncTokenExpired(SyncTokenError):
+    """Jeton plus ancien que la rétention du journal des suppressions"""
+
+def safety_lag():
+    return timedelta(seconds=float(os.getenv('SYNC_SAFETY_LAG_SECONDS', '2')))
+
+def retention():
+    return timedelta(days=int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '30')))
+
+def encode_token(updated_at, last_id, last_deletion_id, issued_at):
+    payload = {
+        'u': updated_at.isoformat() if updated_at else None,
+        'i': last_id,
+        'd': last_deletion_id,
+        'ts': issued_at.isoformat()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+def decode_token(token):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        updated_at = datetime.fromisoformat(payload['u']) if payload['u'] else None
+        issued_at = datetime.fromisoformat(payload['ts'])
+        last_id, last_deletion_id = int(payload['i']), int(payload['d'])
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise SyncTokenError('Jeton de synchronisation invalide')
+    if issued_at < datetime.utcnow() - retention():
+        raise SyncTokenExpired('Jeton de synchronisation expiré, une synchronisation complète est nécessaire')
+    return updated_at, last_id, last_deletion_id
+
+def record_deletions(session, entity, rows):
+    """Journalise des suppressions faites hors ORM: rows = [(org_id, id), ...]"""
+    now = datetime.utcnow()
+    values = [
+        {'org_id': org_id, 'entity': entity, 'entity_id': entity_id, 'deleted_at': now}
+        for org_id, entity_id in rows
+    ]
+    if values:
+        session.connection().execute(DeletionLog.__table__.insert(), values)
+
+def _before_flush(session, flush_context, instances):
+    deleted = {}
+    for obj in session.deleted:
+        entity = ENTITIES.get(type(obj))
+        if entity is not None:
+            deleted.setdefault(entity, []).append((obj.org_id, obj.id))
+    for entity, rows in deleted.items():
+        record_deletions(session, entity, rows)
+
+def install_listeners():
+    """Journalise les suppressions ORM de clients et campagnes"""
+    if not event.contains(Session, 'before_flush', _before_flush):
+        event.listen(Session, 'before_flush', _before_flush)
+
+def changes(model, org_id, since, columns, limit=DEFAULT_LIMIT):
+    """Lignes modifiées et identifiants supprimés depuis le jeton.
+
+    Retourne (lignes, ids supprimés, nouveau jeton, has_more); chaque ligne contient
+    les colonnes demandées après (updated_at, id).
+    """
+    now = datetime.utcnow()
+    entity = ENTITIES[model]
+    if since:
+        updated_at, last_id, last_deletion_id = decode_token(since)
+    else:
+        # Synchronisation initiale: toutes les lignes, aucune suppression antérieure
+        updated_at, last_id = None, 0
+        last_deletion_id = db.session.query(func.max(DeletionLog.id)).filter(
+            DeletionLog.org_id == org_id, DeletionLog.entity == entity
+        ).scalar() or 0
+
+    horizon = now - safety_lag()
+    query = db.session.query(model.updated_at, model.id, *columns).filter(
+        model.org_id == org_id,
+        model.updated_at < horizon
+    )
+    if updated_at is not None:
+        query = query.filter(db.or_(
+            model.updated_at > updated_at,
+            db.and_(model.updated_at == updated_at, model.id > last_id)
+        ))
+    rows = query.order_by(model.updated_at, model.id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        updated_at, last_id = rows[-1][0], rows[-1][1]
+
+    deletions = db.session.query(DeletionLog.id, DeletionLog.entity_id).filter(
+        DeletionLog.org_id == org_id,
+        DeletionLog.entity == entity,
+        DeletionLog.id > last_deletion_id,
+        DeletionLog.deleted_at < horizon
+    ).order_by(DeletionLog.id).limit(limit + 1).all()
+    has_more = has_more or len(deletions) > limit
+    deletions = deletions[:limit]
+    if deletions:
+        last_deletion_id = deletions[-1].id
+
+    token = encode_token(updated_at, last_id, last_deletion_id, now)
+    return [row[2:] for row in rows], [row.entity_id for row in deletions], token, has_more
+
+def purge(before=None):
+    """Supprime les entrées du journal plus anciennes que la rétention"""
+    before = before or datetime.utcnow() - retention()
+    result = db.session.execute(
+        DeletionLog.__table__.delete().where(DeletionLog.deleted_at < before)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pytest
+
+# Imports `src.*` depuis apps/api, comme src/main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Pas de sondes de santé en arrière-plan pendant les tests
+os.environ.setdefault('HEALTH_PROBE_ENABLED', 'false')
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Application avec une base SQLite vide (schéma créé par src.migrate)"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('QUERY_BUDGET_MODE', 'raise')
+
+    from src.main import create_app
+    from src.migrate import upgrade
+    from src.models.user import db
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        upgrade(db.engine, db.metadata)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def org(client):
+    """Organisation de test: (org_id, en-têtes d'authentification)"""
+    response = client.post('/api/auth/signup', json={
+        'email': 'test@example.mg',
+        'password': 'motdepasse',
+        'name': 'Test',
+        'org_name': 'Boutique Test'
+    })
+    assert response.status_code == 201, response.get_json()
+    body = response.get_json()
+    return body['user']['org_id'], {'Authorization': f"Bearer {body['token']}"}
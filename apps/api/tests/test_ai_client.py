@@ -0,0 +1,113 @@
+"""Disjoncteurs du client AI: les délais imposés par le client ne coupent pas l'endpoint"""
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+
+from src.services.ai_client import OPEN, AIClient, CircuitOpen, DeadlineExceeded
+
+BREAKER = {'window': 10, 'min_calls': 4, 'failure_rate': 0.5, 'open_seconds': 30}
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+def make_client(send):
+    client = AIClient('http://ai.invalid', timeout=30, breaker_options=BREAKER)
+    client._send = send
+    return client
+
+def short_deadline():
+    # X-Request-Timeout-Ms: 50
+    return time.monotonic() + 0.05
+
+def raise_timeout(path, payload, timeout):
+    raise requests.Timeout()
+
+def test_client_deadline_timeouts_do_not_open_breaker():
+    client = make_client(raise_timeout)
+    for _ in range(10):
+        with pytest.raises(DeadlineExceeded):
+            client.post('/generate-text', {}, deadline=short_deadline())
+
+    assert client.breaker('/generate-text').snapshot()['failures'] == 0
+    client._send = lambda path, payload, timeout: Response(200)
+    assert client.post('/generate-text', {}).status_code == 200
+
+def test_upstream_504_on_client_deadline_does_not_open_breaker():
+    client = make_client(lambda path, payload, timeout: Response(504))
+    for _ in range(10):
+        with pytest.raises(DeadlineExceeded):
+            client.post('/generate-text', {}, deadline=short_deadline())
+
+    assert client.breaker('/generate-text').state != OPEN
+
+def test_timeouts_under_own_timeout_open_breaker():
+    client = make_client(raise_timeout)
+    for _ in range(BREAKER['min_calls']):
+        with pytest.raises(requests.Timeout):
+            client.post('/generate-text', {})
+
+    with pytest.raises(CircuitOpen):
+        client.post('/generate-text', {})
+
+def test_upstream_5xx_opens_breaker():
+    client = make_client(lambda path, payload, timeout: Response(502))
+    for _ in range(BREAKER['min_calls']):
+        client.post('/generate-text', {}, deadline=short_deadline())
+
+    assert client.breaker('/generate-text').state == OPEN
+
+def test_half_open_trial_returned_on_client_deadline():
+    client = make_client(raise_timeout)
+    breaker = client.breaker('/generate-text')
+    breaker.trip()
+    breaker.half_open()
+    with pytest.raises(DeadlineExceeded):
+        client.post('/generate-text', {}, deadline=short_deadline())
+
+    # L'essai est rendu: l'appel suivant peut encore tester l'endpoint
+    client._send = lambda path, payload, timeout: Response(200)
+    assert client.post('/generate-text', {}).status_code == 200
+    assert breaker.snapshot()['state'] == 'closed'
+
+def test_async_client_deadline_timeouts_do_not_open_breaker():
+    async def send(path, payload, timeout):
+        raise httpx.ReadTimeout('timeout')
+
+    async def scenario():
+        client = AIClient('http://ai.invalid', timeout=30, breaker_options=BREAKER)
+        client._send_async = send
+        for _ in range(10):
+            with pytest.raises(DeadlineExceeded):
+                await client.post_async('/generate-text', {}, short_deadline())
+        return client.breaker('/generate-text').snapshot()
+
+    assert asyncio.run(scenario())['failures'] == 0
+
+def test_hedged_calls_never_queue_behind_the_pool():
+    in_flight = []
+    peak = [0]
+
+    def send(path, payload, timeout):
+        in_flight.append(1)
+        peak[0] = max(peak[0], len(in_flight))
+        time.sleep(0.2)
+        in_flight.pop()
+        return Response(200)
+
+    client = AIClient('http://ai.invalid', pool_size=2, hedge_delay_ms=1000, breaker_options=BREAKER)
+    client._send = send
+    threads = [threading.Thread(target=client.post, args=('/embed', {})) for _ in range(12)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 2 appels dans le pool, les 10 autres sur leur propre thread: aucun n'attend
+    assert peak[0] == 12
+    assert time.monotonic() - started < 0.35
@@ -0,0 +1,40 @@
+"""Application ASGI: authentification et CORS des routes asynchrones"""
+import asyncio
+
+import httpx
+import jwt
+
+ORIGIN = {'Origin': 'http://localhost:5173'}
+
+def request(method, path, **kwargs):
+    from src.asgi import app
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://api') as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(send())
+
+def test_async_route_token_errors():
+    from src.asgi import flask_app
+
+    assert request('POST', '/api/ai/generate-text', json={}).json() == {'error': 'Token manquant'}
+    response = request('POST', '/api/ai/generate-text', json={}, headers={'Authorization': 'Bearer'})
+    assert response.status_code == 401 and response.json() == {'error': 'Token format invalide'}
+    response = request('POST', '/api/ai/generate-text', json={}, headers={'Authorization': 'Bearer abc'})
+    assert response.json() == {'error': 'Token invalide'}
+
+    token = jwt.encode({'user_id': 1, 'org_id': 1}, flask_app.config['SECRET_KEY'], algorithm='HS256')
+    response = request('POST', '/api/ai/generate-text', json={}, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 400
+
+def test_cors_on_async_and_flask_routes():
+    preflight = dict(ORIGIN, **{'Access-Control-Request-Method': 'POST'})
+    for path in ('/api/ai/generate-text', '/api/orgs/1/customers'):
+        response = request('OPTIONS', path, headers=preflight)
+        assert response.status_code == 200
+        assert response.headers.get_list('access-control-allow-origin') == [ORIGIN['Origin']]
+
+    response = request('GET', '/api/health', headers=ORIGIN)
+    assert response.headers.get_list('access-control-allow-origin') == [ORIGIN['Origin']]
+    assert 'Retry-After' in response.headers['access-control-expose-headers']
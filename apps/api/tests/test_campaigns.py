@@ -0,0 +1,80 @@
+"""Campagnes: verrou d'envoi (REST et GraphQL) et validation de la génération en masse"""
+from src.models.user import db, Campaign, CampaignDispatch
+
+def create_campaign(client, org_id, headers):
+    response = client.post(f'/api/orgs/{org_id}/campaigns', headers=headers, json={
+        'title': 'Promotion riz', 'campaign_type': 'sms', 'draft_content': 'Riz à prix réduit'
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['campaign']['id']
+
+def mark_sending(app, campaign_id):
+    with app.app_context():
+        db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id).values(status='sending'))
+        db.session.commit()
+
+def test_update_refuses_status_and_content_while_sending(app, client, org):
+    org_id, headers = org
+    campaign_id = create_campaign(client, org_id, headers)
+    mark_sending(app, campaign_id)
+
+    url = f'/api/orgs/{org_id}/campaigns/{campaign_id}'
+    for data in ({'status': 'scheduled'}, {'draft_content': 'Autre texte'}, {'generated_content': 'x'},
+                 {'target_audience': ['vip']}):
+        assert client.put(url, headers=headers, json=data).status_code == 409
+
+    # Les champs descriptifs restent modifiables
+    response = client.put(url, headers=headers, json={'title': 'Promotion riz local'})
+    assert response.status_code == 200
+    assert response.get_json()['campaign']['status'] == 'sending'
+
+def test_generate_content_refused_while_sending(app, client, org):
+    org_id, headers = org
+    campaign_id = create_campaign(client, org_id, headers)
+    mark_sending(app, campaign_id)
+
+    response = client.post(f'/api/orgs/{org_id}/campaigns/{campaign_id}/generate-content', headers=headers, json={})
+    assert response.status_code == 409
+
+def test_bulk_generate_rejects_malformed_selection(client, org):
+    org_id, headers = org
+    url = f'/api/orgs/{org_id}/campaigns/generate-content'
+    for data in ({'filter': 'draft'}, {'filter': ['draft']}, {'filter': {'status': ['draft']}},
+                 {'campaign_ids': ['1']}, {'campaign_ids': [1, None]}, {'campaign_ids': [True]}):
+        response = client.post(url, headers=headers, json=data)
+        assert response.status_code == 400, (data, response.get_json())
+
+def graphql(client, query, **variables):
+    return client.post('/graphql', json={'query': query, 'variables': variables}).get_json()
+
+def test_graphql_update_refuses_status_and_content_while_sending(app, client, org):
+    org_id, headers = org
+    campaign_id = create_campaign(client, org_id, headers)
+    mark_sending(app, campaign_id)
+
+    query = 'mutation($id: Int!, $status: String, $title: String) ' \
+            '{ updateCampaign(id: $id, status: $status, title: $title) { campaign { title status } } }'
+    body = graphql(client, query, id=campaign_id, status='draft')
+    assert body['errors'][0]['message'] == 'Impossible de modifier une campagne en cours d\'envoi'
+
+    body = graphql(client, query, id=campaign_id, title='Promotion riz local')
+    assert body['data']['updateCampaign']['campaign'] == {'title': 'Promotion riz local', 'status': 'sending'}
+
+def test_graphql_delete_refuses_sending_and_removes_dispatch(app, client, org):
+    org_id, headers = org
+    sending_id = create_campaign(client, org_id, headers)
+    failed_id = create_campaign(client, org_id, headers)
+    mark_sending(app, sending_id)
+    with app.app_context():
+        db.session.add(CampaignDispatch(campaign_id=failed_id, org_id=org_id, status='failed'))
+        db.session.commit()
+
+    query = 'mutation($id: Int!) { deleteCampaign(id: $id) { success } }'
+    body = graphql(client, query, id=sending_id)
+    assert body['errors'][0]['message'] == 'Impossible de supprimer une campagne en cours d\'envoi'
+
+    body = graphql(client, query, id=failed_id)
+    assert body['data']['deleteCampaign']['success'] is True
+    with app.app_context():
+        assert db.session.get(Campaign, sending_id) is not None
+        assert CampaignDispatch.query.filter_by(campaign_id=failed_id).count() == 0
@@ -0,0 +1,45 @@
+"""Génération en masse: budget propre à chaque campagne"""
+import threading
+import time
+
+from src.services.content_generation import generate_many
+
+class Response:
+    status_code = 200
+
+    def json(self):
+        return {'generated_text': 'Promo'}
+
+class RecordingClient:
+    budget = 1.0
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def post(self, path, payload, deadline=None, org_id=None, lane=None):
+        with self.lock:
+            self.calls.append((time.monotonic(), deadline))
+        time.sleep(self.latency)
+        return Response()
+
+def test_each_job_gets_its_own_budget():
+    client = RecordingClient(latency=0.05)
+    jobs = [(index, {'prompt': str(index)}) for index in range(8)]
+    outcomes = generate_many(client, jobs, concurrency=2, deadline=time.monotonic() + 10)
+
+    assert all(error is None for _, error in outcomes.values())
+    # Les dernières campagnes partent avec le budget complet, pas avec le reste de la requête
+    for started, deadline in client.calls:
+        assert abs((deadline - started) - client.budget) < 0.01
+
+def test_jobs_not_started_before_request_deadline_are_skipped():
+    client = RecordingClient(latency=0.2)
+    jobs = [(index, {'prompt': str(index)}) for index in range(6)]
+    outcomes = generate_many(client, jobs, concurrency=2, deadline=time.monotonic() + 0.3, job_budget=5)
+
+    assert len(client.calls) == 4
+    skipped = [key for key, (_, error) in outcomes.items() if error]
+    assert skipped == [4, 5]
+    assert outcomes[5][1] == 'Délai de la requête dépassé, campagne non traitée'
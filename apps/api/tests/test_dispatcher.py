@@ -0,0 +1,102 @@
+"""Envoi des campagnes: bail renouvelé à chaque lot, clés d'idempotence par envoi"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.user import db, Campaign, CampaignDispatch, Customer
+from src.services import dispatcher as dispatcher_module
+from src.services.delivery import DeliveryResult, SmsAdapter, StubProvider
+from src.services.dispatcher import CampaignDispatcher
+
+class RecordingAdapter:
+    contact_field = 'phone'
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def send_batch(self, campaign, recipients):
+        with self.lock:
+            self.batches.append([recipient['id'] for recipient in recipients])
+        return DeliveryResult(sent=len(recipients))
+
+@pytest.fixture
+def adapter(monkeypatch):
+    adapter = RecordingAdapter()
+    monkeypatch.setattr(dispatcher_module, 'get_adapter', lambda channel: adapter)
+    return adapter
+
+@pytest.fixture
+def campaign_id(app, org):
+    org_id, _ = org
+    with app.app_context():
+        db.session.add_all(Customer(org_id=org_id, name=f'Client {i}', phone=f'+26134000{i:04d}') for i in range(10))
+        campaign = Campaign(org_id=org_id, title='Promotion', campaign_type='sms', draft_content='Riz à prix réduit',
+                            status='scheduled', schedule_at=datetime.utcnow() - timedelta(minutes=1))
+        db.session.add(campaign)
+        db.session.commit()
+        return campaign.id
+
+def test_heartbeat_after_each_batch(app, adapter, campaign_id, monkeypatch):
+    dispatcher = CampaignDispatcher(worker_id='test', batch_size=2, concurrency=3)
+    heartbeats = []
+    heartbeat = dispatcher._heartbeat
+    monkeypatch.setattr(dispatcher, '_heartbeat', lambda dispatch_id, values: heartbeats.append(values) or
+                        heartbeat(dispatch_id, values))
+
+    with app.app_context():
+        assert dispatcher.run_once() == 1
+        assert db.session.get(Campaign, campaign_id).status == 'sent'
+        dispatch = CampaignDispatch.query.filter_by(campaign_id=campaign_id).one()
+        assert dispatch.sent_count == 10
+
+    assert len(adapter.batches) == 5
+    assert len(heartbeats) == 5
+    cursors = [values['last_customer_id'] for values in heartbeats]
+    assert cursors == sorted(cursors)
+
+def test_lost_lease_stops_after_current_batch(app, adapter, campaign_id, monkeypatch):
+    dispatcher = CampaignDispatcher(worker_id='test', batch_size=2, concurrency=1)
+    heartbeat = dispatcher._heartbeat
+
+    def steal_then_heartbeat(dispatch_id, values):
+        # Une autre instance reprend l'envoi pendant le premier lot
+        db.session.execute(db.update(CampaignDispatch).where(CampaignDispatch.id == dispatch_id)
+                           .values(worker_id='other'))
+        return heartbeat(dispatch_id, values)
+
+    monkeypatch.setattr(dispatcher, '_heartbeat', steal_then_heartbeat)
+    with app.app_context():
+        dispatcher.run_once()
+        assert db.session.get(Campaign, campaign_id).status == 'sending'
+
+    assert len(adapter.batches) == 1
+
+def test_idempotency_key_per_dispatch(app, campaign_id, tmp_path, monkeypatch):
+    provider = StubProvider(str(tmp_path))
+    monkeypatch.setattr(dispatcher_module, 'get_adapter', lambda channel: SmsAdapter(provider, rate=1000))
+    dispatcher = CampaignDispatcher(worker_id='test', batch_size=4, concurrency=2)
+
+    def delivered():
+        with open(tmp_path / 'sms.jsonl', encoding='utf-8') as f:
+            return len(f.readlines())
+
+    with app.app_context():
+        dispatcher.run_once()
+        assert delivered() == 10
+
+        # Reprise du même envoi depuis le début (bail perdu avant le premier heartbeat): dédupliquée
+        db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id).values(status='sending'))
+        db.session.execute(db.update(CampaignDispatch).where(CampaignDispatch.campaign_id == campaign_id)
+                           .values(status='running', last_customer_id=0, sent_count=0))
+        db.session.commit()
+        dispatcher.dispatch(campaign_id)
+        assert delivered() == 10
+        assert CampaignDispatch.query.filter_by(campaign_id=campaign_id).one().sent_count == 10
+
+        # Nouvelle planification: nouvel envoi, nouvelles clés
+        db.session.execute(db.update(Campaign).where(Campaign.id == campaign_id).values(status='scheduled'))
+        db.session.commit()
+        dispatcher.run_once()
+        assert delivered() == 20
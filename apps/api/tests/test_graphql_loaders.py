@@ -0,0 +1,83 @@
+"""Résolveurs GraphQL par lots: nombre constant de requêtes SQL, page lue en SQL"""
+import pytest
+
+from src.instrumentation import SQLRecorder
+from src.models.user import db, Organization, Customer, Campaign
+
+NESTED_QUERY = '''
+{
+  allOrganizations {
+    edges { node {
+      name
+      customers(first: 2) {
+        edges { cursor node { name organization { name } } }
+        pageInfo { hasNextPage endCursor }
+      }
+      campaigns(first: 2) { edges { node { title organization { name } } } }
+      users(first: 5) { edges { node { email } } }
+    } }
+  }
+}
+'''
+
+def seed(app, organizations, children=5):
+    with app.app_context():
+        for index in range(organizations):
+            org = Organization(name=f'Boutique {index}')
+            db.session.add(org)
+            db.session.flush()
+            db.session.add_all(Customer(org_id=org.id, name=f'Client {index}.{i}') for i in range(children))
+            db.session.add_all(Campaign(org_id=org.id, title=f'Promo {index}.{i}', campaign_type='sms')
+                               for i in range(children))
+        db.session.commit()
+
+def run_query(client, query):
+    with SQLRecorder() as recorder:
+        response = client.post('/graphql', json={'query': query})
+    body = response.get_json()
+    assert response.status_code == 200 and not body.get('errors'), body
+    return body['data'], recorder
+
+@pytest.mark.parametrize('organizations', [2, 10])
+def test_nested_query_statement_count_is_constant(app, client, organizations):
+    seed(app, organizations)
+    data, recorder = run_query(client, NESTED_QUERY)
+
+    assert len(data['allOrganizations']['edges']) == organizations
+    # Organisations (comptage et page), une requête par relation (clients, campagnes,
+    # utilisateurs), puis les organisations des enfants en une requête
+    assert recorder.count == 6, [statement for statement, _ in recorder.statements]
+
+def test_children_page_is_limited_in_sql(app, client):
+    seed(app, 3, children=20)
+    data, recorder = run_query(client, NESTED_QUERY)
+
+    for edge in data['allOrganizations']['edges']:
+        customers = edge['node']['customers']
+        assert len(customers['edges']) == 2
+        assert customers['pageInfo']['hasNextPage'] is True
+    customer_statement = next(statement for statement, _ in recorder.statements
+                              if 'FROM customers' in statement and 'row_number' in statement)
+    assert 'position' in customer_statement
+
+def test_children_pagination_with_cursor(app, client):
+    seed(app, 1, children=5)
+    names = []
+    after = None
+    while True:
+        argument = f', after: "{after}"' if after else ''
+        data, _ = run_query(client, '{ allOrganizations { edges { node { customers(first: 2%s) '
+                                    '{ edges { node { name } } pageInfo { hasNextPage endCursor } } } } } }' % argument)
+        customers = data['allOrganizations']['edges'][0]['node']['customers']
+        names += [edge['node']['name'] for edge in customers['edges']]
+        if not customers['pageInfo']['hasNextPage']:
+            break
+        after = customers['pageInfo']['endCursor']
+
+    assert names == [f'Client 0.{i}' for i in range(5)]
+
+def test_last_without_before_is_rejected(app, client):
+    seed(app, 1)
+    response = client.post('/graphql', json={'query': '{ allOrganizations { edges { node { customers(last: 2) '
+                                                      '{ edges { node { name } } } } } } }'})
+    assert response.get_json()['errors']
@@ -0,0 +1,56 @@
+"""Mutations GraphQL en masse: unicité des emails par organisation"""
+from src.models.user import db, Customer, Organization
+
+UPDATE = '''
+mutation($customers: [CustomerUpdateInput!]!) {
+  updateCustomers(customers: $customers) { succeeded failed results { index success error } }
+}
+'''
+
+def seed(app):
+    with app.app_context():
+        org, other = Organization(name='Boutique'), Organization(name='Autre boutique')
+        db.session.add_all([org, other])
+        db.session.flush()
+        customers = [
+            Customer(org_id=org.id, name='Rakoto', email='rakoto@example.mg'),
+            Customer(org_id=org.id, name='Rabe', email='rabe@example.mg'),
+            Customer(org_id=org.id, name='Rasoa'),
+            Customer(org_id=other.id, name='Randria', email='randria@example.mg')
+        ]
+        db.session.add_all(customers)
+        db.session.commit()
+        return [customer.id for customer in customers]
+
+def update(client, customers):
+    response = client.post('/graphql', json={'query': UPDATE, 'variables': {'customers': customers}})
+    body = response.get_json()
+    assert not body.get('errors'), body
+    return body['data']['updateCustomers']
+
+def emails(app):
+    with app.app_context():
+        return {row.id: row.email for row in db.session.query(Customer.id, Customer.email)}
+
+def test_update_customers_rejects_email_of_another_customer(app, client):
+    rakoto, rabe, rasoa, randria = seed(app)
+    output = update(client, [
+        {'id': rabe, 'email': ' Rakoto@Example.mg '},  # déjà pris dans l'organisation
+        {'id': rasoa, 'email': 'randria@example.mg'},  # pris dans une autre organisation seulement
+        {'id': rakoto, 'email': 'RAKOTO@example.mg'}   # son propre email
+    ])
+
+    assert [result['success'] for result in output['results']] == [False, True, True]
+    assert output['results'][0]['error'] == 'Un client avec cet email existe déjà'
+    assert emails(app)[rabe] == 'rabe@example.mg'
+    assert emails(app)[rasoa] == 'randria@example.mg'
+
+def test_update_customers_rejects_duplicates_within_batch(app, client):
+    _, rabe, rasoa, _ = seed(app)
+    output = update(client, [
+        {'id': rabe, 'email': 'nouveau@example.mg'},
+        {'id': rasoa, 'email': 'Nouveau@example.mg'}
+    ])
+
+    assert [result['success'] for result in output['results']] == [True, False]
+    assert emails(app)[rasoa] is None
@@ -0,0 +1,28 @@
+"""Pagination par curseur: limites de page de la configuration GraphQL"""
+from src.models.user import db, Customer
+
+QUERY = '''
+query($orgId: Int!, $first: Int) {
+  customersByOrg(orgId: $orgId, first: $first) { edges { node { name } } pageInfo { hasNextPage } }
+}
+'''
+
+def customers_page(client, org_id, first=None):
+    response = client.post('/graphql', json={'query': QUERY, 'variables': {'orgId': org_id, 'first': first}})
+    body = response.get_json()
+    assert not body.get('errors'), body
+    return body['data']['customersByOrg']
+
+def test_page_limits_follow_graphql_config(app, client, org, monkeypatch):
+    monkeypatch.setenv('GRAPHQL_DEFAULT_PAGE_SIZE', '30')
+    monkeypatch.setenv('GRAPHQL_MAX_PAGE_SIZE', '150')
+    org_id, _ = org
+    with app.app_context():
+        db.session.add_all(Customer(org_id=org_id, name=f'Client {i}') for i in range(160))
+        db.session.commit()
+
+    assert len(customers_page(client, org_id)['edges']) == 30
+    assert len(customers_page(client, org_id, first=120)['edges']) == 120
+    page = customers_page(client, org_id, first=500)
+    assert len(page['edges']) == 150
+    assert page['pageInfo']['hasNextPage'] is True
@@ -0,0 +1,64 @@
+"""Budgets de requêtes SQL: échec en mode raise (N+1, budget dépassé)"""
+import pytest
+
+from src.models.user import db, Customer, Organization
+from src.query_budget import QueryBudgetExceeded, assert_query_budget, query_budget
+
+def add_customers(app, org_id, count):
+    with app.app_context():
+        db.session.add_all(Customer(org_id=org_id, name=f'Client {i}', phone=f'+26134000{i:04d}') for i in range(count))
+        db.session.commit()
+
+def register_views(app):
+    """Vues de test (à déclarer avant la première requête)"""
+
+    def customers_n_plus_one():
+        # Une requête par client pour lire le nom de son organisation
+        return {'customers': [
+            (customer.name, db.session.query(Organization.name).filter(Organization.id == customer.org_id).scalar())
+            for customer in Customer.query.all()
+        ]}
+
+    @query_budget(1)
+    def two_statements():
+        db.session.query(Customer.id).all()
+        db.session.query(Organization.id).all()
+        return {'ok': True}
+
+    app.add_url_rule('/test/n-plus-one', 'n_plus_one', customers_n_plus_one)
+    app.add_url_rule('/test/over-budget', 'over_budget', two_statements)
+
+def test_n_plus_one_route_raises(app, client):
+    register_views(app)
+    with app.app_context():
+        org = Organization(name='Boutique')
+        db.session.add(org)
+        db.session.commit()
+        org_id = org.id
+    add_customers(app, org_id, 5)
+
+    with pytest.raises(QueryBudgetExceeded, match='N\\+1'):
+        client.get('/test/n-plus-one')
+
+def test_declared_budget_exceeded_raises(app, client):
+    register_views(app)
+    with pytest.raises(QueryBudgetExceeded, match='budget de 1'):
+        client.get('/test/over-budget')
+
+def test_customer_list_stays_within_budget(app, client, org):
+    org_id, headers = org
+    add_customers(app, org_id, 20)
+
+    # Budget déclaré par la vue (3 requêtes) contrôlé par QUERY_BUDGET_MODE=raise
+    response = client.get(f'/api/orgs/{org_id}/customers', headers=headers)
+    assert response.status_code == 200
+    assert len(response.get_json()['customers']) == 20
+
+def test_assert_query_budget_block(app):
+    with app.app_context():
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_query_budget(max_statements=1):
+                db.session.query(Customer.id).all()
+                db.session.query(Organization.id).all()
+        with assert_query_budget(max_statements=1):
+            db.session.query(Customer.id).all()
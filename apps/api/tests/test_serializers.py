@@ -0,0 +1,21 @@
+"""Sérialiseurs: JSON stocké invalide dans les colonnes texte"""
+import json
+
+from src.models.user import db, Customer
+
+def test_invalid_stored_json_serialized_as_null(app, client, org):
+    org_id, headers = org
+    with app.app_context():
+        db.session.add_all([
+            Customer(org_id=org_id, name='Rakoto', tags='["vip"]', extra_data='{"score": NaN}'),
+            Customer(org_id=org_id, name='Rabe', tags="['vip', 'ancien format']", extra_data='{"score": 1')
+        ])
+        db.session.commit()
+
+    response = client.get(f'/api/orgs/{org_id}/customers?fields=name,tags,metadata', headers=headers)
+    assert response.status_code == 200
+    customers = {customer['name']: customer for customer in json.loads(response.get_data())['customers']}
+    assert customers['Rakoto']['tags'] == ['vip']
+    assert customers['Rakoto']['metadata'] == {'score': None}
+    assert customers['Rabe']['tags'] is None
+    assert customers['Rabe']['metadata'] is None
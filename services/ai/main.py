@@ -1,10 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
+import asyncio
+import hashlib
+import logging
 import os
-import google.generativeai as genai
+import random
+import time
+
+logger = logging.getLogger("ai4local.ai")
 
 app = FastAPI(title="AI4Local AI Service", version="1.0.0")
 
@@ -17,11 +23,110 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configuration de l'API Gemini
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set.")
-genai.configure(api_key=GEMINI_API_KEY)
+# Fournisseur du modèle: gemini, ou stub (réponses déterministes locales, sans clé ni
+# réseau, pour les tests de charge et le développement)
+AI_MODEL_PROVIDER = os.getenv("AI_MODEL_PROVIDER", "gemini").lower()
+AI_STUB_LATENCY_MS = float(os.getenv("AI_STUB_LATENCY_MS", "50"))
+# Appels simultanés traités par le stub (0 = illimité), comme le quota d'un fournisseur
+AI_STUB_CONCURRENCY = int(os.getenv("AI_STUB_CONCURRENCY", "0"))
+STUB_EMBEDDING_DIMENSIONS = 768
+
+# Échéance des requêtes: budget restant transmis par l'API (en-tête, millisecondes),
+# borné par AI_REQUEST_TIMEOUT_S. Les appels au modèle sont annulés à l'échéance ou
+# quand le client se déconnecte.
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+AI_REQUEST_TIMEOUT_S = float(os.getenv("AI_REQUEST_TIMEOUT_S", "30"))
+
+if AI_MODEL_PROVIDER == "gemini":
+    import google.generativeai as genai
+
+    # Configuration de l'API Gemini
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY environment variable not set.")
+    genai.configure(api_key=GEMINI_API_KEY)
+elif AI_MODEL_PROVIDER != "stub":
+    raise ValueError(f"AI_MODEL_PROVIDER inconnu: {AI_MODEL_PROVIDER}")
+
+TEXT_MODEL = "gemini-2.5-flash-lite" if AI_MODEL_PROVIDER == "gemini" else "stub"
+EMBEDDING_MODEL = "models/embedding-001" if AI_MODEL_PROVIDER == "gemini" else "stub"
+
+class Deadline:
+    """Échéance d'une requête (time.monotonic)"""
+
+    def __init__(self, request: Request):
+        budget = AI_REQUEST_TIMEOUT_S
+        try:
+            requested = float(request.headers.get(DEADLINE_HEADER, 0)) / 1000
+        except ValueError:
+            requested = 0
+        if requested > 0:
+            budget = min(budget, requested)
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+async def _wait_disconnect(request: Request):
+    # Le corps est déjà lu: le prochain message ASGI est la déconnexion du client
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def run_bounded(request: Request, deadline: Deadline, work):
+    """Exécute `work` (coroutine) jusqu'à l'échéance ou la déconnexion du client, puis l'annule"""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(_wait_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, timeout=max(0, deadline.remaining()),
+                                     return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if task in done:
+        return task.result()
+    task.cancel()
+    if watcher in done:
+        logger.warning("%s annulée: client déconnecté", request.url.path)
+        raise HTTPException(status_code=499, detail="Client déconnecté")
+    logger.warning("%s annulée: délai dépassé", request.url.path)
+    raise HTTPException(status_code=504, detail="Délai dépassé")
+
+def _request_options(deadline):
+    # Délai de l'appel au fournisseur = budget restant de la requête
+    return {"timeout": max(0.001, deadline.remaining())}
+
+_stub_slots = asyncio.Semaphore(AI_STUB_CONCURRENCY) if AI_STUB_CONCURRENCY > 0 else None
+
+async def _stub_latency():
+    if _stub_slots is not None:
+        async with _stub_slots:
+            await asyncio.sleep(AI_STUB_LATENCY_MS / 1000)
+    elif AI_STUB_LATENCY_MS > 0:
+        await asyncio.sleep(AI_STUB_LATENCY_MS / 1000)
+
+def _stub_text(prompt, max_tokens):
+    words = prompt.split() or ["AI4Local"]
+    return " ".join(words[i % len(words)] for i in range(max(1, min(max_tokens or 150, 400))))
+
+def _stub_embedding(text):
+    # Vecteur unitaire pseudo-aléatoire, identique pour un même texte
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(STUB_EMBEDDING_DIMENSIONS)]
+    norm = sum(value * value for value in vector) ** 0.5
+    return [value / norm for value in vector]
+
+async def _embed(text, task_type, deadline):
+    if AI_MODEL_PROVIDER == "stub":
+        await _stub_latency()
+        return _stub_embedding(text)
+    response = await genai.embed_content_async(
+        model=EMBEDDING_MODEL,
+        content=text,
+        task_type=task_type,
+        request_options=_request_options(deadline)
+    )
+    return response["embedding"]
 
 # Modèles Pydantic pour les requêtes
 class TextGenerationRequest(BaseModel):
@@ -55,76 +160,86 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "ai"}
+    return {"status": "healthy", "service": "ai", "provider": AI_MODEL_PROVIDER}
+
+async def _generate(full_prompt, request, deadline):
+    if AI_MODEL_PROVIDER == "stub":
+        await _stub_latency()
+        return _stub_text(full_prompt, request.max_tokens)
+
+    model = genai.GenerativeModel(TEXT_MODEL)
+
+    generation_config = {
+        "max_output_tokens": request.max_tokens,
+        "temperature": request.temperature,
+    }
+
+    response = await model.generate_content_async(
+        full_prompt,
+        generation_config=generation_config,
+        request_options=_request_options(deadline)
+    )
+    return response.text
 
 @app.post("/generate-text", response_model=TextGenerationResponse)
-async def generate_text(request: TextGenerationRequest):
+async def generate_text(request: TextGenerationRequest, http_request: Request):
     """
     Génère du texte basé sur un prompt et un template optionnel en utilisant Gemini.
     """
+    deadline = Deadline(http_request)
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash-lite")
-
         if request.template:
             full_prompt = request.template.replace("{prompt}", request.prompt)
         else:
             full_prompt = request.prompt
 
-        generation_config = {
-            "max_output_tokens": request.max_tokens,
-            "temperature": request.temperature,
-        }
-
-        response = model.generate_content(
-            full_prompt,
-            generation_config=generation_config
-        )
-        
-        generated_text = response.text
+        generated_text = await run_bounded(http_request, deadline, _generate(full_prompt, request, deadline))
 
         return TextGenerationResponse(
             generated_text=generated_text,
-            model_used="gemini-2.5-flash-lite"
+            model_used=TEXT_MODEL
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la génération: {str(e)}")
 
+async def _embed_all(texts, deadline):
+    embeddings = []
+    for text in texts:
+        embeddings.append(await _embed(text, "retrieval_document", deadline))
+    return embeddings
+
 @app.post("/embed", response_model=EmbeddingResponse)
-async def create_embeddings(request: EmbeddingRequest):
+async def create_embeddings(request: EmbeddingRequest, http_request: Request):
     """
     Crée des embeddings pour une liste de textes en utilisant Gemini.
     """
+    deadline = Deadline(http_request)
     try:
-        embeddings = []
-        for text in request.texts:
-            response = genai.embed_content(
-                model="models/embedding-001",
-                content=text,
-                task_type="retrieval_document"
-            )
-            embeddings.append(response["embedding"])
+        embeddings = await run_bounded(http_request, deadline, _embed_all(request.texts, deadline))
             
         return EmbeddingResponse(
             embeddings=embeddings,
-            model_used="models/embedding-001"
+            model_used=EMBEDDING_MODEL
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la création d'embeddings: {str(e)}")
 
 @app.post("/semantic-search", response_model=SemanticSearchResponse)
-async def semantic_search(request: SemanticSearchRequest):
+async def semantic_search(request: SemanticSearchRequest, http_request: Request):
     """
     Effectue une recherche sémantique basée sur une requête en utilisant Gemini pour l'embedding.
     Pour le MVP, la recherche est simulée après l'embedding.
     """
+    deadline = Deadline(http_request)
     try:
         # Créer l'embedding de la requête
-        query_embedding_response = genai.embed_content(
-            model="models/embedding-001",
-            content=request.query,
-            task_type="retrieval_query"
+        query_embedding = await run_bounded(
+            http_request, deadline, _embed(request.query, "retrieval_query", deadline)
         )
-        query_embedding = query_embedding_response["embedding"]
 
         # Simulation de recherche sémantique (à remplacer par une vraie DB vectorielle comme Weaviate)
         # Pour cette démo, nous allons juste simuler des résultats pertinents
@@ -156,6 +271,8 @@ async def semantic_search(request: SemanticSearchRequest):
             results=results,
             query=request.query
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche sémantique: {str(e)}")
 